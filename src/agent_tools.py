@@ -0,0 +1,499 @@
+"""
+Beaver's Choice Paper Company - Agent Tools
+smolagents tools over the database helpers, shared by the agents and by
+trace replay. Importing this module does not load the LLM.
+"""
+
+import pandas as pd
+from typing import List, Optional
+from smolagents import tool
+from beaver_db import (
+    create_transaction, create_transactions, get_all_inventory, get_stock_level, get_catalogue_entry,
+    get_supplier_delivery_date, get_cash_balance, search_quote_history, quote_facet_summary,
+    get_availability_index, get_pricing_model, sale_lock,
+    quote_orders, plan_reorders, commit_reorder_plan,
+)
+from tool_memo import ALL_ITEMS, memoize_tool
+
+# ==================== AGENT TOOLS ====================
+
+@tool
+def check_inventory_tool(item_name: str, request_date: str) -> str:
+    """
+    Check the current stock level of a specific item.
+    
+    Args:
+        item_name: Name of the item to check
+        request_date: Date for the inventory check (YYYY-MM-DD format)
+    
+    Returns:
+        String describing the current stock level and item details
+    """
+    try:
+        # Get stock level
+        stock_df = get_stock_level(item_name, request_date)
+        current_stock = int(stock_df["current_stock"].iloc[0])
+        
+        # Get item details from inventory
+        entry = get_catalogue_entry(item_name)
+        
+        if entry is None:
+            return f"Item '{item_name}' is not in our inventory catalog."
+        
+        _, unit_price, min_stock = entry
+        
+        status = "ADEQUATE" if current_stock >= min_stock else "LOW - REORDER NEEDED"
+        
+        return (f"Item: {item_name}\n"
+                f"Current Stock: {current_stock} units\n"
+                f"Minimum Stock Level: {min_stock} units\n"
+                f"Unit Price: ${unit_price:.2f}\n"
+                f"Status: {status}")
+    
+    except Exception as e:
+        return f"Error checking inventory for {item_name}: {str(e)}"
+
+@tool
+def get_all_inventory_tool(request_date: str) -> str:
+    """
+    Get a complete list of all items currently in stock.
+    
+    Args:
+        request_date: Date for the inventory snapshot (YYYY-MM-DD format)
+    
+    Returns:
+        String listing all items with their stock levels
+    """
+    try:
+        inventory_dict = get_all_inventory(request_date)
+        
+        if not inventory_dict:
+            return "No items currently in stock."
+        
+        result = "CURRENT INVENTORY:\n" + "="*50 + "\n"
+        for item, stock in sorted(inventory_dict.items()):
+            result += f"• {item}: {stock} units\n"
+        
+        return result
+    
+    except Exception as e:
+        return f"Error retrieving inventory: {str(e)}"
+
+@tool
+def order_stock_tool(item_name: str, quantity: int, request_date: str) -> str:
+    """
+    Place an order with the supplier to restock an item.
+    
+    Args:
+        item_name: Name of the item to order
+        quantity: Quantity to order
+        request_date: Date of the order (YYYY-MM-DD format)
+    
+    Returns:
+        String confirming the order and delivery date
+    """
+    try:
+        # Get item price
+        entry = get_catalogue_entry(item_name)
+        
+        if entry is None:
+            return f"Cannot order '{item_name}' - not in our catalog."
+        
+        unit_price = float(entry[1])
+        total_cost = quantity * unit_price
+        
+        # Check if we have enough cash
+        current_cash = get_cash_balance(request_date)
+        if current_cash < total_cost:
+            return (f"INSUFFICIENT FUNDS: Order costs ${total_cost:.2f} but only "
+                   f"${current_cash:.2f} available. Cannot place order.")
+        
+        # Get delivery date
+        delivery_date = get_supplier_delivery_date(request_date, quantity)
+        
+        # Create stock order transaction; the units become available on delivery
+        transaction_id = create_transaction(
+            item_name=item_name,
+            transaction_type="stock_orders",
+            quantity=quantity,
+            price=total_cost,
+            date=request_date,
+            delivery_date=delivery_date
+        )
+        
+        return (f"STOCK ORDER CONFIRMED\n"
+                f"Transaction ID: {transaction_id}\n"
+                f"Item: {item_name}\n"
+                f"Quantity: {quantity} units\n"
+                f"Total Cost: ${total_cost:.2f}\n"
+                f"Expected Delivery: {delivery_date} (stock is available from this date)")
+    
+    except Exception as e:
+        return f"Error placing stock order: {str(e)}"
+
+@tool
+def reorder_low_stock_tool(request_date: str) -> str:
+    """
+    Restock every item below its minimum stock level in one bulk order, within available cash.
+    
+    Args:
+        request_date: Date of the order (YYYY-MM-DD format)
+    
+    Returns:
+        String summarizing the items ordered, total cost and delivery dates
+    """
+    try:
+        plan = plan_reorders(request_date)
+        
+        if plan.empty:
+            return "No reorder needed: all items are at or above minimum stock, or no cash is available."
+        
+        transaction_ids = commit_reorder_plan(plan, request_date)
+        
+        result = "BULK STOCK ORDER CONFIRMED\n" + "="*60 + "\n"
+        for row, transaction_id in zip(plan.itertuples(), transaction_ids):
+            delivery_date = get_supplier_delivery_date(request_date, int(row.quantity))
+            result += (f"• {row.item_name}: {row.quantity} units (stock {row.current_stock}/"
+                       f"min {row.min_stock_level}) = ${row.cost:.2f}, "
+                       f"delivery {delivery_date} [Transaction {transaction_id}]\n")
+        result += "\n" + "-"*60 + "\n"
+        result += f"Total Cost: ${plan['cost'].sum():.2f}\n"
+        
+        return result
+    
+    except Exception as e:
+        return f"Error placing bulk stock order: {str(e)}"
+
+@tool
+def search_quote_history_tool(search_terms: str, limit: int = 5, job_type: Optional[str] = None,
+                              order_size: Optional[str] = None, event_type: Optional[str] = None) -> str:
+    """
+    Search historical quotes for similar requests, optionally filtered by customer metadata.
+    
+    Args:
+        search_terms: Comma-separated search terms (e.g., "glossy,ceremony,cardstock"); may be empty when filtering
+        limit: Maximum number of results to return
+        job_type: Only quotes for this customer job (e.g., "office manager")
+        order_size: Only quotes of this order size ("small", "medium" or "large")
+        event_type: Only quotes for this event (e.g., "ceremony")
+    
+    Returns:
+        String with historical quote information
+    """
+    try:
+        terms_list = [term.strip() for term in search_terms.split(",") if term.strip()]
+        quotes = search_quote_history(terms_list, limit, job_type, order_size, event_type)
+        
+        if not quotes:
+            return "No matching historical quotes found."
+        
+        result = f"FOUND {len(quotes)} SIMILAR HISTORICAL QUOTES:\n" + "="*60 + "\n"
+        summary = quote_facet_summary(job_type, order_size, event_type)
+        if summary["filters"]:
+            result += (f"All quotes with {format_facets(summary['filters'])}: {summary['quotes']}, "
+                       f"average total ${summary['avg_total_amount']:.2f}\n")
+        
+        for i, quote in enumerate(quotes, 1):
+            result += f"\nQuote #{i}:\n"
+            result += f"  Event Type: {quote.get('event_type', 'N/A')}\n"
+            result += f"  Order Size: {quote.get('order_size', 'N/A')}\n"
+            result += f"  Total Amount: ${quote.get('total_amount', 0):.2f}\n"
+            result += f"  Explanation: {quote.get('quote_explanation', 'N/A')[:100]}...\n"
+        
+        return result
+    
+    except Exception as e:
+        return f"Error searching quote history: {str(e)}"
+
+@tool
+def quote_history_facets_tool(job_type: Optional[str] = None, order_size: Optional[str] = None,
+                              event_type: Optional[str] = None) -> str:
+    """
+    Summarize historical quotes by customer metadata: how many quotes match the
+    filters, their average total, and the same figures for each value of the
+    facets left unfiltered.
+    
+    Args:
+        job_type: Only quotes for this customer job (e.g., "office manager")
+        order_size: Only quotes of this order size ("small", "medium" or "large")
+        event_type: Only quotes for this event (e.g., "ceremony")
+    
+    Returns:
+        String with quote counts and average totals
+    """
+    try:
+        summary = quote_facet_summary(job_type, order_size, event_type)
+        scope = format_facets(summary["filters"]) if summary["filters"] else "all quotes"
+        if not summary["quotes"]:
+            return f"No historical quotes with {scope}."
+        
+        result = (f"QUOTE HISTORY ({scope}): {summary['quotes']} quotes, "
+                  f"average total ${summary['avg_total_amount']:.2f}\n")
+        for facet, rows in summary["breakdown"].items():
+            result += f"\nBy {facet.replace('_', ' ')}:\n"
+            for row in rows:
+                result += f"  {row['value'] or '(none)'}: {row['quotes']} quotes, avg ${row['avg_total_amount']:.2f}\n"
+        
+        return result
+    
+    except Exception as e:
+        return f"Error summarizing quote history: {str(e)}"
+
+@tool
+def calculate_quote_tool(items_and_quantities: str, request_date: str) -> str:
+    """
+    Calculate a quote for requested items with bulk discounts.
+    
+    Args:
+        items_and_quantities: Format "item1:qty1,item2:qty2" (e.g., "A4 paper:500,Cardstock:200")
+        request_date: Date of the quote request (YYYY-MM-DD format)
+    
+    Returns:
+        Detailed quote with pricing breakdown and discounts
+    """
+    try:
+        # Parse items and quantities
+        items_list = []
+        for item_qty in items_and_quantities.split(","):
+            parts = item_qty.split(":")
+            if len(parts) == 2:
+                items_list.append((parts[0].strip(), int(parts[1].strip())))
+        
+        if not items_list:
+            return "Invalid format. Use: 'item1:qty1,item2:qty2'"
+        
+        orders = pd.DataFrame(items_list, columns=["item_name", "quantity"])
+        orders.insert(0, "request_id", 0)
+        lines, totals = quote_orders(orders)
+        
+        quote_details = lines[lines["available"]]
+        unavailable_items = lines.loc[~lines["available"], "item_name"].tolist()
+        subtotal, discount_rate, discount_amount, total = totals.iloc[0][
+            ["subtotal", "discount_rate", "discount_amount", "total"]
+        ]
+        
+        # Format quote
+        result = "QUOTE DETAILS:\n" + "="*60 + "\n"
+        
+        for _, detail in quote_details.iterrows():
+            result += (f"{detail['item_name']}: {detail['quantity']} units × "
+                      f"${detail['unit_price']:.2f} = ${detail['item_total']:.2f}\n")
+        
+        result += "\n" + "-"*60 + "\n"
+        result += f"Subtotal: ${subtotal:.2f}\n"
+        
+        if discount_rate > 0:
+            result += f"Bulk Discount ({discount_rate*100:.0f}%): -${discount_amount:.2f}\n"
+        
+        result += f"TOTAL: ${total:.2f}\n"
+        
+        if unavailable_items:
+            result += f"\nNOTE: The following items are not available: {', '.join(unavailable_items)}\n"
+        
+        return result
+    
+    except Exception as e:
+        return f"Error calculating quote: {str(e)}"
+
+@tool
+def suggest_price_tool(items_and_quantities: str, job_type: Optional[str] = None,
+                       order_size: Optional[str] = None, event_type: Optional[str] = None) -> str:
+    """
+    Suggest a price and discount for an order from a model fitted on historical quotes.
+    
+    Args:
+        items_and_quantities: Format "item1:qty1,item2:qty2" (e.g., "A4 paper:500,Cardstock:200")
+        job_type: Customer's job (e.g., "office manager"), if known
+        order_size: Order size ("small", "medium" or "large"), if known
+        event_type: Event the order is for (e.g., "ceremony"), if known
+    
+    Returns:
+        Suggested price and discount compared with the catalogue list price
+    """
+    try:
+        model = get_pricing_model()
+        if model is None:
+            return "No historical pricing model is available; use calculate_quote_tool."
+        
+        items = {}
+        for item_qty in items_and_quantities.split(","):
+            parts = item_qty.split(":")
+            if len(parts) == 2:
+                items[parts[0].strip()] = items.get(parts[0].strip(), 0) + int(parts[1].strip())
+        
+        if not items:
+            return "Invalid format. Use: 'item1:qty1,item2:qty2'"
+        
+        suggestion = model.predict(items, job_type, order_size, event_type)
+        return (f"SUGGESTED PRICE (from {model.stats['quotes']} historical quotes):\n"
+                f"List price: ${suggestion['list_subtotal']:.2f}\n"
+                f"Similar past quotes charged: ${suggestion['historical_price']:.2f}\n"
+                f"Suggested discount: {suggestion['discount_rate']*100:.0f}%\n"
+                f"Suggested price: ${suggestion['suggested_price']:.2f}")
+    
+    except Exception as e:
+        return f"Error suggesting price: {str(e)}"
+
+@tool
+def check_stock_availability_tool(items_and_quantities: str, request_date: str) -> str:
+    """
+    Check if requested items are available in sufficient quantities.
+    
+    Args:
+        items_and_quantities: Format "item1:qty1,item2:qty2"
+        request_date: Date to check availability (YYYY-MM-DD format)
+    
+    Returns:
+        Availability status for each item
+    """
+    try:
+        items_list = []
+        for item_qty in items_and_quantities.split(","):
+            parts = item_qty.split(":")
+            if len(parts) == 2:
+                items_list.append((parts[0].strip(), int(parts[1].strip())))
+        
+        result = "STOCK AVAILABILITY CHECK:\n" + "="*60 + "\n"
+        all_available = True
+        index = get_availability_index()
+        
+        for item_name, quantity in items_list:
+            current_stock = index.available_to_promise(item_name, request_date)
+            
+            if current_stock >= quantity:
+                status = "✓ AVAILABLE"
+            else:
+                status = f"✗ INSUFFICIENT (only {current_stock} available)"
+                earliest = index.earliest_available(item_name, quantity, request_date)
+                if earliest:
+                    status += f", {quantity} available from {earliest} (pending deliveries)"
+                all_available = False
+            
+            result += f"{item_name}: Requested {quantity}, {status}\n"
+        
+        result += "\n" + "-"*60 + "\n"
+        result += "Overall Status: " + ("ORDER CAN BE FULFILLED" if all_available else "CANNOT FULFILL - INSUFFICIENT STOCK")
+        
+        return result
+    
+    except Exception as e:
+        return f"Error checking availability: {str(e)}"
+
+@tool
+def create_sale_tool(items_and_quantities: str, total_price: float, request_date: str) -> str:
+    """
+    Finalize a sale by creating sales transactions and updating inventory.
+    
+    Args:
+        items_and_quantities: Format "item1:qty1,item2:qty2"
+        total_price: Total sale amount
+        request_date: Date of the sale (YYYY-MM-DD format)
+    
+    Returns:
+        Confirmation of the sale with transaction details
+    """
+    try:
+        items_list = []
+        for item_qty in items_and_quantities.split(","):
+            parts = item_qty.split(":")
+            if len(parts) == 2:
+                items_list.append((parts[0].strip(), int(parts[1].strip())))
+        
+        # First check if all items are available, the same way check_stock_availability_tool
+        # does: units already promised to later sales can't be sold again, and repeated
+        # lines for one item are checked together
+        requested = {}
+        for item_name, quantity in items_list:
+            requested[item_name] = requested.get(item_name, 0) + quantity
+        with sale_lock:
+            index = get_availability_index()
+            for item_name, quantity in requested.items():
+                current_stock = index.available_to_promise(item_name, request_date)
+                
+                if current_stock < quantity:
+                    return (f"SALE FAILED: Insufficient stock for {item_name}. "
+                           f"Requested: {quantity}, Available: {current_stock}")
+            
+            # Create the sales transactions in one commit
+            transaction_ids = create_transactions([
+                {
+                    "item_name": item_name,
+                    "transaction_type": "sales",
+                    "quantity": quantity,
+                    "price": quantity * float(get_catalogue_entry(item_name)[1]),
+                    "date": request_date,
+                }
+                for item_name, quantity in items_list
+            ])
+        
+        # Get delivery estimate
+        total_quantity = sum(qty for _, qty in items_list)
+        delivery_date = get_supplier_delivery_date(request_date, total_quantity)
+        
+        result = "SALE COMPLETED SUCCESSFULLY!\n" + "="*60 + "\n"
+        result += f"Transaction IDs: {', '.join(map(str, transaction_ids))}\n"
+        result += f"Total Amount: ${total_price:.2f}\n"
+        result += f"Estimated Delivery: {delivery_date}\n"
+        result += "\nItems Sold:\n"
+        
+        for item_name, quantity in items_list:
+            result += f"  • {item_name}: {quantity} units\n"
+        
+        return result
+    
+    except Exception as e:
+        return f"Error creating sale: {str(e)}"
+
+@tool
+def get_delivery_estimate_tool(quantity: int, request_date: str) -> str:
+    """
+    Get estimated delivery date based on order quantity.
+    
+    Args:
+        quantity: Total quantity of items in the order
+        request_date: Order date (YYYY-MM-DD format)
+    
+    Returns:
+        Estimated delivery date
+    """
+    try:
+        delivery_date = get_supplier_delivery_date(request_date, quantity)
+        
+        if quantity <= 10:
+            timeframe = "same day"
+        elif quantity <= 100:
+            timeframe = "1 business day"
+        elif quantity <= 1000:
+            timeframe = "4 business days"
+        else:
+            timeframe = "7 business days"
+        
+        return f"Estimated Delivery: {delivery_date} ({timeframe})"
+    
+    except Exception as e:
+        return f"Error estimating delivery: {str(e)}"
+
+def format_facets(filters: dict) -> str:
+    """'job type "office manager", event type "ceremony"' for a dict of facet filters."""
+    return ", ".join(f'{facet.replace("_", " ")} "{value}"' for facet, value in filters.items())
+
+# Read-only tools are memoized per request; ledger writes invalidate the items they touch
+
+def item_names_in(items_and_quantities: str) -> List[str]:
+    """Item names from an "item1:qty1,item2:qty2" tool argument."""
+    return [part.split(":")[0].strip() for part in items_and_quantities.split(",")]
+
+memoize_tool(check_inventory_tool, depends_on=lambda item_name, request_date: [item_name])
+memoize_tool(get_all_inventory_tool, depends_on=lambda request_date: [ALL_ITEMS])
+memoize_tool(check_stock_availability_tool,
+             depends_on=lambda items_and_quantities, request_date: item_names_in(items_and_quantities))
+
+# Every tool by name (used to wrap tools for tracing and to replay traces)
+AGENT_TOOLS = {
+    agent_tool.name: agent_tool
+    for agent_tool in [
+        check_inventory_tool, get_all_inventory_tool, order_stock_tool, reorder_low_stock_tool,
+        search_quote_history_tool, quote_history_facets_tool, calculate_quote_tool, suggest_price_tool, check_stock_availability_tool,
+        create_sale_tool, get_delivery_estimate_tool,
+    ]
+}
@@ -0,0 +1,267 @@
+"""
+Beaver's Choice Paper Company - Agent Trace
+Replayable JSONL record of what the agents did for each request.
+
+Every orchestrator and specialist step (agent, prompt hash, tool calls,
+observations, timing, tokens) and every tool execution (tool, arguments,
+result, timing) is appended to a JSONL file. Records are queued and written
+by a background thread, so agents never wait on file I/O.
+
+`replay` re-executes the recorded tool calls, in their original order,
+against a freshly initialized database without calling the LLM, and reports
+any tool whose result differs from the recording.
+
+Usage:
+    python agent_trace.py replay results/agent_trace.jsonl
+    python agent_trace.py replay results/agent_trace.jsonl --request 7 --request 12
+"""
+
+import argparse
+import functools
+import hashlib
+import inspect
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional
+
+from smolagents.memory import ActionStep
+
+DEFAULT_TRACE_PATH = "results/agent_trace.jsonl"
+
+_current_request: ContextVar[Optional[int]] = ContextVar("trace_request", default=None)
+_current_agent: ContextVar[Optional[str]] = ContextVar("trace_agent", default=None)
+
+
+class TraceWriter:
+    """Append JSON records to a file from a background thread."""
+
+    _CLOSE = object()
+
+    def __init__(self, path: str, append: bool = True):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+        self._queue: queue.Queue = queue.Queue()
+        self.written = 0
+        self._thread = threading.Thread(target=self._drain, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    def emit(self, record: Dict) -> None:
+        """Queue a record; never blocks on the file."""
+        self._queue.put(record)
+
+    def _drain(self) -> None:
+        while True:
+            record = self._queue.get()
+            if record is self._CLOSE:
+                break
+            self._file.write(json.dumps(record, default=str) + "\n")
+            self.written += 1
+            # Flush once the backlog is written rather than after every record
+            if self._queue.empty():
+                self._file.flush()
+        self._file.flush()
+
+    def close(self) -> None:
+        """Write everything still queued and close the file."""
+        self._queue.put(self._CLOSE)
+        self._thread.join()
+        self._file.close()
+
+
+def prompt_hash(messages) -> Optional[str]:
+    """Short stable hash of the messages sent to the model for a step."""
+    if not messages:
+        return None
+    payload = json.dumps([m.dict() if hasattr(m, "dict") else str(m) for m in messages],
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class AgentTracer:
+    """Records agent steps and tool calls to a TraceWriter while one is open."""
+
+    def __init__(self):
+        self.writer: Optional[TraceWriter] = None
+        self.run_id = uuid.uuid4().hex[:12]
+        self._sequence = itertools.count()
+
+    def open(self, path: str = DEFAULT_TRACE_PATH, append: bool = True) -> None:
+        """Start tracing to `path` (appending, e.g. when resuming a run, or starting afresh)."""
+        self.close()
+        self.writer = TraceWriter(path, append=append)
+        self.run_id = uuid.uuid4().hex[:12]
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def emit(self, record_type: str, **fields) -> None:
+        if self.writer is not None:
+            self.writer.emit({"type": record_type, "run_id": self.run_id,
+                              "request_id": _current_request.get(), "ts": time.time(), **fields})
+
+    @contextmanager
+    def request(self, request_id: Optional[int], request: str, request_date: str, route: str):
+        """Attribute records made within this block to `request_id`; yields a dict for the response."""
+        token = _current_request.set(request_id)
+        outcome = {"response": None}
+        start = time.perf_counter()
+        self.emit("request_start", request=request, request_date=request_date, route=route)
+        try:
+            yield outcome
+        finally:
+            self.emit("request_end", response=outcome["response"], seconds=time.perf_counter() - start)
+            _current_request.reset(token)
+
+    def record_step(self, memory_step: ActionStep, agent=None) -> None:
+        """smolagents step callback: one record per agent step."""
+        usage = memory_step.token_usage
+        self.emit(
+            "step",
+            agent=getattr(agent, "name", None),
+            step=memory_step.step_number,
+            prompt_hash=prompt_hash(memory_step.model_input_messages),
+            tool_calls=[{"name": call.name, "arguments": call.arguments}
+                        for call in memory_step.tool_calls or []],
+            observations=memory_step.observations,
+            error=str(memory_step.error) if memory_step.error else None,
+            seconds=memory_step.timing.duration,
+            input_tokens=usage.input_tokens if usage else None,
+            output_tokens=usage.output_tokens if usage else None,
+        )
+
+    def trace_agent(self, agent) -> None:
+        """Record the agent's steps and attribute the tool calls it makes to it."""
+        agent.step_callbacks.register(ActionStep, self.record_step)
+        run = agent.run
+
+        @functools.wraps(run)
+        def traced_run(*args, **kwargs):
+            token = _current_agent.set(agent.name)
+            try:
+                return run(*args, **kwargs)
+            finally:
+                _current_agent.reset(token)
+
+        agent.run = traced_run
+
+    def trace_tool(self, agent_tool) -> None:
+        """Record every execution of a tool (wraps its `forward` in place, like memoize_tool)."""
+        forward = agent_tool.forward
+        signature = inspect.signature(forward)
+        parameters = [p for p in signature.parameters.values() if p.name != "self"]
+        signature = signature.replace(parameters=parameters)
+
+        @functools.wraps(forward)
+        def traced_forward(*args, **kwargs):
+            if self.writer is None:
+                return forward(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            seq = next(self._sequence)
+            start = time.perf_counter()
+            result = forward(*args, **kwargs)
+            self.emit("tool_call", seq=seq, agent=_current_agent.get(), tool=agent_tool.name,
+                      arguments=dict(bound.arguments), result=result,
+                      seconds=time.perf_counter() - start)
+            return result
+
+        agent_tool.forward = traced_forward
+
+
+def load_trace(path: str) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def replay(records: List[Dict], tools: Dict, request_ids: Optional[Iterable[int]] = None) -> Dict:
+    """
+    Re-execute recorded tool calls against the current database.
+
+    Each request is replayed from its most recent attempt in the trace (a
+    resumed run records unfinished requests again), in the order the
+    requests were processed; calls within a request run in the order they
+    started. With `request_ids`, only those requests are reported, but every
+    request processed before them is replayed too.
+
+    Returns:
+        Counts of requests and calls replayed, and the calls whose result differed
+    """
+    wanted = set(request_ids) if request_ids is not None else None
+    latest: Dict[int, str] = {}
+    order: List[int] = []
+    for record in records:
+        if record["type"] == "request_start" and record["request_id"] is not None:
+            if record["request_id"] in latest:
+                order.remove(record["request_id"])
+            latest[record["request_id"]] = record["run_id"]
+            order.append(record["request_id"])
+
+    calls_by_request: Dict[int, List[Dict]] = {}
+    for record in records:
+        if record["type"] == "tool_call" and latest.get(record["request_id"]) == record["run_id"]:
+            calls_by_request.setdefault(record["request_id"], []).append(record)
+
+    if wanted is not None:
+        # Earlier requests still run (unreported) so the selected ones see the same ledger
+        last = max((i for i, request_id in enumerate(order) if request_id in wanted), default=-1)
+        order = order[:last + 1]
+
+    summary = {"requests": 0, "calls": 0, "matched": 0, "skipped": 0, "mismatches": []}
+    for request_id in order:
+        reported = wanted is None or request_id in wanted
+        summary["requests"] += reported
+        for call in sorted(calls_by_request.get(request_id, []), key=lambda c: c["seq"]):
+            agent_tool = tools.get(call["tool"])
+            if agent_tool is None:
+                summary["skipped"] += reported
+                continue
+            result = agent_tool.forward(**call["arguments"])
+            if not reported:
+                continue
+            summary["calls"] += 1
+            if str(result) == str(call["result"]):
+                summary["matched"] += 1
+            else:
+                summary["mismatches"].append({
+                    "request_id": request_id, "seq": call["seq"], "tool": call["tool"],
+                    "arguments": call["arguments"], "recorded": call["result"], "replayed": result,
+                })
+    return summary
+
+
+if __name__ == "__main__":
+    from sqlalchemy import create_engine
+
+    import beaver_db
+    from agent_tools import AGENT_TOOLS
+
+    parser = argparse.ArgumentParser(description="Replay recorded agent tool calls without the LLM.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    replay_parser = subparsers.add_parser("replay", help="re-run a trace's tool calls on a fresh database")
+    replay_parser.add_argument("trace", nargs="?", default=DEFAULT_TRACE_PATH)
+    replay_parser.add_argument("--request", type=int, action="append",
+                               help="replay only this request id (repeatable)")
+    replay_parser.add_argument("--seed", type=int, default=137, help="init_database seed of the traced run")
+    args = parser.parse_args()
+
+    beaver_db.set_db_engine(create_engine("sqlite://"))
+    beaver_db.init_database(beaver_db.db_engine, seed=args.seed, data_dir=beaver_db.DATA_DIR)
+    summary = replay(load_trace(args.trace), AGENT_TOOLS, args.request)
+
+    print(f"Replayed {summary['calls']} tool calls from {summary['requests']} requests: "
+          f"{summary['matched']} matched, {len(summary['mismatches'])} differed, "
+          f"{summary['skipped']} skipped")
+    for mismatch in summary["mismatches"]:
+        print(f"\nRequest {mismatch['request_id']} call #{mismatch['seq']}: "
+              f"{mismatch['tool']}({mismatch['arguments']})")
+        print(f"--- recorded\n{mismatch['recorded']}\n--- replayed\n{mismatch['replayed']}")
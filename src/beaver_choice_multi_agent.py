@@ -7,797 +7,470 @@ Framework: smolagents
 """
 
 import pandas as pd
-import numpy as np
 import os
 import time
 import dotenv
-import ast
-from sqlalchemy.sql import text
-from datetime import datetime, timedelta
-from typing import Dict, List, Union
-from sqlalchemy import create_engine, Engine
-from smolagents import CodeAgent, ToolCallingAgent, tool, LiteLLMModel
+import argparse
+import asyncio
+import contextvars
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from smolagents import ToolCallingAgent, LiteLLMModel
+from beaver_db import (
+    db_engine, init_database, get_last_transaction_id, discard_transactions_after,
+    get_all_inventory, generate_financial_report, enable_group_commit, disable_group_commit,
+    use_warehouse_shards, report_cache, run_db,
+)
+from results_writer import ResultsWriter, SUPPORTED_SINKS
+from rate_limiter import RateLimiter
+from intent_router import IntentRouter
+from ledger_backends import warehouse_scope
+from agent_tools import (
+    check_inventory_tool, get_all_inventory_tool, order_stock_tool, reorder_low_stock_tool,
+    search_quote_history_tool, quote_history_facets_tool, calculate_quote_tool, suggest_price_tool,
+    check_stock_availability_tool, create_sale_tool, get_delivery_estimate_tool, AGENT_TOOLS,
+)
+from agent_trace import AgentTracer, DEFAULT_TRACE_PATH
+from run_profiler import RunProfiler
+from tool_memo import memo_totals, prefetch_scope, prefetch_totals, tool_memo_scope
+from prefetch import start_prefetch
 
 # Load environment variables
 dotenv.load_dotenv()
 
-# Create an SQLite database
-db_engine = create_engine("sqlite:///munder_difflin.db")
-
-# List containing the different kinds of papers 
-paper_supplies = [
-    # Paper Types (priced per sheet unless specified)
-    {"item_name": "A4 paper",                         "category": "paper",        "unit_price": 0.05},
-    {"item_name": "Letter-sized paper",              "category": "paper",        "unit_price": 0.06},
-    {"item_name": "Cardstock",                        "category": "paper",        "unit_price": 0.15},
-    {"item_name": "Colored paper",                    "category": "paper",        "unit_price": 0.10},
-    {"item_name": "Glossy paper",                     "category": "paper",        "unit_price": 0.20},
-    {"item_name": "Matte paper",                      "category": "paper",        "unit_price": 0.18},
-    {"item_name": "Recycled paper",                   "category": "paper",        "unit_price": 0.08},
-    {"item_name": "Eco-friendly paper",               "category": "paper",        "unit_price": 0.12},
-    {"item_name": "Poster paper",                     "category": "paper",        "unit_price": 0.25},
-    {"item_name": "Banner paper",                     "category": "paper",        "unit_price": 0.30},
-    {"item_name": "Kraft paper",                      "category": "paper",        "unit_price": 0.10},
-    {"item_name": "Construction paper",               "category": "paper",        "unit_price": 0.07},
-    {"item_name": "Wrapping paper",                   "category": "paper",        "unit_price": 0.15},
-    {"item_name": "Glitter paper",                    "category": "paper",        "unit_price": 0.22},
-    {"item_name": "Decorative paper",                 "category": "paper",        "unit_price": 0.18},
-    {"item_name": "Letterhead paper",                 "category": "paper",        "unit_price": 0.12},
-    {"item_name": "Legal-size paper",                 "category": "paper",        "unit_price": 0.08},
-    {"item_name": "Crepe paper",                      "category": "paper",        "unit_price": 0.05},
-    {"item_name": "Photo paper",                      "category": "paper",        "unit_price": 0.25},
-    {"item_name": "Uncoated paper",                   "category": "paper",        "unit_price": 0.06},
-    {"item_name": "Butcher paper",                    "category": "paper",        "unit_price": 0.10},
-    {"item_name": "Heavyweight paper",                "category": "paper",        "unit_price": 0.20},
-    {"item_name": "Standard copy paper",              "category": "paper",        "unit_price": 0.04},
-    {"item_name": "Bright-colored paper",             "category": "paper",        "unit_price": 0.12},
-    {"item_name": "Patterned paper",                  "category": "paper",        "unit_price": 0.15},
-
-    # Product Types (priced per unit)
-    {"item_name": "Paper plates",                     "category": "product",      "unit_price": 0.10},
-    {"item_name": "Paper cups",                       "category": "product",      "unit_price": 0.08},
-    {"item_name": "Paper napkins",                    "category": "product",      "unit_price": 0.02},
-    {"item_name": "Disposable cups",                  "category": "product",      "unit_price": 0.10},
-    {"item_name": "Table covers",                     "category": "product",      "unit_price": 1.50},
-    {"item_name": "Envelopes",                        "category": "product",      "unit_price": 0.05},
-    {"item_name": "Sticky notes",                     "category": "product",      "unit_price": 0.03},
-    {"item_name": "Notepads",                         "category": "product",      "unit_price": 2.00},
-    {"item_name": "Invitation cards",                 "category": "product",      "unit_price": 0.50},
-    {"item_name": "Flyers",                           "category": "product",      "unit_price": 0.15},
-    {"item_name": "Party streamers",                  "category": "product",      "unit_price": 0.05},
-    {"item_name": "Decorative adhesive tape (washi tape)", "category": "product", "unit_price": 0.20},
-    {"item_name": "Paper party bags",                 "category": "product",      "unit_price": 0.25},
-    {"item_name": "Name tags with lanyards",          "category": "product",      "unit_price": 0.75},
-    {"item_name": "Presentation folders",             "category": "product",      "unit_price": 0.50},
-
-    # Large-format items (priced per unit)
-    {"item_name": "Large poster paper (24x36 inches)", "category": "large_format", "unit_price": 1.00},
-    {"item_name": "Rolls of banner paper (36-inch width)", "category": "large_format", "unit_price": 2.50},
-
-    # Specialty papers
-    {"item_name": "100 lb cover stock",               "category": "specialty",    "unit_price": 0.50},
-    {"item_name": "80 lb text paper",                 "category": "specialty",    "unit_price": 0.40},
-    {"item_name": "250 gsm cardstock",                "category": "specialty",    "unit_price": 0.30},
-    {"item_name": "220 gsm poster paper",             "category": "specialty",    "unit_price": 0.35},
-]
-
-# ==================== DATABASE HELPER FUNCTIONS ====================
-
-def generate_sample_inventory(paper_supplies: list, coverage: float = 0.4, seed: int = 137) -> pd.DataFrame:
-    """Generate inventory for a specified percentage of items from the paper supply list."""
-    np.random.seed(seed)
-    num_items = int(len(paper_supplies) * coverage)
-    selected_indices = np.random.choice(range(len(paper_supplies)), size=num_items, replace=False)
-    selected_items = [paper_supplies[i] for i in selected_indices]
-    
-    inventory = []
-    for item in selected_items:
-        inventory.append({
-            "item_name": item["item_name"],
-            "category": item["category"],
-            "unit_price": item["unit_price"],
-            "current_stock": np.random.randint(200, 800),
-            "min_stock_level": np.random.randint(50, 150)
-        })
-    
-    return pd.DataFrame(inventory)
-
-def init_database(db_engine: Engine, seed: int = 137) -> Engine:    
-    """Set up the database with all required tables and initial records."""
-    try:
-        transactions_schema = pd.DataFrame({
-            "id": [], "item_name": [], "transaction_type": [], 
-            "units": [], "price": [], "transaction_date": [],
-        })
-        transactions_schema.to_sql("transactions", db_engine, if_exists="replace", index=False)
-        
-        initial_date = datetime(2025, 1, 1).isoformat()
-        
-        quote_requests_df = pd.read_csv("quote_requests.csv")
-        quote_requests_df["id"] = range(1, len(quote_requests_df) + 1)
-        quote_requests_df.to_sql("quote_requests", db_engine, if_exists="replace", index=False)
-        
-        quotes_df = pd.read_csv("quotes.csv")
-        quotes_df["request_id"] = range(1, len(quotes_df) + 1)
-        quotes_df["order_date"] = initial_date
-        
-        if "request_metadata" in quotes_df.columns:
-            quotes_df["request_metadata"] = quotes_df["request_metadata"].apply(
-                lambda x: ast.literal_eval(x) if isinstance(x, str) else x
+# ==================== MULTI-AGENT SYSTEM ====================
+
+# Initialize the LLM model
+api_key = os.getenv("UDACITY_OPENAI_API_KEY")
+if not api_key:
+    raise ValueError("UDACITY_OPENAI_API_KEY not found in environment variables")
+
+class RateLimitedLiteLLMModel(LiteLLMModel):
+    """LiteLLMModel whose calls go through a shared RateLimiter and whose token usage is tallied."""
+    
+    def __init__(self, rate_limiter: RateLimiter, **kwargs):
+        super().__init__(**kwargs)
+        self.rate_limiter = rate_limiter
+        self._usage_lock = threading.Lock()
+        self.reset_usage()
+    
+    def generate(self, messages, **kwargs):
+        # Rough prompt size (~4 characters per token) plus headroom for the reply
+        estimated_tokens = sum(len(str(m)) for m in messages) // 4 + 500
+        start = time.perf_counter()
+        with run_profiler.paused():
+            response = self.rate_limiter.call(
+                super().generate, messages, estimated_tokens=estimated_tokens, **kwargs
             )
-            quotes_df["job_type"] = quotes_df["request_metadata"].apply(lambda x: x.get("job_type", ""))
-            quotes_df["order_size"] = quotes_df["request_metadata"].apply(lambda x: x.get("order_size", ""))
-            quotes_df["event_type"] = quotes_df["request_metadata"].apply(lambda x: x.get("event_type", ""))
-        
-        quotes_df = quotes_df[["request_id", "total_amount", "quote_explanation", 
-                               "order_date", "job_type", "order_size", "event_type"]]
-        quotes_df.to_sql("quotes", db_engine, if_exists="replace", index=False)
-        
-        inventory_df = generate_sample_inventory(paper_supplies, seed=seed)
-        initial_transactions = []
-        
-        initial_transactions.append({
-            "item_name": None, "transaction_type": "sales",
-            "units": None, "price": 50000.0, "transaction_date": initial_date,
-        })
-        
-        for _, item in inventory_df.iterrows():
-            initial_transactions.append({
-                "item_name": item["item_name"],
-                "transaction_type": "stock_orders",
-                "units": item["current_stock"],
-                "price": item["current_stock"] * item["unit_price"],
-                "transaction_date": initial_date,
-            })
-        
-        pd.DataFrame(initial_transactions).to_sql("transactions", db_engine, if_exists="append", index=False)
-        inventory_df.to_sql("inventory", db_engine, if_exists="replace", index=False)
-        
-        return db_engine
-    
-    except Exception as e:
-        print(f"Error initializing database: {e}")
-        raise
+        with self._usage_lock:
+            self.usage["generate_seconds"] += time.perf_counter() - start
+        if response.token_usage is not None:
+            self.rate_limiter.settle(
+                estimated_tokens,
+                response.token_usage.input_tokens + response.token_usage.output_tokens,
+            )
+            self._record_usage(response)
+        return response
+    
+    def _record_usage(self, response) -> None:
+        # Provider-side prompt caching is only visible in the raw usage block
+        details = getattr(getattr(response.raw, "usage", None), "prompt_tokens_details", None)
+        cached = int(getattr(details, "cached_tokens", 0) or 0)
+        with self._usage_lock:
+            self.usage["calls"] += 1
+            self.usage["input_tokens"] += response.token_usage.input_tokens
+            self.usage["cached_input_tokens"] += cached
+            self.usage["output_tokens"] += response.token_usage.output_tokens
+    
+    def reset_usage(self) -> None:
+        with self._usage_lock:
+            self.usage = {"calls": 0, "input_tokens": 0, "cached_input_tokens": 0,
+                          "output_tokens": 0, "generate_seconds": 0.0}
+    
+    def usage_stats(self) -> Dict[str, float]:
+        with self._usage_lock:
+            stats = dict(self.usage)
+        stats["uncached_input_tokens"] = stats["input_tokens"] - stats["cached_input_tokens"]
+        return stats
+
+# Idle unless a run is profiled (--profile); model calls are excluded from its profiles
+run_profiler = RunProfiler()
+
+rate_limiter = RateLimiter(
+    requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60")),
+    tokens_per_minute=float(os.getenv("LLM_TOKENS_PER_MINUTE", "200000")),
+)
 
-def create_transaction(item_name: str, transaction_type: str, quantity: int, 
-                      price: float, date: Union[str, datetime]) -> int:
-    """Record a transaction in the database."""
-    try:
-        date_str = date.isoformat() if isinstance(date, datetime) else date
-        
-        if transaction_type not in {"stock_orders", "sales"}:
-            raise ValueError("Transaction type must be 'stock_orders' or 'sales'")
-        
-        transaction = pd.DataFrame([{
-            "item_name": item_name,
-            "transaction_type": transaction_type,
-            "units": quantity,
-            "price": price,
-            "transaction_date": date_str,
-        }])
-        
-        transaction.to_sql("transactions", db_engine, if_exists="append", index=False)
-        result = pd.read_sql("SELECT last_insert_rowid() as id", db_engine)
-        return int(result.iloc[0]["id"])
-    
-    except Exception as e:
-        print(f"Error creating transaction: {e}")
-        raise
-
-def get_all_inventory(as_of_date: str) -> Dict[str, int]:
-    """Retrieve a snapshot of available inventory as of a specific date."""
-    query = """
-        SELECT item_name,
-            SUM(CASE
-                WHEN transaction_type = 'stock_orders' THEN units
-                WHEN transaction_type = 'sales' THEN -units
-                ELSE 0
-            END) as stock
-        FROM transactions
-        WHERE item_name IS NOT NULL AND transaction_date <= :as_of_date
-        GROUP BY item_name
-        HAVING stock > 0
-    """
-    result = pd.read_sql(query, db_engine, params={"as_of_date": as_of_date})
-    return dict(zip(result["item_name"], result["stock"]))
-
-def get_stock_level(item_name: str, as_of_date: Union[str, datetime]) -> pd.DataFrame:
-    """Retrieve the stock level of a specific item as of a given date."""
-    if isinstance(as_of_date, datetime):
-        as_of_date = as_of_date.isoformat()
-    
-    stock_query = """
-        SELECT item_name,
-            COALESCE(SUM(CASE
-                WHEN transaction_type = 'stock_orders' THEN units
-                WHEN transaction_type = 'sales' THEN -units
-                ELSE 0
-            END), 0) AS current_stock
-        FROM transactions
-        WHERE item_name = :item_name AND transaction_date <= :as_of_date
-    """
-    
-    return pd.read_sql(stock_query, db_engine, 
-                      params={"item_name": item_name, "as_of_date": as_of_date})
+model = RateLimitedLiteLLMModel(
+    rate_limiter,
+    model_id="openai/gpt-4o-mini",
+    api_key=api_key,
+    api_base="https://openai.vocareum.com/v1"
+)
 
-def get_supplier_delivery_date(input_date_str: str, quantity: int) -> str:
-    """Estimate the supplier delivery date based on order quantity."""
-    try:
-        input_date_dt = datetime.fromisoformat(input_date_str.split("T")[0])
-    except (ValueError, TypeError):
-        input_date_dt = datetime.now()
-    
-    if quantity <= 10:
-        days = 0
-    elif quantity <= 100:
-        days = 1
-    elif quantity <= 1000:
-        days = 4
-    else:
-        days = 7
-    
-    delivery_date_dt = input_date_dt + timedelta(days=days)
-    return delivery_date_dt.strftime("%Y-%m-%d")
+# Same model and rate limit; a separate instance so the orchestrator's own
+# model time (the hop the intent router can skip) is measured on its own
+orchestrator_model = RateLimitedLiteLLMModel(
+    rate_limiter,
+    model_id="openai/gpt-4o-mini",
+    api_key=api_key,
+    api_base="https://openai.vocareum.com/v1"
+)
 
-def get_cash_balance(as_of_date: Union[str, datetime]) -> float:
-    """Calculate the current cash balance as of a specified date."""
-    try:
-        if isinstance(as_of_date, datetime):
-            as_of_date = as_of_date.isoformat()
-        
-        transactions = pd.read_sql(
-            "SELECT * FROM transactions WHERE transaction_date <= :as_of_date",
-            db_engine, params={"as_of_date": as_of_date},
-        )
-        
-        if not transactions.empty:
-            total_sales = transactions.loc[transactions["transaction_type"] == "sales", "price"].sum()
-            total_purchases = transactions.loc[transactions["transaction_type"] == "stock_orders", "price"].sum()
-            return float(total_sales - total_purchases)
-        
-        return 0.0
-    
-    except Exception as e:
-        print(f"Error getting cash balance: {e}")
-        return 0.0
-
-def generate_financial_report(as_of_date: Union[str, datetime]) -> Dict:
-    """Generate a complete financial report as of a specific date."""
-    if isinstance(as_of_date, datetime):
-        as_of_date = as_of_date.isoformat()
-    
-    cash = get_cash_balance(as_of_date)
-    inventory_df = pd.read_sql("SELECT * FROM inventory", db_engine)
-    inventory_value = 0.0
-    inventory_summary = []
-    
-    for _, item in inventory_df.iterrows():
-        stock_info = get_stock_level(item["item_name"], as_of_date)
-        stock = stock_info["current_stock"].iloc[0]
-        item_value = stock * item["unit_price"]
-        inventory_value += item_value
-        
-        inventory_summary.append({
-            "item_name": item["item_name"],
-            "stock": stock,
-            "unit_price": item["unit_price"],
-            "value": item_value,
-        })
-    
-    top_sales_query = """
-        SELECT item_name, SUM(units) as total_units, SUM(price) as total_revenue
-        FROM transactions
-        WHERE transaction_type = 'sales' AND transaction_date <= :date
-        GROUP BY item_name
-        ORDER BY total_revenue DESC
-        LIMIT 5
-    """
-    top_sales = pd.read_sql(top_sales_query, db_engine, params={"date": as_of_date})
-    top_selling_products = top_sales.to_dict(orient="records")
-    
-    return {
-        "as_of_date": as_of_date,
-        "cash_balance": cash,
-        "inventory_value": inventory_value,
-        "total_assets": cash + inventory_value,
-        "inventory_summary": inventory_summary,
-        "top_selling_products": top_selling_products,
-    }
+def get_model_usage() -> Dict[str, float]:
+    """Token usage and model time summed over the specialist and orchestrator models."""
+    totals = model.usage_stats()
+    for key, value in orchestrator_model.usage_stats().items():
+        totals[key] += value
+    return totals
+
+def reset_model_usage() -> None:
+    model.reset_usage()
+    orchestrator_model.reset_usage()
+
+# Agent instructions are static and go into each agent's system prompt, ahead
+# of the tool schemas, so every call shares one long cacheable prefix. Anything
+# that changes per request (date, request text) is only sent in the task.
+
+INVENTORY_INSTRUCTIONS = """You manage Beaver's Choice Paper Company's stock.
+Always pass the request date you are given to tools that take a request_date.
+Prefer reorder_low_stock_tool when several items need restocking; stock ordered
+from the supplier is only available from its delivery date."""
+
+QUOTING_INSTRUCTIONS = """You prepare price quotes for Beaver's Choice Paper Company.
+Use calculate_quote_tool for pricing (it applies the bulk discount tiers) and
+search_quote_history_tool to compare with similar past quotes; filter it by
+job_type, order_size or event_type, and use quote_history_facets_tool for counts
+and average totals, instead of reading through many quotes. suggest_price_tool
+gives a price and discount fitted on past quotes in one call. Always pass the
+request date you are given to tools that take a request_date."""
+
+SALES_INSTRUCTIONS = """You finalize sales for Beaver's Choice Paper Company.
+Verify availability with check_stock_availability_tool before calling
+create_sale_tool, and report delivery estimates. Always pass the request date
+you are given to tools that take a request_date."""
+
+ORCHESTRATOR_INSTRUCTIONS = """You are the Orchestrator Agent for Beaver's Choice Paper Company.
 
-def search_quote_history(search_terms: List[str], limit: int = 5) -> List[Dict]:
-    """Retrieve historical quotes matching the provided search terms."""
-    conditions = []
-    params = {}
-    
-    for i, term in enumerate(search_terms):
-        param_name = f"term_{i}"
-        conditions.append(
-            f"(LOWER(qr.response) LIKE :{param_name} OR "
-            f"LOWER(q.quote_explanation) LIKE :{param_name})"
-        )
-        params[param_name] = f"%{term.lower()}%"
-    
-    where_clause = " AND ".join(conditions) if conditions else "1=1"
-    
-    query = f"""
-        SELECT qr.response AS original_request, q.total_amount, q.quote_explanation,
-               q.job_type, q.order_size, q.event_type, q.order_date
-        FROM quotes q
-        JOIN quote_requests qr ON q.request_id = qr.id
-        WHERE {where_clause}
-        ORDER BY q.order_date DESC
-        LIMIT {limit}
-    """
-    
-    with db_engine.connect() as conn:
-        result = conn.execute(text(query), params)
-        return [dict(row) for row in result]
+Your role is to analyze customer requests and coordinate with specialist agents:
+- InventoryAgent: For checking stock, reordering supplies
+- QuotingAgent: For generating price quotes
+- SalesAgent: For finalizing orders and sales
 
-# ==================== AGENT TOOLS ====================
+IMPORTANT GUIDELINES:
+1. For quote requests: Use QuotingAgent to search history and calculate quotes
+2. For inventory questions: Use InventoryAgent to check stock levels
+3. For order placement: Use SalesAgent to verify availability and create sales
+4. If stock is low after a sale, use InventoryAgent to reorder (it can restock all low items in one bulk order)
+5. Always provide clear, professional responses to customers
+6. Include relevant details like pricing, delivery dates, and availability
+7. Always tell specialist agents the request date so they use it in their tool calls
 
-@tool
-def check_inventory_tool(item_name: str, request_date: str) -> str:
-    """
-    Check the current stock level of a specific item.
-    
-    Args:
-        item_name: Name of the item to check
-        request_date: Date for the inventory check (YYYY-MM-DD format)
-    
-    Returns:
-        String describing the current stock level and item details
-    """
-    try:
-        # Get stock level
-        stock_df = get_stock_level(item_name, request_date)
-        current_stock = int(stock_df["current_stock"].iloc[0])
-        
-        # Get item details from inventory
-        inventory_df = pd.read_sql("SELECT * FROM inventory WHERE item_name = :item", 
-                                   db_engine, params={"item": item_name})
-        
-        if inventory_df.empty:
-            return f"Item '{item_name}' is not in our inventory catalog."
-        
-        item_info = inventory_df.iloc[0]
-        min_stock = int(item_info["min_stock_level"])
-        unit_price = float(item_info["unit_price"])
-        
-        status = "ADEQUATE" if current_stock >= min_stock else "LOW - REORDER NEEDED"
-        
-        return (f"Item: {item_name}\n"
-                f"Current Stock: {current_stock} units\n"
-                f"Minimum Stock Level: {min_stock} units\n"
-                f"Unit Price: ${unit_price:.2f}\n"
-                f"Status: {status}")
-    
-    except Exception as e:
-        return f"Error checking inventory for {item_name}: {str(e)}"
+Each task gives the request date followed by the customer's request. Analyze
+the request and coordinate the appropriate agents to fulfill it."""
 
-@tool
-def get_all_inventory_tool(request_date: str) -> str:
-    """
-    Get a complete list of all items currently in stock.
-    
-    Args:
-        request_date: Date for the inventory snapshot (YYYY-MM-DD format)
-    
-    Returns:
-        String listing all items with their stock levels
-    """
-    try:
-        inventory_dict = get_all_inventory(request_date)
-        
-        if not inventory_dict:
-            return "No items currently in stock."
-        
-        result = "CURRENT INVENTORY:\n" + "="*50 + "\n"
-        for item, stock in sorted(inventory_dict.items()):
-            result += f"• {item}: {stock} units\n"
-        
-        return result
-    
-    except Exception as e:
-        return f"Error retrieving inventory: {str(e)}"
+# Every agent step and tool execution is recorded while a trace is open
+agent_tracer = AgentTracer()
+for agent_tool in AGENT_TOOLS.values():
+    agent_tracer.trace_tool(agent_tool)
+    # Tool calls on worker threads are profiled in their own sections
+    run_profiler.profile_tool(agent_tool)
 
-@tool
-def order_stock_tool(item_name: str, quantity: int, request_date: str) -> str:
-    """
-    Place an order with the supplier to restock an item.
-    
-    Args:
-        item_name: Name of the item to order
-        quantity: Quantity to order
-        request_date: Date of the order (YYYY-MM-DD format)
-    
-    Returns:
-        String confirming the order and delivery date
+def create_agents() -> Dict[str, ToolCallingAgent]:
     """
-    try:
-        # Get item price
-        inventory_df = pd.read_sql("SELECT * FROM inventory WHERE item_name = :item", 
-                                   db_engine, params={"item": item_name})
-        
-        if inventory_df.empty:
-            return f"Cannot order '{item_name}' - not in our catalog."
-        
-        unit_price = float(inventory_df.iloc[0]["unit_price"])
-        total_cost = quantity * unit_price
-        
-        # Check if we have enough cash
-        current_cash = get_cash_balance(request_date)
-        if current_cash < total_cost:
-            return (f"INSUFFICIENT FUNDS: Order costs ${total_cost:.2f} but only "
-                   f"${current_cash:.2f} available. Cannot place order.")
-        
-        # Create stock order transaction
-        transaction_id = create_transaction(
-            item_name=item_name,
-            transaction_type="stock_orders",
-            quantity=quantity,
-            price=total_cost,
-            date=request_date
-        )
-        
-        # Get delivery date
-        delivery_date = get_supplier_delivery_date(request_date, quantity)
-        
-        return (f"STOCK ORDER CONFIRMED\n"
-                f"Transaction ID: {transaction_id}\n"
-                f"Item: {item_name}\n"
-                f"Quantity: {quantity} units\n"
-                f"Total Cost: ${total_cost:.2f}\n"
-                f"Expected Delivery: {delivery_date}")
+    Build one set of specialist agents and the orchestrator that manages them.
     
-    except Exception as e:
-        return f"Error placing stock order: {str(e)}"
-
-@tool
-def search_quote_history_tool(search_terms: str, limit: int = 5) -> str:
+    smolagents agents keep the memory of their current run, so requests that
+    run concurrently each need their own set.
     """
-    Search historical quotes for similar requests.
-    
-    Args:
-        search_terms: Comma-separated search terms (e.g., "glossy,ceremony,cardstock")
-        limit: Maximum number of results to return
-    
-    Returns:
-        String with historical quote information
+    inventory_agent = ToolCallingAgent(
+        tools=[check_inventory_tool, get_all_inventory_tool, order_stock_tool, reorder_low_stock_tool,
+               get_delivery_estimate_tool],
+        model=model,
+        name="InventoryAgent",
+        description="Specialist in inventory management, stock checking, and reordering supplies.",
+        instructions=INVENTORY_INSTRUCTIONS
+    )
+    
+    quoting_agent = ToolCallingAgent(
+        tools=[search_quote_history_tool, quote_history_facets_tool, calculate_quote_tool, suggest_price_tool,
+               check_inventory_tool],
+        model=model,
+        name="QuotingAgent",
+        description="Specialist in generating competitive quotes based on historical data and current pricing.",
+        instructions=QUOTING_INSTRUCTIONS
+    )
+    
+    sales_agent = ToolCallingAgent(
+        tools=[check_stock_availability_tool, create_sale_tool, get_delivery_estimate_tool],
+        model=model,
+        name="SalesAgent",
+        description="Specialist in finalizing sales transactions and order fulfillment.",
+        instructions=SALES_INSTRUCTIONS
+    )
+    
+    orchestrator_agent = ToolCallingAgent(
+        tools=[],
+        model=orchestrator_model,
+        name="OrchestratorAgent",
+        description="Main coordinator that analyzes requests and delegates to specialist agents.",
+        managed_agents=[inventory_agent, quoting_agent, sales_agent],
+        instructions=ORCHESTRATOR_INSTRUCTIONS
+    )
+    
+    agents = {
+        "inventory": inventory_agent,
+        "quote": quoting_agent,
+        "sales": sales_agent,
+        "orchestrator": orchestrator_agent,
+    }
+    for agent in agents.values():
+        agent_tracer.trace_agent(agent)
+    return agents
+
+# Agents used by the synchronous path
+agents = create_agents()
+inventory_agent = agents["inventory"]
+quoting_agent = agents["quote"]
+sales_agent = agents["sales"]
+orchestrator_agent = agents["orchestrator"]
+
+def build_task(request: str, request_date: str) -> str:
+    """Per-request part of the prompt; kept short and placed after the static prefix."""
+    return f"Request date: {request_date}\n\nCustomer request:\n{request}"
+
+# Clear-cut requests skip the orchestrator and go straight to a specialist
+intent_router = IntentRouter()
+
+SPECIALIST_AGENTS = {
+    "inventory": inventory_agent,
+    "quote": quoting_agent,
+    "sales": sales_agent,
+}
+
+def process_customer_request(request: str, request_date: str, request_id: Optional[int] = None) -> str:
     """
-    try:
-        terms_list = [term.strip() for term in search_terms.split(",")]
-        quotes = search_quote_history(terms_list, limit)
-        
-        if not quotes:
-            return "No matching historical quotes found."
-        
-        result = f"FOUND {len(quotes)} SIMILAR HISTORICAL QUOTES:\n" + "="*60 + "\n"
-        
-        for i, quote in enumerate(quotes, 1):
-            result += f"\nQuote #{i}:\n"
-            result += f"  Event Type: {quote.get('event_type', 'N/A')}\n"
-            result += f"  Order Size: {quote.get('order_size', 'N/A')}\n"
-            result += f"  Total Amount: ${quote.get('total_amount', 0):.2f}\n"
-            result += f"  Explanation: {quote.get('quote_explanation', 'N/A')[:100]}...\n"
-        
-        return result
+    Process a customer request through the multi-agent system.
     
-    except Exception as e:
-        return f"Error searching quote history: {str(e)}"
-
-@tool
-def calculate_quote_tool(items_and_quantities: str, request_date: str) -> str:
-    """
-    Calculate a quote for requested items with bulk discounts.
+    Requests the intent router is confident about are dispatched directly to
+    the matching specialist agent; everything else goes through the orchestrator.
     
     Args:
-        items_and_quantities: Format "item1:qty1,item2:qty2" (e.g., "A4 paper:500,Cardstock:200")
-        request_date: Date of the quote request (YYYY-MM-DD format)
+        request: Customer's request text
+        request_date: Date of the request (YYYY-MM-DD format)
+        request_id: Identifies the request in the agent trace
     
     Returns:
-        Detailed quote with pricing breakdown and discounts
+        Response from the multi-agent system
     """
-    try:
-        # Parse items and quantities
-        items_list = []
-        for item_qty in items_and_quantities.split(","):
-            parts = item_qty.split(":")
-            if len(parts) == 2:
-                items_list.append((parts[0].strip(), int(parts[1].strip())))
-        
-        if not items_list:
-            return "Invalid format. Use: 'item1:qty1,item2:qty2'"
-        
-        quote_details = []
-        subtotal = 0.0
-        unavailable_items = []
-        
-        for item_name, quantity in items_list:
-            # Check if item exists in inventory
-            inventory_df = pd.read_sql("SELECT * FROM inventory WHERE item_name = :item", 
-                                       db_engine, params={"item": item_name})
-            
-            if inventory_df.empty:
-                unavailable_items.append(item_name)
-                continue
-            
-            unit_price = float(inventory_df.iloc[0]["unit_price"])
-            item_total = quantity * unit_price
-            subtotal += item_total
-            
-            quote_details.append({
-                "item": item_name,
-                "quantity": quantity,
-                "unit_price": unit_price,
-                "item_total": item_total
-            })
-        
-        # Apply bulk discounts
-        if subtotal >= 5000:
-            discount_rate = 0.15  # 15% for orders over $5000
-        elif subtotal >= 2000:
-            discount_rate = 0.10  # 10% for orders over $2000
-        elif subtotal >= 1000:
-            discount_rate = 0.05  # 5% for orders over $1000
-        else:
-            discount_rate = 0.0
-        
-        discount_amount = subtotal * discount_rate
-        total = subtotal - discount_amount
-        
-        # Format quote
-        result = "QUOTE DETAILS:\n" + "="*60 + "\n"
-        
-        for detail in quote_details:
-            result += (f"{detail['item']}: {detail['quantity']} units × "
-                      f"${detail['unit_price']:.2f} = ${detail['item_total']:.2f}\n")
-        
-        result += "\n" + "-"*60 + "\n"
-        result += f"Subtotal: ${subtotal:.2f}\n"
-        
-        if discount_rate > 0:
-            result += f"Bulk Discount ({discount_rate*100:.0f}%): -${discount_amount:.2f}\n"
-        
-        result += f"TOTAL: ${total:.2f}\n"
-        
-        if unavailable_items:
-            result += f"\nNOTE: The following items are not available: {', '.join(unavailable_items)}\n"
-        
-        return result
-    
-    except Exception as e:
-        return f"Error calculating quote: {str(e)}"
-
-@tool
-def check_stock_availability_tool(items_and_quantities: str, request_date: str) -> str:
+    decision = intent_router.classify(request)
+    route = decision.intent if decision.confident else "orchestrator"
+    agent = SPECIALIST_AGENTS.get(route, orchestrator_agent)
+    orchestrator_seconds_before = orchestrator_model.usage_stats()["generate_seconds"]
+    start = time.perf_counter()
+    
+    with agent_tracer.request(request_id, request, request_date, route) as trace:
+        try:
+            # Repeated stock lookups by any agent during this request hit the memo;
+            # first lookups of items named in the request are usually prefetched
+            with tool_memo_scope(), prefetch_scope(start_prefetch(request, request_date)):
+                response = str(agent.run(build_task(request, request_date)))
+        except Exception as e:
+            response = f"Error processing request: {str(e)}"
+        trace["response"] = response
+    
+    intent_router.record(
+        decision,
+        route=route,
+        elapsed_seconds=time.perf_counter() - start,
+        orchestrator_seconds=orchestrator_model.usage_stats()["generate_seconds"] - orchestrator_seconds_before,
+    )
+    return response
+
+# ==================== ASYNC EXECUTION ====================
+
+# Agent runs mostly wait on the model, so they get a pool sized for I/O rather
+# than asyncio's CPU-sized default executor
+agent_executor = ThreadPoolExecutor(max_workers=int(os.getenv("AGENT_THREADS", "32")),
+                                    thread_name_prefix="agent")
+
+async def run_agent(agent: ToolCallingAgent, task: str):
+    """Run a (synchronous) agent on the agent pool, keeping the caller's context (memo, trace)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(agent_executor, contextvars.copy_context().run, agent.run, task)
+
+# Research the orchestrator would otherwise request one specialist at a time;
+# neither sub-task writes to the ledger, so they can run side by side
+RESEARCH_TASKS = {
+    "inventory": "Check current stock and availability for every item in this request. "
+                 "Report levels and shortfalls only; do not place any orders.",
+    "quote": "Search the quote history for similar orders and calculate a quote for the items "
+             "in this request. Report the quote only; do not finalize a sale.",
+}
+
+def build_findings_task(request: str, request_date: str, findings: Dict[str, str]) -> str:
+    """Orchestrator task with the parallel research (source -> result) attached."""
+    sections = "\n\n".join(f"{source}:\n{text}" for source, text in findings.items())
+    return (f"{build_task(request, request_date)}\n\n"
+            f"Research already gathered for this request (do not ask for it again):\n\n{sections}")
+
+async def process_customer_request_async(request: str, request_date: str,
+                                         request_id: Optional[int] = None) -> str:
     """
-    Check if requested items are available in sufficient quantities.
+    Asynchronous version of process_customer_request.
+    
+    Routed requests go straight to their specialist. For orchestrated requests,
+    the inventory and quoting research run concurrently first and the
+    orchestrator receives both results, plus a stock snapshot read through
+    run_db, with its task, so it only has to decide and finalize. Agents run
+    on worker threads (smolagents is synchronous), each request on its own
+    agent instances.
     
     Args:
-        items_and_quantities: Format "item1:qty1,item2:qty2"
-        request_date: Date to check availability (YYYY-MM-DD format)
+        request: Customer's request text
+        request_date: Date of the request (YYYY-MM-DD format)
+        request_id: Identifies the request in the agent trace
     
     Returns:
-        Availability status for each item
+        Response from the multi-agent system
     """
-    try:
-        items_list = []
-        for item_qty in items_and_quantities.split(","):
-            parts = item_qty.split(":")
-            if len(parts) == 2:
-                items_list.append((parts[0].strip(), int(parts[1].strip())))
-        
-        result = "STOCK AVAILABILITY CHECK:\n" + "="*60 + "\n"
-        all_available = True
-        
-        for item_name, quantity in items_list:
-            stock_df = get_stock_level(item_name, request_date)
-            current_stock = int(stock_df["current_stock"].iloc[0])
-            
-            if current_stock >= quantity:
-                status = "✓ AVAILABLE"
-            else:
-                status = f"✗ INSUFFICIENT (only {current_stock} available)"
-                all_available = False
-            
-            result += f"{item_name}: Requested {quantity}, {status}\n"
-        
-        result += "\n" + "-"*60 + "\n"
-        result += "Overall Status: " + ("ORDER CAN BE FULFILLED" if all_available else "CANNOT FULFILL - INSUFFICIENT STOCK")
-        
-        return result
-    
-    except Exception as e:
-        return f"Error checking availability: {str(e)}"
-
-@tool
-def create_sale_tool(items_and_quantities: str, total_price: float, request_date: str) -> str:
+    decision = intent_router.classify(request)
+    route = decision.intent if decision.confident else "orchestrator"
+    request_agents = create_agents()
+    start = time.perf_counter()
+    orchestrator_seconds = 0.0
+    
+    with agent_tracer.request(request_id, request, request_date, route) as trace:
+        try:
+            # run_agent copies the context, so the worker threads share this memo and prefetch
+            with tool_memo_scope(), prefetch_scope(start_prefetch(request, request_date)):
+                task = build_task(request, request_date)
+                if route != "orchestrator":
+                    response = await run_agent(request_agents[route], task)
+                else:
+                    stock, *research = await asyncio.gather(
+                        run_db(get_all_inventory, request_date),
+                        *(run_agent(request_agents[key], f"{task}\n\n{instruction}")
+                          for key, instruction in RESEARCH_TASKS.items()),
+                    )
+                    findings = {request_agents[key].name: str(result)
+                                for key, result in zip(RESEARCH_TASKS, research)}
+                    findings["Stock snapshot"] = ", ".join(f"{item}: {units:.0f}"
+                                                           for item, units in sorted(stock.items()))
+                    orchestrator_start = time.perf_counter()
+                    response = await run_agent(request_agents["orchestrator"],
+                                               build_findings_task(request, request_date, findings))
+                    orchestrator_seconds = time.perf_counter() - orchestrator_start
+            response = str(response)
+        except Exception as e:
+            response = f"Error processing request: {str(e)}"
+        trace["response"] = response
+    
+    # The shared model's usage counters mix concurrent requests, so the
+    # orchestrator's share is its wall time here (including its delegations)
+    intent_router.record(decision, route=route, elapsed_seconds=time.perf_counter() - start,
+                         orchestrator_seconds=orchestrator_seconds)
+    return response
+
+async def process_customer_requests_async(requests: List[Tuple[Optional[int], str, str]],
+                                          max_concurrency: int = 4) -> List[str]:
     """
-    Finalize a sale by creating sales transactions and updating inventory.
-    
-    Args:
-        items_and_quantities: Format "item1:qty1,item2:qty2"
-        total_price: Total sale amount
-        request_date: Date of the sale (YYYY-MM-DD format)
+    Process (request_id, request, request_date) tuples concurrently in one event loop.
     
-    Returns:
-        Confirmation of the sale with transaction details
+    At most `max_concurrency` requests are in flight at a time; responses
+    are returned in input order.
     """
-    try:
-        items_list = []
-        for item_qty in items_and_quantities.split(","):
-            parts = item_qty.split(":")
-            if len(parts) == 2:
-                items_list.append((parts[0].strip(), int(parts[1].strip())))
-        
-        # First check if all items are available
-        for item_name, quantity in items_list:
-            stock_df = get_stock_level(item_name, request_date)
-            current_stock = int(stock_df["current_stock"].iloc[0])
-            
-            if current_stock < quantity:
-                return (f"SALE FAILED: Insufficient stock for {item_name}. "
-                       f"Requested: {quantity}, Available: {current_stock}")
-        
-        # Create sales transactions
-        transaction_ids = []
-        for item_name, quantity in items_list:
-            # Get unit price
-            inventory_df = pd.read_sql("SELECT * FROM inventory WHERE item_name = :item", 
-                                       db_engine, params={"item": item_name})
-            unit_price = float(inventory_df.iloc[0]["unit_price"])
-            item_price = quantity * unit_price
-            
-            trans_id = create_transaction(
-                item_name=item_name,
-                transaction_type="sales",
-                quantity=quantity,
-                price=item_price,
-                date=request_date
-            )
-            transaction_ids.append(trans_id)
-        
-        # Get delivery estimate
-        total_quantity = sum(qty for _, qty in items_list)
-        delivery_date = get_supplier_delivery_date(request_date, total_quantity)
-        
-        result = "SALE COMPLETED SUCCESSFULLY!\n" + "="*60 + "\n"
-        result += f"Transaction IDs: {', '.join(map(str, transaction_ids))}\n"
-        result += f"Total Amount: ${total_price:.2f}\n"
-        result += f"Estimated Delivery: {delivery_date}\n"
-        result += "\nItems Sold:\n"
-        
-        for item_name, quantity in items_list:
-            result += f"  • {item_name}: {quantity} units\n"
-        
-        return result
+    semaphore = asyncio.Semaphore(max_concurrency)
     
-    except Exception as e:
-        return f"Error creating sale: {str(e)}"
+    async def bounded(request_id, request, request_date):
+        async with semaphore:
+            return await process_customer_request_async(request, request_date, request_id=request_id)
+    
+    return await asyncio.gather(*(bounded(*r) for r in requests))
 
-@tool
-def get_delivery_estimate_tool(quantity: int, request_date: str) -> str:
+async def process_warehouse_requests_async(requests: List[Tuple[Optional[int], str, str, str]]) -> List[str]:
     """
-    Get estimated delivery date based on order quantity.
-    
-    Args:
-        quantity: Total quantity of items in the order
-        request_date: Order date (YYYY-MM-DD format)
+    Process (request_id, request, request_date, warehouse) tuples, one queue per warehouse.
     
-    Returns:
-        Estimated delivery date
+    Each warehouse works through its requests in order inside its own
+    warehouse_scope, so its stock checks and sales go to its shard; the
+    warehouses run concurrently. Responses are returned in input order.
     """
-    try:
-        delivery_date = get_supplier_delivery_date(request_date, quantity)
-        
-        if quantity <= 10:
-            timeframe = "same day"
-        elif quantity <= 100:
-            timeframe = "1 business day"
-        elif quantity <= 1000:
-            timeframe = "4 business days"
-        else:
-            timeframe = "7 business days"
-        
-        return f"Estimated Delivery: {delivery_date} ({timeframe})"
+    queues: Dict[str, List] = {}
+    for position, (request_id, request, request_date, warehouse) in enumerate(requests):
+        queues.setdefault(warehouse, []).append((position, request_id, request, request_date))
+    responses: List[Optional[str]] = [None] * len(requests)
     
-    except Exception as e:
-        return f"Error estimating delivery: {str(e)}"
-
-# ==================== MULTI-AGENT SYSTEM ====================
-
-# Initialize the LLM model
-api_key = os.getenv("UDACITY_OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("UDACITY_OPENAI_API_KEY not found in environment variables")
-
-model = LiteLLMModel(
-    model_id="openai/gpt-4o-mini",
-    api_key=api_key,
-    api_base="https://openai.vocareum.com/v1"
-)
-
-# Create specialist agents
-
-inventory_agent = ToolCallingAgent(
-    tools=[check_inventory_tool, get_all_inventory_tool, order_stock_tool, get_delivery_estimate_tool],
-    model=model,
-    name="InventoryAgent",
-    description="Specialist in inventory management, stock checking, and reordering supplies."
-)
-
-quoting_agent = ToolCallingAgent(
-    tools=[search_quote_history_tool, calculate_quote_tool, check_inventory_tool],
-    model=model,
-    name="QuotingAgent",
-    description="Specialist in generating competitive quotes based on historical data and current pricing."
-)
+    async def drain(warehouse, queue):
+        with warehouse_scope(warehouse):
+            for position, request_id, request, request_date in queue:
+                responses[position] = await process_customer_request_async(request, request_date,
+                                                                            request_id=request_id)
+    
+    await asyncio.gather(*(drain(warehouse, queue) for warehouse, queue in queues.items()))
+    return responses
 
-sales_agent = ToolCallingAgent(
-    tools=[check_stock_availability_tool, create_sale_tool, get_delivery_estimate_tool],
-    model=model,
-    name="SalesAgent",
-    description="Specialist in finalizing sales transactions and order fulfillment."
-)
+# ==================== TEST EXECUTION ====================
 
-# Create orchestrator agent
-orchestrator_agent = ToolCallingAgent(
-    tools=[],
-    model=model,
-    name="OrchestratorAgent",
-    description="Main coordinator that analyzes requests and delegates to specialist agents.",
-    managed_agents=[inventory_agent, quoting_agent, sales_agent]
-)
+RESULTS_PATH = "results/test_results.csv"
 
-def process_customer_request(request: str, request_date: str) -> str:
+def run_test_scenarios(resume: bool = False, sinks: tuple = (),
+                       trace_path: Optional[str] = DEFAULT_TRACE_PATH, concurrency: int = 1,
+                       profile_dir: Optional[str] = None, profile_top: int = 20,
+                       warehouses: Tuple[str, ...] = ()) -> Optional[str]:
     """
-    Process a customer request through the multi-agent system.
+    Execute test scenarios using the multi-agent system.
+    
+    Results are streamed to RESULTS_PATH as each request completes. With
+    `resume=True`, requests recorded in the checkpoint are skipped and the
+    ledger is rolled back to the last checkpointed transaction instead of
+    being re-initialized.
+    
+    With `concurrency` > 1, requests that share a request date are processed
+    concurrently (at most `concurrency` at a time) in one event loop; dates
+    are still processed in order.
+    
+    With `warehouses`, each warehouse's ledger is kept in its own SQLite
+    file and requests are assigned to warehouses round-robin. Same-day
+    requests for different warehouses run concurrently, each warehouse's in
+    order; the reports add up every warehouse.
     
     Args:
-        request: Customer's request text
-        request_date: Date of the request (YYYY-MM-DD format)
+        resume: Continue a previous run from its checkpoint
+        sinks: Extra result formats to write alongside the CSV ("jsonl", "parquet")
+        trace_path: Where to record agent steps and tool calls for replay (None disables)
+        concurrency: Maximum number of same-day requests in flight at once
+        profile_dir: Profile the local (non-model) work and write profile.pstats and
+            profile.collapsed here (None disables)
+        profile_top: Number of hot functions to print when profiling
+        warehouses: Warehouse names to shard the inventory over (empty: one ledger)
     
     Returns:
-        Response from the multi-agent system
+        Path of the results CSV, or None if the test data could not be loaded
     """
-    # Enhanced prompt for the orchestrator
-    system_prompt = f"""You are the Orchestrator Agent for Beaver's Choice Paper Company.
-    
-Your role is to analyze customer requests and coordinate with specialist agents:
-- InventoryAgent: For checking stock, reordering supplies
-- QuotingAgent: For generating price quotes
-- SalesAgent: For finalizing orders and sales
-
-Current date: {request_date}
-
-IMPORTANT GUIDELINES:
-1. For quote requests: Use QuotingAgent to search history and calculate quotes
-2. For inventory questions: Use InventoryAgent to check stock levels
-3. For order placement: Use SalesAgent to verify availability and create sales
-4. If stock is low after a sale, use InventoryAgent to reorder
-5. Always provide clear, professional responses to customers
-6. Include relevant details like pricing, delivery dates, and availability
-
-Analyze the following request and coordinate the appropriate agents to fulfill it:
-
-{request}
-"""
-    
-    try:
-        response = orchestrator_agent.run(system_prompt)
-        return str(response)
-    except Exception as e:
-        return f"Error processing request: {str(e)}"
-
-# ==================== TEST EXECUTION ====================
-
-def run_test_scenarios():
-    """Execute test scenarios using the multi-agent system."""
     print("="*80)
     print("BEAVER'S CHOICE PAPER COMPANY - MULTI-AGENT SYSTEM")
     print("="*80)
-    print("\nInitializing Database...")
-    init_database(db_engine)
+    
+    if profile_dir:
+        run_profiler.start()
+    writer = ResultsWriter(RESULTS_PATH, sinks=sinks, resume=resume)
+    reset_model_usage()
+    intent_router.decisions.clear()
+    if trace_path:
+        agent_tracer.open(trace_path, append=writer.resumed)
+    if warehouses:
+        use_warehouse_shards(list(warehouses))
+    
+    if writer.resumed:
+        discarded = discard_transactions_after(writer.last_transaction_id)
+        print(f"\nResuming run: {len(writer.processed_ids)} requests already processed, "
+              f"{discarded} uncommitted transactions discarded.")
+    else:
+        print("\nInitializing Database...")
+        init_database(db_engine)
     
     try:
         quote_requests_sample = pd.read_csv("data/quote_requests_sample.csv")
@@ -808,6 +481,9 @@ def run_test_scenarios():
         quote_requests_sample = quote_requests_sample.sort_values("request_date")
     except Exception as e:
         print(f"FATAL: Error loading test data: {e}")
+        writer.close()
+        agent_tracer.close()
+        run_profiler.stop(profile_dir or "", profile_top)
         return
     
     # Get initial state
@@ -822,61 +498,99 @@ def run_test_scenarios():
     print(f"  Total Assets: ${current_cash + current_inventory:,.2f}")
     print("\n" + "="*80)
     
-    results = []
-    
-    for idx, row in quote_requests_sample.iterrows():
-        request_date = row["request_date"].strftime("%Y-%m-%d")
-        
-        print(f"\n{'='*80}")
-        print(f"REQUEST #{idx+1}")
-        print(f"{'='*80}")
-        print(f"Context: {row['job']} organizing {row['event']}")
-        print(f"Order Size: {row['need_size']}")
-        print(f"Request Date: {request_date}")
-        print(f"Current Cash: ${current_cash:,.2f}")
-        print(f"Current Inventory Value: ${current_inventory:,.2f}")
-        print(f"\nCustomer Request:\n{row['request']}")
-        print(f"\n{'-'*80}")
-        print("Processing request through multi-agent system...")
-        print(f"{'-'*80}\n")
-        
-        # Process request with date context
-        request_with_date = f"{row['request']}\n\n[Request Date: {request_date}]"
-        response = process_customer_request(request_with_date, request_date)
-        
-        # Update financial state
-        report = generate_financial_report(request_date)
-        new_cash = report["cash_balance"]
-        new_inventory = report["inventory_value"]
-        
-        cash_change = new_cash - current_cash
-        inventory_change = new_inventory - current_inventory
-        
-        print(f"\nAGENT RESPONSE:")
-        print(f"{'-'*80}")
-        print(response)
-        print(f"{'-'*80}")
-        
-        print(f"\nFINANCIAL UPDATE:")
-        print(f"  Cash Balance: ${new_cash:,.2f} (Change: ${cash_change:+,.2f})")
-        print(f"  Inventory Value: ${new_inventory:,.2f} (Change: ${inventory_change:+,.2f})")
-        print(f"  Total Assets: ${new_cash + new_inventory:,.2f}")
-        
-        current_cash = new_cash
-        current_inventory = new_inventory
+    if writer.resumed:
+        current_cash = writer.checkpoint["cash_balance"]
+        current_inventory = writer.checkpoint["inventory_value"]
+    
+    pending = [(idx, row) for idx, row in quote_requests_sample.iterrows()
+               if idx + 1 not in writer.processed_ids]
+    parallel = concurrency > 1 or bool(warehouses)
+    if parallel:
+        batches = [list(group) for _, group in itertools.groupby(pending, key=lambda item: item[1]["request_date"])]
+        loop = asyncio.new_event_loop()
+    if concurrency > 1 and not warehouses:
+        # Same-day sales and stock orders from concurrent requests share commits
+        commit_queue = enable_group_commit()
+    if not parallel:
+        batches = [[item] for item in pending]
+    
+    for batch in batches:
+        for idx, row in batch:
+            request_date = row["request_date"].strftime("%Y-%m-%d")
+            
+            print(f"\n{'='*80}")
+            print(f"REQUEST #{idx+1}")
+            print(f"{'='*80}")
+            print(f"Context: {row['job']} organizing {row['event']}")
+            print(f"Order Size: {row['need_size']}")
+            print(f"Request Date: {request_date}")
+            if warehouses:
+                print(f"Warehouse: {warehouses[idx % len(warehouses)]}")
+            print(f"Current Cash: ${current_cash:,.2f}")
+            print(f"Current Inventory Value: ${current_inventory:,.2f}")
+            print(f"\nCustomer Request:\n{row['request']}")
+            print(f"\n{'-'*80}")
+            print("Processing request through multi-agent system...")
+            print(f"{'-'*80}\n")
+        
+        # Process requests with date context
+        requests = [(idx + 1, row["request"], row["request_date"].strftime("%Y-%m-%d")) for idx, row in batch]
+        if warehouses:
+            with run_profiler.paused(model_wait=False):
+                responses = loop.run_until_complete(process_warehouse_requests_async(
+                    [(*request, warehouses[(request[0] - 1) % len(warehouses)]) for request in requests]
+                ))
+        elif concurrency > 1:
+            # The agents run (and profile their tool calls) on worker threads
+            with run_profiler.paused(model_wait=False):
+                responses = loop.run_until_complete(process_customer_requests_async(requests, concurrency))
+        else:
+            responses = [process_customer_request(request, request_date, request_id=request_id)
+                         for request_id, request, request_date in requests]
         
-        results.append({
-            "request_id": idx + 1,
-            "request_date": request_date,
-            "job": row['job'],
-            "event": row['event'],
-            "need_size": row['need_size'],
-            "cash_balance": current_cash,
-            "inventory_value": current_inventory,
-            "response": response,
-        })
+        results = []
+        for (idx, row), response in zip(batch, responses):
+            request_date = row["request_date"].strftime("%Y-%m-%d")
+            
+            # Update financial state
+            report = generate_financial_report(request_date)
+            new_cash = report["cash_balance"]
+            new_inventory = report["inventory_value"]
+            
+            cash_change = new_cash - current_cash
+            inventory_change = new_inventory - current_inventory
+            
+            print(f"\nAGENT RESPONSE (REQUEST #{idx+1}):")
+            print(f"{'-'*80}")
+            print(response)
+            print(f"{'-'*80}")
+            
+            print(f"\nFINANCIAL UPDATE:")
+            print(f"  Cash Balance: ${new_cash:,.2f} (Change: ${cash_change:+,.2f})")
+            print(f"  Inventory Value: ${new_inventory:,.2f} (Change: ${inventory_change:+,.2f})")
+            print(f"  Total Assets: ${new_cash + new_inventory:,.2f}")
+            
+            current_cash = new_cash
+            current_inventory = new_inventory
+            
+            results.append({
+                "request_id": idx + 1,
+                "request_date": request_date,
+                "job": row['job'],
+                "event": row['event'],
+                "need_size": row['need_size'],
+                "cash_balance": current_cash,
+                "inventory_value": current_inventory,
+                "response": response,
+            })
         
-        time.sleep(2)  # Rate limiting
+        # The batch's requests ran together, so the ledger's last id only covers
+        # exactly these requests once all of them are done: checkpoint them as one
+        writer.write_batch(results, last_transaction_id=get_last_transaction_id())
+    
+    if parallel:
+        loop.close()
+    disable_group_commit()
     
     # Final report
     print(f"\n{'='*80}")
@@ -889,18 +603,73 @@ def run_test_scenarios():
     print(f"Final Cash Balance: ${final_report['cash_balance']:,.2f}")
     print(f"Final Inventory Value: ${final_report['inventory_value']:,.2f}")
     print(f"Total Assets: ${final_report['total_assets']:,.2f}")
+    for warehouse, totals in final_report.get("warehouses", {}).items():
+        print(f"  {warehouse}: {totals['units_on_hand']:,.0f} units, ${totals['inventory_value']:,.2f} inventory")
     
     print(f"\nTop Selling Products:")
     for i, product in enumerate(final_report['top_selling_products'], 1):
         print(f"  {i}. {product['item_name']}: ${product['total_revenue']:,.2f} revenue")
     
-    # Save results
-    results_df = pd.DataFrame(results)
-    results_df.to_csv("results/test_results.csv", index=False)
-    print(f"\nResults saved to 'results/test_results.csv'")
+    usage = get_model_usage()
+    cache_rate = usage["cached_input_tokens"] / usage["input_tokens"] if usage["input_tokens"] else 0.0
+    print(f"\nToken Usage: {usage['input_tokens']:,} input "
+          f"({usage['cached_input_tokens']:,} cached, {usage['uncached_input_tokens']:,} uncached, "
+          f"{cache_rate:.0%} cache hit), {usage['output_tokens']:,} output")
+    
+    routing = intent_router.stats()
+    saved = routing["estimated_seconds_saved"]
+    print(f"\nRouting: {routing['direct']} direct, {routing['orchestrated']} via orchestrator "
+          f"({routing['routes']}), classifier {routing['mean_classify_us']:.0f}µs/request, "
+          f"est. latency saved: {'n/a' if saved is None else f'{saved:.1f}s'}")
+    
+    print(f"Tool Memo: {memo_totals['hits']} hits, {memo_totals['misses']} misses, "
+          f"{memo_totals['invalidations']} entries invalidated by writes")
+    print(f"Prefetch: {prefetch_totals['hits']} hits on {prefetch_totals['warmed']} warmed entries, "
+          f"{prefetch_totals['invalidations']} invalidated by writes")
+    reports = report_cache.stats()
+    print(f"Report Cache: {reports['hits']} hits, {reports['misses']} misses, "
+          f"{reports['evictions']} evicted")
+    if concurrency > 1 and not warehouses:
+        commits = commit_queue.stats()
+        print(f"Group Commit: {commits['rows']} transactions in {commits['batches']} commits")
+    
+    limiter_stats = rate_limiter.stats()
+    print(f"\nModel Calls: {limiter_stats['calls']} "
+          f"(retries: {limiter_stats['retries']}, "
+          f"rate-limit wait: {limiter_stats['total_wait_seconds']:.1f}s, "
+          f"backoff: {limiter_stats['total_backoff_seconds']:.1f}s)")
+    
+    writer.close()
+    agent_tracer.close()
+    if profile_dir:
+        run_profiler.stop(profile_dir, profile_top)
+    print(f"\nResults saved to '{RESULTS_PATH}'")
+    if trace_path:
+        print(f"Agent trace saved to '{trace_path}' (replay: python agent_trace.py replay {trace_path})")
     print(f"{'='*80}\n")
     
-    return results
+    return RESULTS_PATH
 
 if __name__ == "__main__":
-    results = run_test_scenarios()
+    parser = argparse.ArgumentParser(description="Run the Beaver's Choice test scenarios.")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip requests already recorded in the results checkpoint")
+    parser.add_argument("--sink", action="append", default=[], choices=sorted(SUPPORTED_SINKS),
+                        help="also write results in this format (repeatable)")
+    parser.add_argument("--trace", default=DEFAULT_TRACE_PATH,
+                        help="JSONL file for the replayable agent trace")
+    parser.add_argument("--no-trace", action="store_true", help="do not record an agent trace")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="process up to N same-day requests concurrently (asyncio path)")
+    parser.add_argument("--profile", nargs="?", const="results/profile", default=None, metavar="DIR",
+                        help="profile local (non-model) work; write pstats and collapsed stacks to DIR")
+    parser.add_argument("--profile-top", type=int, default=20,
+                        help="number of hot functions to print with --profile")
+    parser.add_argument("--warehouses", default="",
+                        help="comma-separated warehouse names; shard the inventory and run them in parallel")
+    args = parser.parse_args()
+    results_path = run_test_scenarios(resume=args.resume, sinks=tuple(args.sink),
+                                      trace_path=None if args.no_trace else args.trace,
+                                      concurrency=args.concurrency, profile_dir=args.profile,
+                                      profile_top=args.profile_top,
+                                      warehouses=tuple(w.strip() for w in args.warehouses.split(",") if w.strip()))
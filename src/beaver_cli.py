@@ -0,0 +1,202 @@
+"""
+Beaver's Choice Paper Company - Command Line
+Query and maintain the database without loading the agents.
+
+The read-only commands (stock, cash, report, search-quotes, quote-facets)
+import only the database helpers, so they never create the LLM client or
+the agents, and they print JSON for scripting. `run` loads the agent stack
+and runs the test scenarios.
+
+A database initialized with warehouse shards (`init --warehouses` or
+`run --warehouses`) records them, and the read-only commands open the
+shards to read the ledger; `--warehouse` limits stock and report to one.
+
+Usage:
+    python beaver_cli.py init --seed 137
+    python beaver_cli.py init --warehouses north,south,east
+    python beaver_cli.py stock --as-of 2025-04-15 --warehouse north
+    python beaver_cli.py stock --as-of 2025-04-15 [--item "A4 paper"]
+    python beaver_cli.py cash --as-of 2025-04-15
+    python beaver_cli.py report --as-of 2025-04-15
+    python beaver_cli.py search-quotes cardstock ceremony --order-size large
+    python beaver_cli.py run --concurrency 4
+    python beaver_cli.py run --warehouses north,south,east
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+from sqlalchemy import create_engine
+
+import beaver_db
+from ledger_backends import warehouse_scope
+from results_writer import SUPPORTED_SINKS
+
+DEFAULT_DB = "munder_difflin.db"
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def emit(payload, indent=None) -> None:
+    json.dump(payload, sys.stdout, default=_json_default, indent=indent)
+    sys.stdout.write("\n")
+
+
+def parse_warehouses(value: str) -> list:
+    return [w.strip() for w in value.split(",") if w.strip()]
+
+
+def cmd_init(args) -> dict:
+    if args.warehouses:
+        beaver_db.use_warehouse_shards(parse_warehouses(args.warehouses))
+    beaver_db.init_database(beaver_db.db_engine, seed=args.seed, coverage=args.coverage,
+                            data_dir=args.data_dir, source_format=args.format)
+    return {
+        "database": args.db,
+        "seed": args.seed,
+        "warehouses": beaver_db.recorded_warehouses(beaver_db.db_engine),
+        "items_stocked": len(beaver_db.get_all_inventory(date.today().isoformat())),
+        "last_transaction_id": beaver_db.get_last_transaction_id(),
+    }
+
+
+def cmd_stock(args) -> dict:
+    with warehouse_scope(args.warehouse):
+        return _stock(args)
+
+
+def _stock(args) -> dict:
+    if args.item:
+        stock = {item: beaver_db.get_stock_level(item, args.as_of)["current_stock"].iloc[0]
+                 for item in args.item}
+    else:
+        stock = beaver_db.get_all_inventory(args.as_of)
+    return {"as_of_date": args.as_of, "warehouse": args.warehouse, "stock": stock}
+
+
+def cmd_cash(args) -> dict:
+    return {"as_of_date": args.as_of, "cash_balance": beaver_db.get_cash_balance(args.as_of)}
+
+
+def cmd_report(args) -> dict:
+    with warehouse_scope(args.warehouse):
+        return beaver_db.generate_financial_report(args.as_of)
+
+
+def cmd_search_quotes(args) -> dict:
+    quotes = beaver_db.search_quote_history(args.terms, args.limit, args.job_type,
+                                            args.order_size, args.event_type)
+    return {"terms": args.terms, "quotes": quotes}
+
+
+def cmd_quote_facets(args) -> dict:
+    return beaver_db.quote_facet_summary(args.job_type, args.order_size, args.event_type)
+
+
+def cmd_run(args) -> dict:
+    # Only this command pays for the LLM client and the agents
+    import beaver_choice_multi_agent
+
+    results_path = beaver_choice_multi_agent.run_test_scenarios(
+        resume=args.resume, sinks=tuple(args.sink), trace_path=None if args.no_trace else args.trace,
+        concurrency=args.concurrency, profile_dir=args.profile, profile_top=args.profile_top,
+        warehouses=tuple(parse_warehouses(args.warehouses)),
+    )
+    return {"results": results_path}
+
+
+def add_facet_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--job-type", help='e.g. "office manager"')
+    parser.add_argument("--order-size", help="small, medium or large")
+    parser.add_argument("--event-type", help='e.g. "ceremony"')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Query the Beaver's Choice database without the agents.")
+    parser.add_argument("--db", default=DEFAULT_DB, help="SQLite database file")
+    parser.add_argument("--indent", type=int, default=None, help="pretty-print the JSON output")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    today = date.today().isoformat()
+
+    init_parser = subparsers.add_parser("init", help="(re)create the database from the seed data")
+    init_parser.add_argument("--seed", type=int, default=137)
+    init_parser.add_argument("--coverage", type=float, default=0.4,
+                             help="fraction of the catalogue seeded with stock")
+    init_parser.add_argument("--data-dir", default=beaver_db.DATA_DIR)
+    init_parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    init_parser.add_argument("--warehouses", default="", help="comma-separated warehouse names to shard over")
+    init_parser.set_defaults(handler=cmd_init)
+
+    stock_parser = subparsers.add_parser("stock", help="stock on hand (all items in stock, or --item)")
+    stock_parser.add_argument("--as-of", default=today)
+    stock_parser.add_argument("--item", action="append", help="report this item (repeatable)")
+    stock_parser.add_argument("--warehouse", help="only this warehouse (sharded databases)")
+    stock_parser.set_defaults(handler=cmd_stock)
+
+    cash_parser = subparsers.add_parser("cash", help="cash balance")
+    cash_parser.add_argument("--as-of", default=today)
+    cash_parser.set_defaults(handler=cmd_cash)
+
+    report_parser = subparsers.add_parser("report", help="financial report")
+    report_parser.add_argument("--as-of", default=today)
+    report_parser.add_argument("--warehouse", help="only this warehouse (sharded databases)")
+    report_parser.set_defaults(handler=cmd_report)
+
+    search_parser = subparsers.add_parser("search-quotes", help="search the quote history")
+    search_parser.add_argument("terms", nargs="*", help="words every quote must mention")
+    search_parser.add_argument("--limit", type=int, default=5)
+    add_facet_arguments(search_parser)
+    search_parser.set_defaults(handler=cmd_search_quotes)
+
+    facets_parser = subparsers.add_parser("quote-facets", help="quote counts and average totals by facet")
+    add_facet_arguments(facets_parser)
+    facets_parser.set_defaults(handler=cmd_quote_facets)
+
+    run_parser = subparsers.add_parser("run", help="run the test scenarios through the agents")
+    run_parser.add_argument("--resume", action="store_true")
+    run_parser.add_argument("--sink", action="append", default=[], choices=sorted(SUPPORTED_SINKS))
+    run_parser.add_argument("--trace", default="results/agent_trace.jsonl")
+    run_parser.add_argument("--no-trace", action="store_true")
+    run_parser.add_argument("--concurrency", type=int, default=1)
+    run_parser.add_argument("--profile", nargs="?", const="results/profile", default=None, metavar="DIR")
+    run_parser.add_argument("--profile-top", type=int, default=20, help="hot functions to print with --profile")
+    run_parser.add_argument("--warehouses", default="", help="comma-separated warehouse names to shard over")
+    run_parser.set_defaults(handler=cmd_run)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command not in ("init", "run") and not os.path.exists(args.db):
+        emit({"error": f"database {args.db!r} not found; create it with 'init'"}, args.indent)
+        return 1
+    beaver_db.set_db_engine(create_engine(f"sqlite:///{args.db}"))
+    start = time.perf_counter()
+    warehouses = [] if args.command in ("init", "run") else beaver_db.recorded_warehouses(beaver_db.db_engine)
+    if warehouses:
+        beaver_db.use_warehouse_shards(warehouses)
+    if getattr(args, "warehouse", None) and args.warehouse not in warehouses:
+        emit({"error": f"warehouse {args.warehouse!r} not found (database warehouses: {warehouses})"},
+             args.indent)
+        return 1
+    try:
+        payload = args.handler(args)
+    except Exception as e:
+        emit({"error": f"{type(e).__name__}: {e}"}, args.indent)
+        return 1
+    payload["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    emit(payload, args.indent)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
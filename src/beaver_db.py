@@ -0,0 +1,1067 @@
+"""
+Beaver's Choice Paper Company - Database Helpers
+Ledger, inventory and quote-history helpers shared by the agents, the
+simulation and reporting code. Importing this module does not load the LLM
+or the agent stack.
+"""
+
+import pandas as pd
+import numpy as np
+import os
+import ast
+import asyncio
+import functools
+import itertools
+import copy
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.sql import text
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Union
+from sqlalchemy import create_engine, Engine
+from sqlalchemy.pool import SingletonThreadPool
+from catalogue import Catalogue, default_catalogue
+from group_commit import GroupCommitQueue
+from tool_memo import invalidate_items, is_prefetched, prefetched
+from ledger_backends import LedgerBackend, SQLiteLedger, ShardedLedger, current_warehouse, warehouse_scope
+from prepared_queries import PreparedQueries
+from pricing_model import PricingModel, fit_from_tables, load_model, save_model
+
+# Create an SQLite database
+db_engine = create_engine("sqlite:///munder_difflin.db")
+
+# Dense integer SKU ids for catalogue items (filled from paper_supplies below, or
+# from the items table of the database); the ledger and inventory store SKUs
+catalogue: Catalogue = default_catalogue
+
+# Storage for the transactions ledger (catalogue and quote history stay in db_engine)
+ledger_backend: LedgerBackend = SQLiteLedger(db_engine, catalogue)
+
+# Tuple/scalar lookups against db_engine that bypass pandas (see prepared_queries.py)
+queries = PreparedQueries(db_engine)
+
+# Bumped by every change to the ledger (or to the database it lives in); results
+# cached under an older version can never be served again
+ledger_version = 0
+_ledger_version_lock = threading.Lock()
+
+# Held from a sale's availability check to its commit by every seller (create_sale_tool,
+# the HTTP service's order batches), so two sales cannot both promise the same units
+sale_lock = threading.RLock()
+
+# When set (enable_group_commit), transaction inserts are committed in shared
+# batches by one writer thread
+write_queue: Optional[GroupCommitQueue] = None
+
+# Bundled CSVs (quote_requests.csv, quotes.csv) for callers that are not run from data/
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "data")
+
+def set_db_engine(engine: Engine) -> Engine:
+    """Point the helper functions at another database, e.g. an isolated simulation DB."""
+    global db_engine, ledger_backend, queries
+    _drain_writes()
+    db_engine = engine
+    queries.close()
+    queries = PreparedQueries(engine)
+    load_catalogue(engine)
+    if isinstance(ledger_backend, SQLiteLedger):
+        ledger_backend.queries.close()
+        ledger_backend = SQLiteLedger(engine, catalogue)
+    ledger_changed()
+    invalidate_items()
+    invalidate_pricing_model()
+    return engine
+
+def ledger_changed() -> int:
+    """Record a ledger change: bump ledger_version and drop the availability index."""
+    global ledger_version
+    with _ledger_version_lock:
+        ledger_version += 1
+    invalidate_availability_index()
+    return ledger_version
+
+def set_ledger_backend(backend: LedgerBackend) -> LedgerBackend:
+    """Store transactions in `backend` (e.g. a NumpyLedger for simulations)."""
+    global ledger_backend
+    _drain_writes()
+    ledger_backend = backend
+    ledger_changed()
+    invalidate_items()
+    return backend
+
+def use_warehouse_shards(warehouses: List[str]) -> ShardedLedger:
+    """
+    Keep each warehouse's ledger in its own SQLite file next to the database
+    (munder_difflin_<warehouse>.db; in memory for an in-memory database).
+    Existing shard files are reopened; init_database seeds them.
+    """
+    database = db_engine.url.database
+    if database in (None, "", ":memory:"):
+        engines = {warehouse: create_engine("sqlite://") for warehouse in warehouses}
+    else:
+        root = os.path.splitext(database)[0]
+        engines = {warehouse: create_engine(f"sqlite:///{root}_{warehouse}.db") for warehouse in warehouses}
+    return set_ledger_backend(ShardedLedger(engines, catalogue))
+
+def load_catalogue(engine: Engine) -> Catalogue:
+    """Number items as the `items` table of `engine` does (paper_supplies order if it has none)."""
+    with engine.connect() as conn:
+        has_items = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'items'"
+        ).first() is not None
+    if has_items:
+        catalogue.load_frame(pd.read_sql("SELECT item_id, item_name, category, unit_price FROM items", engine))
+    else:
+        catalogue.reset(paper_supplies)
+    return catalogue
+
+def recorded_warehouses(engine: Engine) -> List[str]:
+    """Warehouses the database was sharded over by init_database (empty if it is not sharded)."""
+    with engine.connect() as conn:
+        if conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'warehouses'"
+        ).first() is None:
+            return []
+        return [row[0] for row in conn.exec_driver_sql("SELECT warehouse FROM warehouses ORDER BY rowid")]
+
+def split_inventory(inventory_df: pd.DataFrame, warehouses: List[str]) -> pd.DataFrame:
+    """
+    Spread each item's stock and minimum level over the warehouses, adding a
+    warehouse column. Earlier warehouses take the remainders, so the company
+    totals are unchanged. Every warehouse keeps a row for every item, even
+    with no stock of it.
+    """
+    n = len(warehouses)
+    shares = []
+    for i, warehouse in enumerate(warehouses):
+        share = inventory_df.copy()
+        for column in ("current_stock", "min_stock_level"):
+            share[column] = inventory_df[column] // n + (inventory_df[column] % n > i)
+        share["warehouse"] = warehouse
+        shares.append(share)
+    return pd.concat(shares, ignore_index=True)
+
+# List containing the different kinds of papers 
+paper_supplies = [
+    # Paper Types (priced per sheet unless specified)
+    {"item_name": "A4 paper",                         "category": "paper",        "unit_price": 0.05},
+    {"item_name": "Letter-sized paper",              "category": "paper",        "unit_price": 0.06},
+    {"item_name": "Cardstock",                        "category": "paper",        "unit_price": 0.15},
+    {"item_name": "Colored paper",                    "category": "paper",        "unit_price": 0.10},
+    {"item_name": "Glossy paper",                     "category": "paper",        "unit_price": 0.20},
+    {"item_name": "Matte paper",                      "category": "paper",        "unit_price": 0.18},
+    {"item_name": "Recycled paper",                   "category": "paper",        "unit_price": 0.08},
+    {"item_name": "Eco-friendly paper",               "category": "paper",        "unit_price": 0.12},
+    {"item_name": "Poster paper",                     "category": "paper",        "unit_price": 0.25},
+    {"item_name": "Banner paper",                     "category": "paper",        "unit_price": 0.30},
+    {"item_name": "Kraft paper",                      "category": "paper",        "unit_price": 0.10},
+    {"item_name": "Construction paper",               "category": "paper",        "unit_price": 0.07},
+    {"item_name": "Wrapping paper",                   "category": "paper",        "unit_price": 0.15},
+    {"item_name": "Glitter paper",                    "category": "paper",        "unit_price": 0.22},
+    {"item_name": "Decorative paper",                 "category": "paper",        "unit_price": 0.18},
+    {"item_name": "Letterhead paper",                 "category": "paper",        "unit_price": 0.12},
+    {"item_name": "Legal-size paper",                 "category": "paper",        "unit_price": 0.08},
+    {"item_name": "Crepe paper",                      "category": "paper",        "unit_price": 0.05},
+    {"item_name": "Photo paper",                      "category": "paper",        "unit_price": 0.25},
+    {"item_name": "Uncoated paper",                   "category": "paper",        "unit_price": 0.06},
+    {"item_name": "Butcher paper",                    "category": "paper",        "unit_price": 0.10},
+    {"item_name": "Heavyweight paper",                "category": "paper",        "unit_price": 0.20},
+    {"item_name": "Standard copy paper",              "category": "paper",        "unit_price": 0.04},
+    {"item_name": "Bright-colored paper",             "category": "paper",        "unit_price": 0.12},
+    {"item_name": "Patterned paper",                  "category": "paper",        "unit_price": 0.15},
+
+    # Product Types (priced per unit)
+    {"item_name": "Paper plates",                     "category": "product",      "unit_price": 0.10},
+    {"item_name": "Paper cups",                       "category": "product",      "unit_price": 0.08},
+    {"item_name": "Paper napkins",                    "category": "product",      "unit_price": 0.02},
+    {"item_name": "Disposable cups",                  "category": "product",      "unit_price": 0.10},
+    {"item_name": "Table covers",                     "category": "product",      "unit_price": 1.50},
+    {"item_name": "Envelopes",                        "category": "product",      "unit_price": 0.05},
+    {"item_name": "Sticky notes",                     "category": "product",      "unit_price": 0.03},
+    {"item_name": "Notepads",                         "category": "product",      "unit_price": 2.00},
+    {"item_name": "Invitation cards",                 "category": "product",      "unit_price": 0.50},
+    {"item_name": "Flyers",                           "category": "product",      "unit_price": 0.15},
+    {"item_name": "Party streamers",                  "category": "product",      "unit_price": 0.05},
+    {"item_name": "Decorative adhesive tape (washi tape)", "category": "product", "unit_price": 0.20},
+    {"item_name": "Paper party bags",                 "category": "product",      "unit_price": 0.25},
+    {"item_name": "Name tags with lanyards",          "category": "product",      "unit_price": 0.75},
+    {"item_name": "Presentation folders",             "category": "product",      "unit_price": 0.50},
+
+    # Large-format items (priced per unit)
+    {"item_name": "Large poster paper (24x36 inches)", "category": "large_format", "unit_price": 1.00},
+    {"item_name": "Rolls of banner paper (36-inch width)", "category": "large_format", "unit_price": 2.50},
+
+    # Specialty papers
+    {"item_name": "100 lb cover stock",               "category": "specialty",    "unit_price": 0.50},
+    {"item_name": "80 lb text paper",                 "category": "specialty",    "unit_price": 0.40},
+    {"item_name": "250 gsm cardstock",                "category": "specialty",    "unit_price": 0.30},
+    {"item_name": "220 gsm poster paper",             "category": "specialty",    "unit_price": 0.35},
+]
+
+catalogue.extend(paper_supplies)
+
+# ==================== DATABASE HELPER FUNCTIONS ====================
+
+def generate_sample_inventory(paper_supplies: Union[list, pd.DataFrame], coverage: float = 0.4,
+                              seed: int = 137) -> pd.DataFrame:
+    """Generate inventory for a specified percentage of items from the paper supply list.
+    
+    Accepts the list of item dicts or a catalogue DataFrame (item_name,
+    category, unit_price), e.g. from synthetic_data.generate_catalogue. The
+    draws are made in one call per column, in the same order as the former
+    per-item loop, so a seed gives the same inventory as before.
+    """
+    items = paper_supplies if isinstance(paper_supplies, pd.DataFrame) else pd.DataFrame(paper_supplies)
+    np.random.seed(seed)
+    num_items = int(len(items) * coverage)
+    selected_indices = np.random.choice(len(items), size=num_items, replace=False)
+    levels = np.random.randint([200, 50], [800, 150], size=(num_items, 2))
+    
+    inventory = items.iloc[selected_indices][["item_name", "category", "unit_price"]].reset_index(drop=True)
+    inventory["current_stock"] = levels[:, 0]
+    inventory["min_stock_level"] = levels[:, 1]
+    return inventory
+
+def read_seed_table(name: str, data_dir: str = "", source_format: str = "csv") -> pd.DataFrame:
+    """Load a seed table (quote_requests, quotes) from `<data_dir>/<name>.csv` or `.parquet`."""
+    if source_format == "csv":
+        return pd.read_csv(os.path.join(data_dir, f"{name}.csv"))
+    if source_format == "parquet":
+        return pd.read_parquet(os.path.join(data_dir, f"{name}.parquet"))
+    raise ValueError("source_format must be 'csv' or 'parquet'")
+
+OPENING_CASH = 50000.0
+
+def opening_cash(inventory: pd.DataFrame) -> float:
+    """Opening balance for `inventory`: OPENING_CASH, or twice the stock's value if more.
+    
+    init_database buys the seeded stock out of this, so large catalogues
+    (e.g. synthetic_data's) still start with cash in hand.
+    """
+    return max(OPENING_CASH, 2 * float((inventory["current_stock"] * inventory["unit_price"]).sum()))
+
+def init_database(db_engine: Engine, seed: int = 137, coverage: float = 0.4, data_dir: str = "",
+                  source_format: str = "csv", items: Optional[List[Dict]] = None) -> Engine:    
+    """Set up the database with all required tables and initial records.
+    
+    `coverage` is the fraction of the catalogue seeded with stock; the seed
+    tables are read from `data_dir` (default: the working directory) as CSV or
+    Parquet (see columnar_io.py convert-seeds). Transactions are written to
+    the active ledger backend, which is first pointed at `db_engine` (see
+    set_db_engine) if that is not the module's engine. `items` replaces
+    paper_supplies as the catalogue (e.g. a large synthetic one, see
+    synthetic_data.py).
+    """
+    if db_engine is not globals()["db_engine"]:
+        set_db_engine(db_engine)
+    try:
+        initial_date = datetime(2025, 1, 1).isoformat()
+        catalogue.reset(paper_supplies if items is None else items)
+        
+        quote_requests_df = read_seed_table("quote_requests", data_dir, source_format)
+        quote_requests_df["id"] = range(1, len(quote_requests_df) + 1)
+        quote_requests_df.to_sql("quote_requests", db_engine, if_exists="replace", index=False)
+        
+        quotes_df = read_seed_table("quotes", data_dir, source_format)
+        quotes_df["request_id"] = range(1, len(quotes_df) + 1)
+        quotes_df["order_date"] = initial_date
+        
+        if "request_metadata" in quotes_df.columns:
+            quotes_df["request_metadata"] = quotes_df["request_metadata"].apply(
+                lambda x: ast.literal_eval(x) if isinstance(x, str) else x
+            )
+            quotes_df["job_type"] = quotes_df["request_metadata"].apply(lambda x: x.get("job_type", ""))
+            quotes_df["order_size"] = quotes_df["request_metadata"].apply(lambda x: x.get("order_size", ""))
+            quotes_df["event_type"] = quotes_df["request_metadata"].apply(lambda x: x.get("event_type", ""))
+        
+        quotes_df = quotes_df[["request_id", "total_amount", "quote_explanation", 
+                               "order_date", "job_type", "order_size", "event_type"]]
+        for facet in QUOTE_FACETS:
+            quotes_df[facet] = quotes_df[facet].fillna("").astype(str).str.strip().str.lower()
+        quotes_df.to_sql("quotes", db_engine, if_exists="replace", index=False)
+        build_quote_facets(db_engine, quotes_df)
+        fit_pricing_model(db_engine, quote_requests_df, quotes_df)
+        
+        inventory_df = generate_sample_inventory(paper_supplies if items is None else items,
+                                                 coverage=coverage, seed=seed)
+        inventory_df.insert(0, "item_id", catalogue.skus(inventory_df["item_name"]))
+        initial_transactions = []
+        
+        initial_transactions.append(
+            _transaction_row(None, "sales", None, opening_cash(inventory_df), initial_date)
+        )
+        
+        # With warehouse shards, each warehouse is seeded with its share of the stock
+        if isinstance(ledger_backend, ShardedLedger):
+            stock_df = split_inventory(inventory_df, ledger_backend.warehouses)
+            ledger_backend.write_inventory(stock_df)
+        else:
+            stock_df = inventory_df
+        
+        for _, item in stock_df[stock_df["current_stock"] > 0].iterrows():
+            initial_transactions.append(_transaction_row(
+                item["item_name"], "stock_orders", int(item["current_stock"]),
+                float(item["current_stock"] * item["unit_price"]), initial_date,
+                warehouse=item.get("warehouse"),
+            ))
+        
+        ledger_backend.reset(initial_transactions)
+        with db_engine.begin() as conn:
+            conn.exec_driver_sql("DROP TABLE IF EXISTS items")
+            conn.exec_driver_sql("CREATE TABLE items (item_id INTEGER PRIMARY KEY, item_name TEXT UNIQUE, "
+                                 "category TEXT, unit_price REAL)")
+        catalogue.to_frame().to_sql("items", db_engine, if_exists="append", index=False)
+        inventory_df.to_sql("inventory", db_engine, if_exists="replace", index=False)
+        with db_engine.begin() as conn:
+            conn.exec_driver_sql("CREATE UNIQUE INDEX idx_inventory_item_id ON inventory (item_id)")
+            # Recorded so other processes (beaver_cli) open the same shards
+            conn.exec_driver_sql("DROP TABLE IF EXISTS warehouses")
+            if isinstance(ledger_backend, ShardedLedger):
+                conn.exec_driver_sql("CREATE TABLE warehouses (warehouse TEXT)")
+                conn.exec_driver_sql("INSERT INTO warehouses VALUES " +
+                                     ", ".join("(?)" for _ in ledger_backend.warehouses),
+                                     tuple(ledger_backend.warehouses))
+        ledger_changed()
+        invalidate_items()
+        
+        return db_engine
+    
+    except Exception as e:
+        print(f"Error initializing database: {e}")
+        raise
+
+def _transaction_row(item_name: str, transaction_type: str, quantity: int, price: float,
+                     date: Union[str, datetime],
+                     delivery_date: Union[str, datetime, None] = None,
+                     warehouse: Optional[str] = None) -> Dict:
+    """
+    Validate a transaction and normalize it to the row format of the ledger backends.
+    
+    The row is stamped with `warehouse` (default: the active warehouse_scope)
+    here rather than in the backend, so queued writes keep their routing.
+    """
+    if transaction_type not in {"stock_orders", "sales"}:
+        raise ValueError("Transaction type must be 'stock_orders' or 'sales'")
+    date_str = date.isoformat() if isinstance(date, datetime) else date
+    if delivery_date is None:
+        delivery_date = date_str
+    elif isinstance(delivery_date, datetime):
+        delivery_date = delivery_date.isoformat()
+    row = {
+        "item_name": item_name,
+        "transaction_type": transaction_type,
+        "units": quantity,
+        "price": price,
+        "transaction_date": date_str,
+        "delivery_date": delivery_date,
+    }
+    warehouse = warehouse or current_warehouse()
+    if warehouse is not None:
+        row["warehouse"] = warehouse
+    return row
+
+def create_transaction(item_name: str, transaction_type: str, quantity: int, 
+                      price: float, date: Union[str, datetime],
+                      delivery_date: Union[str, datetime, None] = None) -> int:
+    """Record a transaction in the database.
+    
+    Stock orders count towards available stock from `delivery_date` (defaults
+    to the transaction date); cash moves on the transaction date. The item
+    must be in the catalogue (ValueError otherwise).
+    """
+    try:
+        row = _transaction_row(item_name, transaction_type, quantity, price, date, delivery_date)
+        transaction_id = _append_rows([row])[0]
+        invalidate_items([item_name])
+        return transaction_id
+    
+    except Exception as e:
+        print(f"Error creating transaction: {e}")
+        raise
+
+def create_transactions(transactions: List[Dict]) -> List[int]:
+    """
+    Record several transactions in a single database commit.
+    
+    Args:
+        transactions: Dicts with item_name, transaction_type, quantity, price, date
+            and optionally delivery_date, as accepted by create_transaction
+    
+    Returns:
+        The new transaction ids, in input order
+    """
+    rows = [
+        _transaction_row(t["item_name"], t["transaction_type"], t["quantity"], t["price"],
+                         t["date"], t.get("delivery_date"))
+        for t in transactions
+    ]
+    ids = _append_rows(rows)
+    invalidate_items({t["item_name"] for t in transactions})
+    return ids
+
+def _commit_rows(rows: List[Dict]) -> List[int]:
+    ids = ledger_backend.append(rows)
+    ledger_changed()
+    return ids
+
+def _append_rows(rows: List[Dict]) -> List[int]:
+    """Commit ledger rows atomically, through the group commit queue when enabled."""
+    if write_queue is not None:
+        return write_queue.append(rows)
+    return _commit_rows(rows)
+
+def _drain_writes() -> None:
+    if write_queue is not None:
+        write_queue.flush()
+
+def enable_group_commit(max_batch: int = 256, max_delay: float = 0.002) -> GroupCommitQueue:
+    """
+    Commit transaction inserts from all threads in shared batches (see group_commit.py).
+    
+    Callers still block until their own rows are committed and get their ids
+    back, so the tools need no changes; a commit waits at most `max_delay`
+    seconds for concurrent writers to join it.
+    """
+    global write_queue
+    if isinstance(ledger_backend, SQLiteLedger) and isinstance(db_engine.pool, SingletonThreadPool):
+        # The writer thread would get an empty in-memory database of its own
+        raise ValueError("group commit needs a file database (in-memory SQLite is per thread)")
+    if isinstance(ledger_backend, ShardedLedger):
+        # A batch spanning warehouses commits shard by shard; retrying it row by row after
+        # a failure would write the rows of the shards that had already committed again
+        raise ValueError("group commit needs a single ledger (sharded appends are not atomic across warehouses)")
+    disable_group_commit()
+    write_queue = GroupCommitQueue(_commit_rows, max_batch, max_delay)
+    return write_queue
+
+def disable_group_commit() -> None:
+    """Commit what is queued and go back to one commit per call."""
+    global write_queue
+    if write_queue is not None:
+        pending, write_queue = write_queue, None
+        pending.close()
+
+def get_last_transaction_id() -> int:
+    """Return the id of the most recently committed transaction (0 if none)."""
+    return ledger_backend.last_transaction_id()
+
+def discard_transactions_after(transaction_id: int) -> int:
+    """Delete transactions newer than `transaction_id` and return how many were removed."""
+    _drain_writes()
+    removed = ledger_backend.discard_after(transaction_id)
+    ledger_changed()
+    invalidate_items()
+    return removed
+
+def get_all_inventory(as_of_date: str) -> Dict[str, int]:
+    """Retrieve a snapshot of available inventory as of a specific date."""
+    return {item: stock for item, stock in ledger_backend.stock_levels(as_of_date).items() if stock > 0}
+
+def get_stock_level(item_name: str, as_of_date: Union[str, datetime]) -> pd.DataFrame:
+    """Retrieve the stock level of a specific item as of a given date."""
+    if isinstance(as_of_date, datetime):
+        as_of_date = as_of_date.isoformat()
+    
+    def load():
+        stock = ledger_backend.stock_levels(as_of_date, [item_name]).get(item_name, 0)
+        return pd.DataFrame({"item_name": [item_name], "current_stock": [stock]})
+    
+    return prefetched(("get_stock_level", item_name, as_of_date, current_warehouse()), load)
+
+def get_stock_levels(item_names: List[str], as_of_date: str) -> Dict[str, float]:
+    """Stock levels of several items as of a date, in one ledger query (0 for unknown items)."""
+    levels = ledger_backend.stock_levels(as_of_date, list(item_names))
+    return {item: float(levels.get(item, 0)) for item in item_names}
+
+def _inventory_queries() -> PreparedQueries:
+    """
+    Lookups against the inventory table for the active scope: inside a
+    warehouse_scope on a sharded ledger, the warehouse's shard (which holds
+    its share of each minimum stock level), else the company-wide table.
+    """
+    warehouse = current_warehouse()
+    if warehouse is not None and isinstance(ledger_backend, ShardedLedger):
+        return ledger_backend.shard(warehouse).queries
+    return queries
+
+def get_catalogue_entry(item_name: str) -> Union[Tuple[str, float, int], None]:
+    """Return (category, unit_price, min_stock_level) for a catalogue item, or None.
+    
+    Inside a warehouse_scope on a sharded ledger, min_stock_level is that
+    warehouse's share.
+    """
+    sku = catalogue.find(item_name)
+    if sku is None:
+        return None
+    inventory = _inventory_queries()
+    return prefetched(("get_catalogue_entry", item_name, current_warehouse()), lambda: inventory.one(
+        "SELECT category, unit_price, min_stock_level FROM inventory WHERE item_id = :sku",
+        {"sku": sku},
+    ))
+
+def get_supplier_delivery_date(input_date_str: str, quantity: int) -> str:
+    """Estimate the supplier delivery date based on order quantity."""
+    try:
+        input_date_dt = datetime.fromisoformat(input_date_str.split("T")[0])
+    except (ValueError, TypeError):
+        input_date_dt = datetime.now()
+    
+    if quantity <= 10:
+        days = 0
+    elif quantity <= 100:
+        days = 1
+    elif quantity <= 1000:
+        days = 4
+    else:
+        days = 7
+    
+    delivery_date_dt = input_date_dt + timedelta(days=days)
+    return delivery_date_dt.strftime("%Y-%m-%d")
+
+def get_cash_balance(as_of_date: Union[str, datetime]) -> float:
+    """Calculate the current cash balance as of a specified date."""
+    try:
+        if isinstance(as_of_date, datetime):
+            as_of_date = as_of_date.isoformat()
+        return ledger_backend.cash_balance(as_of_date)
+    
+    except Exception as e:
+        print(f"Error getting cash balance: {e}")
+        return 0.0
+
+class ReportCache:
+    """
+    LRU cache of financial reports keyed by (as_of_date, warehouse, ledger_version).
+    
+    Only reports for the current ledger version can be hit; older versions
+    are evicted when a newer report is stored, and the least recently used
+    report goes once `max_entries` is reached. Callers get deep copies.
+    """
+    
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Union[str, None], int], Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, as_of_date: str, version: int, warehouse: str = None) -> Union[Dict, None]:
+        with self._lock:
+            report = self._entries.get((as_of_date, warehouse, version))
+            if report is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((as_of_date, warehouse, version))
+            self.hits += 1
+        return copy.deepcopy(report)
+    
+    def put(self, as_of_date: str, version: int, report: Dict, warehouse: str = None) -> None:
+        report = copy.deepcopy(report)
+        with self._lock:
+            stale = [key for key in self._entries if key[2] < version]
+            for key in stale:
+                del self._entries[key]
+            self._entries[(as_of_date, warehouse, version)] = report
+            self._entries.move_to_end((as_of_date, warehouse, version))
+            evicted = len(stale)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            self.evictions += evicted
+    
+    def clear(self) -> None:
+        with self._lock:
+            self.evictions += len(self._entries)
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._entries)}
+
+report_cache = ReportCache()
+
+def generate_financial_report(as_of_date: Union[str, datetime]) -> Dict:
+    """
+    Generate a complete financial report as of a specific date (cached per ledger version).
+    
+    With warehouse shards, inventory covers the active warehouse_scope, or
+    every warehouse outside one, with a per-warehouse breakdown under
+    "warehouses". Cash is always company-wide.
+    """
+    if isinstance(as_of_date, datetime):
+        as_of_date = as_of_date.isoformat()
+    
+    version = ledger_version
+    warehouse = current_warehouse()
+    report = report_cache.get(as_of_date, version, warehouse)
+    if report is not None:
+        return report
+    
+    report = _build_financial_report(as_of_date)
+    # A write that finished while the report was being built makes it unsafe to cache
+    if ledger_version == version:
+        report_cache.put(as_of_date, version, report, warehouse)
+    return report
+
+def _build_financial_report(as_of_date: str) -> Dict:
+    cash = get_cash_balance(as_of_date)
+    inventory_df = pd.read_sql("SELECT * FROM inventory", db_engine)
+    stock_levels = ledger_backend.stock_levels(as_of_date, list(inventory_df["item_name"]))
+    inventory_value = 0.0
+    inventory_summary = []
+    
+    for _, item in inventory_df.iterrows():
+        stock = stock_levels.get(item["item_name"], 0)
+        item_value = stock * item["unit_price"]
+        inventory_value += item_value
+        
+        inventory_summary.append({
+            "item_name": item["item_name"],
+            "stock": stock,
+            "unit_price": item["unit_price"],
+            "value": item_value,
+        })
+    
+    report = {
+        "as_of_date": as_of_date,
+        "cash_balance": cash,
+        "inventory_value": inventory_value,
+        "total_assets": cash + inventory_value,
+        "inventory_summary": inventory_summary,
+        "top_selling_products": ledger_backend.top_sales(as_of_date, limit=5),
+    }
+    if isinstance(ledger_backend, ShardedLedger):
+        report["warehouse"] = current_warehouse()
+        if current_warehouse() is None:
+            report["warehouses"] = _warehouse_breakdown(as_of_date, inventory_df)
+    return report
+
+def _warehouse_breakdown(as_of_date: str, inventory_df: pd.DataFrame) -> Dict[str, Dict]:
+    prices = dict(zip(inventory_df["item_name"], inventory_df["unit_price"]))
+    breakdown = {}
+    for warehouse in ledger_backend.warehouses:
+        with warehouse_scope(warehouse):
+            levels = ledger_backend.stock_levels(as_of_date, list(prices))
+        breakdown[warehouse] = {
+            "units_on_hand": float(sum(levels.values())),
+            "inventory_value": float(sum(units * prices[item] for item, units in levels.items())),
+        }
+    return breakdown
+
+def search_quote_history(search_terms: List[str], limit: int = 5, job_type: str = None,
+                         order_size: str = None, event_type: str = None) -> List[Dict]:
+    """Retrieve historical quotes matching the search terms and any facet filters (exact, case-insensitive)."""
+    facets = quote_facet_filters(job_type, order_size, event_type)
+    terms = [term.lower() for term in search_terms]
+    if terms and all(is_prefetched(("quote_history_term", term)) for term in terms):
+        # Intersect the prefetched per-term matches instead of querying again
+        matches = [prefetched(("quote_history_term", term), functools.partial(quote_history_matches, term))
+                   for term in terms]
+        common = set.intersection(*({row_id for row_id, _ in rows} for rows in matches))
+        return [row for row_id, row in matches[0]
+                if row_id in common and all(row[f] == v for f, v in facets.items())][:limit]
+    
+    return [row for _, row in _quote_history_rows(search_terms, limit, facets)]
+
+def quote_history_matches(term: str) -> List[Tuple[int, Dict]]:
+    """Every (quote id, row) matching one search term, in search_quote_history order."""
+    return _quote_history_rows([term])
+
+def _quote_history_rows(search_terms: List[str], limit: int = None,
+                        facets: Dict[str, str] = None) -> List[Tuple[int, Dict]]:
+    conditions = [f"q.{facet} = :{facet}" for facet in facets or {}]
+    params = dict(facets or {})
+    
+    for i, term in enumerate(search_terms):
+        param_name = f"term_{i}"
+        conditions.append(
+            f"(LOWER(qr.response) LIKE :{param_name} OR "
+            f"LOWER(q.quote_explanation) LIKE :{param_name})"
+        )
+        params[param_name] = f"%{term.lower()}%"
+    
+    where_clause = " AND ".join(conditions) if conditions else "1=1"
+    
+    query = f"""
+        SELECT q.rowid AS quote_id, qr.response AS original_request, q.total_amount,
+               q.quote_explanation, q.job_type, q.order_size, q.event_type, q.order_date
+        FROM quotes q
+        JOIN quote_requests qr ON q.request_id = qr.id
+        WHERE {where_clause}
+        ORDER BY q.order_date DESC, q.rowid
+        LIMIT {-1 if limit is None else int(limit)}
+    """
+    
+    with db_engine.connect() as conn:
+        result = conn.execute(text(query), params)
+        rows = [dict(row._mapping) for row in result]
+    return [(row.pop("quote_id"), row) for row in rows]
+
+# ==================== QUOTE HISTORY FACETS ====================
+
+QUOTE_FACETS = ("job_type", "order_size", "event_type")
+
+# Stands for "any value" of a facet in the quote_facets summary table
+ANY_FACET = "*"
+
+def build_quote_facets(db_engine: Engine, quotes_df: pd.DataFrame) -> None:
+    """
+    Index the quotes table by facet and precompute the quote_facets summary.
+    
+    quote_facets holds the count and average total_amount of the quotes for
+    every combination of facet values, with ANY_FACET standing for "any
+    value", so the summary for any set of facet filters, and its breakdown
+    by each remaining facet, is a lookup on its primary key.
+    """
+    groups = []
+    for size in range(len(QUOTE_FACETS) + 1):
+        for grouped in itertools.combinations(QUOTE_FACETS, size):
+            if grouped:
+                summary = quotes_df.groupby(list(grouped))["total_amount"].agg(["count", "mean"]).reset_index()
+            else:
+                summary = pd.DataFrame({"count": [len(quotes_df)], "mean": [quotes_df["total_amount"].mean()]})
+            for facet in QUOTE_FACETS:
+                if facet not in grouped:
+                    summary[facet] = ANY_FACET
+            groups.append(summary)
+    facets_df = pd.concat(groups, ignore_index=True).rename(
+        columns={"count": "quotes", "mean": "avg_total_amount"}
+    )[[*QUOTE_FACETS, "quotes", "avg_total_amount"]]
+    
+    with db_engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS quote_facets"))
+        conn.execute(text("""
+            CREATE TABLE quote_facets (
+                job_type TEXT NOT NULL, order_size TEXT NOT NULL, event_type TEXT NOT NULL,
+                quotes INTEGER NOT NULL, avg_total_amount REAL,
+                PRIMARY KEY (job_type, order_size, event_type)
+            )
+        """))
+        conn.execute(text(
+            "INSERT INTO quote_facets VALUES (:job_type, :order_size, :event_type, :quotes, :avg_total_amount)"
+        ), facets_df.to_dict("records"))
+        # Any combination of facet filters can use one of these as a prefix
+        conn.execute(text("CREATE INDEX idx_quotes_job_size_event ON quotes (job_type, order_size, event_type)"))
+        conn.execute(text("CREATE INDEX idx_quotes_size_event ON quotes (order_size, event_type)"))
+        conn.execute(text("CREATE INDEX idx_quotes_event_job ON quotes (event_type, job_type)"))
+
+def quote_facet_filters(job_type: str = None, order_size: str = None, event_type: str = None) -> Dict[str, str]:
+    """The given facet filters, normalized like the stored values (blank means no filter)."""
+    values = {"job_type": job_type, "order_size": order_size, "event_type": event_type}
+    return {facet: value.strip().lower() for facet, value in values.items() if value and value.strip()}
+
+def quote_facet_summary(job_type: str = None, order_size: str = None, event_type: str = None) -> Dict:
+    """
+    Count and average total_amount of the historical quotes matching the
+    facet filters, broken down by each facet left unfiltered.
+    
+    Returns:
+        {"filters", "quotes", "avg_total_amount",
+         "breakdown": {facet: [{"value", "quotes", "avg_total_amount"}, ...]}}
+    """
+    filters = quote_facet_filters(job_type, order_size, event_type)
+    free = [facet for facet in QUOTE_FACETS if facet not in filters]
+    # The filtered row itself plus the rows that group by exactly one free facet
+    conditions = [f"{facet} = :{facet}" for facet in filters]
+    if free:
+        conditions.append(" + ".join(f"({facet} != '{ANY_FACET}')" for facet in free) + " <= 1")
+    rows = queries.all(
+        f"SELECT {', '.join(QUOTE_FACETS)}, quotes, avg_total_amount FROM quote_facets "
+        f"WHERE {' AND '.join(conditions) or '1=1'} ORDER BY quotes DESC",
+        filters,
+    )
+    
+    summary = {"filters": filters, "quotes": 0, "avg_total_amount": None,
+               "breakdown": {facet: [] for facet in free}}
+    for *values, quotes, avg_total_amount in rows:
+        row = dict(zip(QUOTE_FACETS, values))
+        grouped = [facet for facet in free if row[facet] != ANY_FACET]
+        if grouped:
+            summary["breakdown"][grouped[0]].append(
+                {"value": row[grouped[0]], "quotes": quotes, "avg_total_amount": avg_total_amount}
+            )
+        else:
+            summary["quotes"], summary["avg_total_amount"] = quotes, avg_total_amount
+    return summary
+
+# ==================== PRICING MODEL ====================
+
+_pricing_model: Union[PricingModel, None] = None
+_pricing_model_loaded = False
+
+def fit_pricing_model(db_engine: Engine, quote_requests_df: pd.DataFrame,
+                      quotes_df: pd.DataFrame) -> Union[PricingModel, None]:
+    """Fit the historical pricing model on the seed quotes, priced from the loaded catalogue, and store it."""
+    global _pricing_model, _pricing_model_loaded
+    prices = {item.item_name: item.unit_price for item in catalogue}
+    try:
+        model = fit_from_tables(quote_requests_df, quotes_df, prices)
+    except ValueError as e:
+        # Too few usable quotes (e.g. a trimmed seed set): quoting works as before without it
+        print(f"Pricing model not fitted: {e}")
+        model = None
+    with db_engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS pricing_model"))
+    if model is not None:
+        save_model(db_engine, model)
+    _pricing_model, _pricing_model_loaded = model, True
+    return model
+
+def invalidate_pricing_model() -> None:
+    """Forget the loaded model, e.g. after switching databases."""
+    global _pricing_model, _pricing_model_loaded
+    _pricing_model, _pricing_model_loaded = None, False
+
+def get_pricing_model() -> Union[PricingModel, None]:
+    """The pricing model stored in the current database (loaded once), or None."""
+    global _pricing_model, _pricing_model_loaded
+    if not _pricing_model_loaded:
+        _pricing_model, _pricing_model_loaded = load_model(db_engine), True
+    return _pricing_model
+
+# ==================== ASYNC ACCESS ====================
+
+# SQLite calls made from coroutines run on this pool so they never block the
+# event loop; each worker thread keeps its own prepared-statement connection
+db_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="beaver-db")
+
+async def run_db(fn, *args, **kwargs):
+    """Await any helper in this module, e.g. `await run_db(get_cash_balance, "2025-04-01")`."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, functools.partial(fn, *args, **kwargs))
+
+# ==================== STOCK AVAILABILITY ====================
+
+class AvailabilityIndex:
+    """
+    Projected stock per item, built from one ledger scan.
+    
+    For each item the ledger is reduced to a date-sorted array of stock events
+    (stock orders on their delivery date, sales on their sale date) with the
+    running stock level after each date. Queries are binary searches:
+    
+    - available_on: stock on hand on a date
+    - available_to_promise: units that can be sold on a date without breaking
+      any later committed sale (the minimum level from that date onwards)
+    - earliest_available: first date on or after a given date from which
+      `quantity` units can be promised
+    """
+    
+    def __init__(self, ledger: pd.DataFrame):
+        self._items = {}
+        if ledger.empty:
+            return
+        
+        events = pd.DataFrame({
+            "item_name": ledger["item_name"],
+            "date": pd.to_datetime(ledger["event_date"].str[:10]),
+            "delta": np.where(ledger["transaction_type"] == "stock_orders",
+                              ledger["units"], -ledger["units"]).astype(float),
+        })
+        daily = events.groupby(["item_name", "date"], sort=True)["delta"].sum().reset_index()
+        
+        for item_name, group in daily.groupby("item_name", sort=False):
+            # Sentinel event so dates before the first transaction resolve to zero stock
+            dates = np.concatenate([[np.datetime64("0001-01-01")], group["date"].to_numpy().astype("datetime64[D]")])
+            levels = np.concatenate([[0.0], np.cumsum(group["delta"].to_numpy())])
+            promisable = np.minimum.accumulate(levels[::-1])[::-1]
+            self._items[item_name] = (dates, levels, promisable)
+    
+    @staticmethod
+    def _as_day(date: Union[str, datetime]) -> np.datetime64:
+        if isinstance(date, datetime):
+            date = date.isoformat()
+        return np.datetime64(date[:10], "D")
+    
+    def _position(self, item_name: str, date: Union[str, datetime]):
+        entry = self._items.get(item_name)
+        if entry is None:
+            return None, -1
+        return entry, int(np.searchsorted(entry[0], self._as_day(date), side="right")) - 1
+    
+    def available_on(self, item_name: str, date: Union[str, datetime]) -> int:
+        """Units on hand for `item_name` on `date`."""
+        entry, k = self._position(item_name, date)
+        return 0 if entry is None else int(entry[1][k])
+    
+    def available_to_promise(self, item_name: str, date: Union[str, datetime]) -> int:
+        """Units that can be sold on `date` without short-shipping later sales."""
+        entry, k = self._position(item_name, date)
+        return 0 if entry is None else max(int(entry[2][k]), 0)
+    
+    def earliest_available(self, item_name: str, quantity: int,
+                           from_date: Union[str, datetime]) -> Union[str, None]:
+        """First date on or after `from_date` when `quantity` units can be promised, or None."""
+        entry, k = self._position(item_name, from_date)
+        if entry is None:
+            return None
+        dates, _, promisable = entry
+        # The promisable level never decreases over time, so it is searchable too
+        j = int(np.searchsorted(promisable, quantity, side="left"))
+        if j == len(promisable):
+            return None
+        if j <= k:
+            return str(self._as_day(from_date))
+        return str(dates[j])
+
+# One index per (warehouse scope, ledger_version); warehouse None is the whole company
+_availability_indexes: Dict[Tuple[Union[str, None], int], AvailabilityIndex] = {}
+
+def invalidate_availability_index() -> None:
+    """Drop the cached availability indexes after the ledger changes."""
+    _availability_indexes.clear()
+
+def get_availability_index() -> AvailabilityIndex:
+    """Return the availability index of the active warehouse, rebuilding it if it is stale."""
+    version = ledger_version
+    key = (current_warehouse(), version)
+    index = _availability_indexes.get(key)
+    if index is None:
+        index = AvailabilityIndex(ledger_backend.stock_events())
+        # An index built across a concurrent write (e.g. on the prefetch thread) may
+        # miss it; keyed by the version it started from, it is never served after it
+        if ledger_version == version:
+            _availability_indexes[key] = index
+    return index
+
+def get_pending_deliveries(as_of_date: str) -> Dict[str, int]:
+    """Units ordered on or before `as_of_date` that have not been delivered yet, per item."""
+    return ledger_backend.pending_deliveries(as_of_date)
+
+# ==================== BATCH QUOTING ENGINE ====================
+
+# Bulk discount ladder: an order subtotal at or above a threshold earns its rate
+DISCOUNT_THRESHOLDS = np.array([1000.0, 2000.0, 5000.0])
+DISCOUNT_RATES = np.array([0.0, 0.05, 0.10, 0.15])
+
+def get_price_table() -> Tuple[np.ndarray, np.ndarray]:
+    """Load the catalogue as (item names sorted, matching unit prices) arrays."""
+    def load():
+        priced = pd.read_sql("SELECT item_name, unit_price FROM inventory", db_engine)
+        names = priced["item_name"].to_numpy(dtype=object)
+        order = np.argsort(names)
+        return names[order], priced["unit_price"].to_numpy(dtype=float)[order]
+    
+    return prefetched(("get_price_table",), load)
+
+def discount_rates_for(subtotals: np.ndarray, thresholds: np.ndarray = None,
+                       rates: np.ndarray = None) -> np.ndarray:
+    """Map order subtotals to their bulk discount rates (default: the standard ladder)."""
+    thresholds = DISCOUNT_THRESHOLDS if thresholds is None else np.asarray(thresholds, dtype=float)
+    rates = DISCOUNT_RATES if rates is None else np.asarray(rates, dtype=float)
+    return rates[np.searchsorted(thresholds, subtotals, side="right")]
+
+def quote_orders(orders: pd.DataFrame, thresholds: np.ndarray = None,
+                 rates: np.ndarray = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Price many orders at once against the catalogue.
+    
+    Args:
+        orders: One row per order line with columns request_id, item_name, quantity
+            (e.g. a day's inbound requests loaded with pd.read_csv)
+        thresholds, rates: Alternative discount ladder (len(rates) == len(thresholds) + 1)
+    
+    Returns:
+        (lines, totals): `lines` is `orders` with unit_price, item_total and
+        available columns added; `totals` has one row per request_id with
+        subtotal, discount_rate, discount_amount and total.
+    """
+    names, prices = get_price_table()
+    items = orders["item_name"].to_numpy(dtype=object)
+    quantities = orders["quantity"].to_numpy(dtype=float)
+    
+    if len(names):
+        positions = np.searchsorted(names, items).clip(max=len(names) - 1)
+        available = names[positions] == items
+    else:
+        positions = np.zeros(len(items), dtype=int)
+        available = np.zeros(len(items), dtype=bool)
+    unit_prices = np.where(available, prices[positions] if len(names) else 0.0, np.nan)
+    item_totals = np.where(available, quantities * np.nan_to_num(unit_prices), 0.0)
+    
+    lines = orders.copy()
+    lines["unit_price"] = unit_prices
+    lines["item_total"] = item_totals
+    lines["available"] = available
+    
+    codes, request_ids = pd.factorize(orders["request_id"], sort=True)
+    subtotals = np.bincount(codes, weights=item_totals, minlength=len(request_ids))
+    discount = discount_rates_for(subtotals, thresholds, rates)
+    discounts = subtotals * discount
+    
+    totals = pd.DataFrame({
+        "request_id": request_ids,
+        "subtotal": subtotals,
+        "discount_rate": discount,
+        "discount_amount": discounts,
+        "total": subtotals - discounts,
+    })
+    return lines, totals
+
+# ==================== REORDER PLANNING ====================
+
+def plan_reorders(as_of_date: str, restock_factor: float = 2.0, cash_reserve: float = 0.0) -> pd.DataFrame:
+    """
+    Plan restocking for every catalogue item below its minimum stock level.
+    
+    Stock already ordered but not yet delivered counts towards the item's level.
+    Inside a warehouse_scope on a sharded ledger, the plan covers that
+    warehouse's stock against its share of each minimum level.
+    Items are funded greedily, most depleted first (lowest stock / min_stock_level):
+    each gets enough units to reach `restock_factor` × min_stock_level, or as many
+    as the remaining cash allows.
+    
+    Args:
+        as_of_date: Date of the stock and cash snapshot (YYYY-MM-DD format)
+        restock_factor: Target stock as a multiple of min_stock_level
+        cash_reserve: Cash to keep unspent
+    
+    Returns:
+        DataFrame with item_name, current_stock, on_order, min_stock_level,
+        unit_price, quantity and cost for each item that should be reordered
+    """
+    levels = pd.DataFrame(
+        _inventory_queries().all("SELECT item_name, unit_price, min_stock_level FROM inventory"),
+        columns=["item_name", "unit_price", "min_stock_level"],
+    )
+    stock = get_all_inventory(as_of_date)
+    pending = get_pending_deliveries(as_of_date)
+    levels["current_stock"] = levels["item_name"].map(stock).fillna(0).astype(int)
+    levels["on_order"] = levels["item_name"].map(pending).fillna(0).astype(int)
+    position = levels["current_stock"] + levels["on_order"]
+    
+    low = levels[position < levels["min_stock_level"]].copy()
+    position = position[low.index]
+    low["needed"] = np.ceil(low["min_stock_level"] * restock_factor).astype(int) - position
+    low = low.assign(fill_ratio=position / low["min_stock_level"]).sort_values("fill_ratio")
+    
+    remaining_cash = get_cash_balance(as_of_date) - cash_reserve
+    quantities = []
+    for needed, unit_price in zip(low["needed"], low["unit_price"]):
+        affordable = int(max(remaining_cash, 0) // unit_price) if unit_price > 0 else needed
+        quantity = min(int(needed), affordable)
+        remaining_cash -= quantity * unit_price
+        quantities.append(quantity)
+    
+    low["quantity"] = quantities
+    low["cost"] = low["quantity"] * low["unit_price"]
+    plan = low[low["quantity"] > 0]
+    return plan[["item_name", "current_stock", "on_order", "min_stock_level",
+                 "unit_price", "quantity", "cost"]].reset_index(drop=True)
+
+def commit_reorder_plan(plan: pd.DataFrame, order_date: str) -> List[int]:
+    """Record a reorder plan as one batch of stock_orders transactions."""
+    return create_transactions([
+        {
+            "item_name": row.item_name,
+            "transaction_type": "stock_orders",
+            "quantity": int(row.quantity),
+            "price": float(row.cost),
+            "date": order_date,
+            "delivery_date": get_supplier_delivery_date(order_date, int(row.quantity)),
+        }
+        for row in plan.itertuples()
+    ])
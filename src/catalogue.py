@@ -0,0 +1,142 @@
+"""
+Beaver's Choice Paper Company - Compact Catalogue
+Dense integer SKU ids for catalogue items.
+
+Items are numbered 0, 1, 2, ... in the order they are added. Names, category
+codes and unit prices are kept in parallel compact arrays indexed by SKU,
+with one dict from name to SKU. The ledger and inventory tables store SKUs,
+and the helpers in beaver_db still take and return item names: the SQLite
+ledger translates at its boundary.
+
+The `items` table (item_id, item_name, category, unit_price) records the
+numbering in the database so other tools and processes read SKUs the same
+way.
+"""
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class CatalogueItem:
+    """One catalogue entry (a lightweight record; the catalogue itself stores columns)."""
+
+    __slots__ = ("sku", "item_name", "category", "unit_price")
+
+    def __init__(self, sku: int, item_name: str, category: str, unit_price: float):
+        self.sku = sku
+        self.item_name = item_name
+        self.category = category
+        self.unit_price = unit_price
+
+    def __repr__(self) -> str:
+        return (f"CatalogueItem(sku={self.sku}, item_name={self.item_name!r}, "
+                f"category={self.category!r}, unit_price={self.unit_price})")
+
+
+class Catalogue:
+    """Items by dense SKU id: names, category codes and prices in parallel arrays."""
+
+    def __init__(self, records: Iterable[Dict] = ()):
+        self.reset(records)
+
+    def reset(self, records: Iterable[Dict] = ()) -> None:
+        """Renumber from scratch with `records` (item_name, category, unit_price) as SKUs 0, 1, ..."""
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._category_names: List[str] = []
+        self._category_ids: Dict[str, int] = {}
+        self._categories = array("H")
+        self._prices = array("d")
+        self.extend(records)
+
+    def add(self, item_name: str, category: str, unit_price: float) -> int:
+        """The SKU of `item_name`, numbering it next if it is new."""
+        sku = self._ids.get(item_name)
+        if sku is not None:
+            return sku
+        code = self._category_ids.get(category)
+        if code is None:
+            code = self._category_ids[category] = len(self._category_names)
+            self._category_names.append(category)
+        sku = self._ids[item_name] = len(self._names)
+        self._names.append(item_name)
+        self._categories.append(code)
+        self._prices.append(float(unit_price))
+        return sku
+
+    def extend(self, records: Iterable[Dict]) -> List[int]:
+        return [self.add(r["item_name"], r["category"], r["unit_price"]) for r in records]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, item_name: str) -> bool:
+        return item_name in self._ids
+
+    def __getitem__(self, sku: int) -> CatalogueItem:
+        return CatalogueItem(sku, self._names[sku], self._category_names[self._categories[sku]],
+                             self._prices[sku])
+
+    def __iter__(self) -> Iterator[CatalogueItem]:
+        return (self[sku] for sku in range(len(self)))
+
+    def sku(self, item_name: str) -> int:
+        """SKU of a catalogue item; ValueError for names not in the catalogue."""
+        sku = self._ids.get(item_name)
+        if sku is None:
+            raise ValueError(f"'{item_name}' is not in the catalogue")
+        return sku
+
+    def find(self, item_name: Optional[str]) -> Optional[int]:
+        """SKU of `item_name`, or None if it is not in the catalogue."""
+        return self._ids.get(item_name)
+
+    def skus(self, item_names: Iterable[str]) -> np.ndarray:
+        """SKUs for many names at once (-1 where a name is not in the catalogue)."""
+        get = self._ids.get
+        return np.fromiter((get(name, -1) for name in item_names), dtype=np.int64)
+
+    def name(self, sku: Optional[int]) -> Optional[str]:
+        return None if sku is None else self._names[sku]
+
+    def names(self, skus: Iterable[Optional[int]]) -> List[Optional[str]]:
+        names = self._names
+        return [None if sku is None or sku < 0 else names[sku] for sku in skus]
+
+    @property
+    def unit_prices(self) -> np.ndarray:
+        """Unit price per SKU (a read-only view, no copy)."""
+        return np.frombuffer(self._prices, dtype=np.float64)
+
+    @property
+    def category_codes(self) -> np.ndarray:
+        return np.frombuffer(self._categories, dtype=np.uint16)
+
+    @property
+    def categories(self) -> List[str]:
+        return list(self._category_names)
+
+    def to_frame(self) -> pd.DataFrame:
+        """The `items` table: item_id, item_name, category, unit_price."""
+        return pd.DataFrame({
+            "item_id": np.arange(len(self), dtype=np.int64),
+            "item_name": self._names,
+            "category": np.array(self._category_names, dtype=object)[self.category_codes]
+            if len(self) else np.empty(0, dtype=object),
+            "unit_price": self.unit_prices.copy(),
+        })
+
+    def load_frame(self, items: pd.DataFrame) -> None:
+        """Replace the contents with an `items` table (item_id must be 0..n-1)."""
+        items = items.sort_values("item_id")
+        if not np.array_equal(items["item_id"].to_numpy(), np.arange(len(items))):
+            raise ValueError("item ids must be dense: 0, 1, ..., n-1")
+        self.reset(items[["item_name", "category", "unit_price"]].to_dict("records"))
+
+
+# The catalogue the ledger backends number items with unless given another one;
+# beaver_db fills it with paper_supplies (and reloads it from a database's items table)
+default_catalogue = Catalogue()
@@ -0,0 +1,261 @@
+"""
+Beaver's Choice Paper Company - Columnar Export/Import
+Parquet snapshots of the ledger, quote history and run results for analysis.
+
+Tables are streamed out of SQLite in batches straight into Arrow columns (no
+per-row DataFrame construction) and written as hive-partitioned Parquet
+datasets, one partition per month:
+
+    exports/transactions/month=2025-04/part-0-0.parquet
+    exports/quotes/month=2025-01/...
+    exports/results/month=2025-04/...
+    exports/inventory/part-0-0.parquet, exports/items/..., exports/quote_requests/...
+
+Transactions carry both the SKU (item_id, see catalogue.py) and the item name.
+
+`read_dataset` loads only the requested columns and months; numeric columns
+convert to NumPy/pandas without copying.
+
+Usage:
+    python columnar_io.py export --out exports
+    python columnar_io.py import --from exports
+    python columnar_io.py convert-seeds --data-dir ../data
+"""
+
+import argparse
+import os
+import shutil
+from typing import Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import beaver_db
+from ledger_backends import CREATE_TRANSACTIONS_INDEX_SQL, CREATE_TRANSACTIONS_SQL, ShardedLedger
+
+# Table name -> (query, Arrow schema, partition by month?)
+LEDGER_TABLES = {
+    "items": (
+        "SELECT item_id, item_name, category, unit_price FROM items ORDER BY item_id",
+        pa.schema([
+            ("item_id", pa.int64()), ("item_name", pa.string()), ("category", pa.string()),
+            ("unit_price", pa.float64()),
+        ]),
+        False,
+    ),
+    "transactions": (
+        """SELECT t.rowid AS id, t.item_id, i.item_name, t.transaction_type, t.units, t.price,
+                  t.transaction_date, t.delivery_date, substr(t.transaction_date, 1, 7) AS month
+           FROM transactions t LEFT JOIN items i ON i.item_id = t.item_id ORDER BY t.rowid""",
+        pa.schema([
+            ("id", pa.int64()), ("item_id", pa.int64()), ("item_name", pa.string()),
+            ("transaction_type", pa.string()),
+            ("units", pa.int64()), ("price", pa.float64()), ("transaction_date", pa.string()),
+            ("delivery_date", pa.string()), ("month", pa.string()),
+        ]),
+        True,
+    ),
+    "quotes": (
+        """SELECT request_id, total_amount, quote_explanation, order_date, job_type, order_size,
+                  event_type, substr(order_date, 1, 7) AS month
+           FROM quotes""",
+        pa.schema([
+            ("request_id", pa.int64()), ("total_amount", pa.float64()),
+            ("quote_explanation", pa.string()), ("order_date", pa.string()),
+            ("job_type", pa.string()), ("order_size", pa.string()), ("event_type", pa.string()),
+            ("month", pa.string()),
+        ]),
+        True,
+    ),
+    "quote_requests": (
+        "SELECT id, mood, job, need_size, event, response FROM quote_requests",
+        pa.schema([
+            ("id", pa.int64()), ("mood", pa.string()), ("job", pa.string()),
+            ("need_size", pa.string()), ("event", pa.string()), ("response", pa.string()),
+        ]),
+        False,
+    ),
+    "inventory": (
+        "SELECT item_id, item_name, category, unit_price, current_stock, min_stock_level FROM inventory",
+        pa.schema([
+            ("item_id", pa.int64()), ("item_name", pa.string()), ("category", pa.string()), ("unit_price", pa.float64()),
+            ("current_stock", pa.int64()), ("min_stock_level", pa.int64()),
+        ]),
+        False,
+    ),
+}
+
+
+def query_batches(query: str, schema: pa.Schema, batch_size: int = 50_000) -> Iterator[pa.Table]:
+    """Run `query` on the ledger database and yield Arrow tables of up to `batch_size` rows."""
+    conn = beaver_db.db_engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            columns = list(zip(*rows))
+            yield pa.table(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema,
+            )
+    finally:
+        conn.close()
+
+
+def write_dataset(batches: Iterator[pa.Table], root: str, schema: pa.Schema, partitioned: bool) -> None:
+    """Replace the dataset at `root` with `batches`, hive-partitioned by month if requested."""
+    if os.path.exists(root):
+        shutil.rmtree(root)
+    os.makedirs(root)
+    for i, batch in enumerate(batches):
+        ds.write_dataset(
+            batch, root, format="parquet", schema=schema,
+            partitioning=ds.partitioning(pa.schema([("month", pa.string())]), flavor="hive")
+            if partitioned else None,
+            basename_template=f"part-{i}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+
+
+def _refuse_sharded() -> None:
+    """Export and import cover a single ledger; the shards' transactions live in other files."""
+    warehouses = beaver_db.recorded_warehouses(beaver_db.db_engine)
+    if warehouses or isinstance(beaver_db.ledger_backend, ShardedLedger):
+        raise ValueError(f"the database is sharded across warehouses ({', '.join(warehouses) or 'in use'}); "
+                         "Parquet export/import supports single-ledger databases only")
+
+
+def export_ledger(out_dir: str, tables: Optional[List[str]] = None, batch_size: int = 50_000) -> None:
+    """Export ledger tables from the current database to Parquet datasets under `out_dir`."""
+    _refuse_sharded()
+    for name in tables or LEDGER_TABLES:
+        query, schema, partitioned = LEDGER_TABLES[name]
+        write_dataset(query_batches(query, schema, batch_size), os.path.join(out_dir, name),
+                      schema, partitioned)
+
+
+def export_results(results_csv: str, out_dir: str) -> None:
+    """Convert a run's results CSV to a month-partitioned Parquet dataset."""
+    table = pacsv.read_csv(results_csv)
+    month = pc.utf8_slice_codeunits(table["request_date"].cast(pa.string()), 0, 7)
+    table = table.append_column("month", month)
+    write_dataset(iter([table]), os.path.join(out_dir, "results"), table.schema, partitioned=True)
+
+
+def read_dataset(root: str, name: str, columns: Optional[List[str]] = None,
+                 months: Optional[List[str]] = None) -> pa.Table:
+    """
+    Load an exported table, reading only `columns` and the `months` partitions.
+
+    Example:
+        sales = read_dataset("exports", "transactions", ["item_name", "units", "price"],
+                             months=["2025-04"])
+        df = sales.to_pandas()
+    """
+    dataset = ds.dataset(os.path.join(root, name), format="parquet", partitioning="hive")
+    row_filter = ds.field("month").isin(months) if months else None
+    return dataset.to_table(columns=columns, filter=row_filter)
+
+
+def import_ledger(in_dir: str, tables: Optional[List[str]] = None) -> None:
+    """
+    Load exported Parquet datasets back into the current database, replacing those tables.
+
+    Imported quote history gets its facet summary and indexes rebuilt and the
+    pricing model refitted, as init_database does for the seed tables.
+    """
+    _refuse_sharded()
+    imported = set()
+    for name in tables or LEDGER_TABLES:
+        root = os.path.join(in_dir, name)
+        if not os.path.exists(root):
+            continue
+        imported.add(name)
+        table = read_dataset(in_dir, name)
+        if "month" in table.column_names:
+            table = table.drop_columns(["month"])
+
+        if name == "transactions":
+            _import_transactions(table)
+        else:
+            table.to_pandas().to_sql(name, beaver_db.db_engine, if_exists="replace", index=False)
+
+    beaver_db.set_db_engine(beaver_db.db_engine)
+    if imported & {"quotes", "quote_requests"}:
+        quotes_df = pd.read_sql("SELECT * FROM quotes", beaver_db.db_engine)
+        beaver_db.build_quote_facets(beaver_db.db_engine, quotes_df)
+        beaver_db.fit_pricing_model(beaver_db.db_engine,
+                                    pd.read_sql("SELECT * FROM quote_requests", beaver_db.db_engine), quotes_df)
+
+
+def _import_transactions(table: pa.Table) -> None:
+    """Recreate the transactions table, keeping exported ids as rowids."""
+    table = table.sort_by("id")
+    if "item_id" not in table.column_names:
+        # Exports from before SKUs: number the names with the current catalogue
+        skus = [beaver_db.catalogue.find(name) for name in table["item_name"].to_pylist()]
+        table = table.append_column("item_id", pa.array(skus, type=pa.int64()))
+    # Exports from before units were stored as integers carry them as floats
+    table = table.set_column(table.schema.get_field_index("units"), "units", table["units"].cast(pa.int64()))
+    columns = ["item_id", "transaction_type", "units", "price", "transaction_date", "delivery_date"]
+    rows = zip(*(table[c].to_pylist() for c in ["id"] + columns))
+
+    conn = beaver_db.db_engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DROP TABLE IF EXISTS transactions")
+        cursor.execute(CREATE_TRANSACTIONS_SQL.format(extra=""))
+        cursor.execute(CREATE_TRANSACTIONS_INDEX_SQL)
+        cursor.executemany(
+            f"INSERT INTO transactions (rowid, {', '.join(columns)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def convert_seeds(data_dir: str) -> None:
+    """Write Parquet copies of the CSV seed tables for init_database(source_format="parquet")."""
+    for name in ["quote_requests", "quotes"]:
+        table = pacsv.read_csv(os.path.join(data_dir, f"{name}.csv"))
+        pq.write_table(table, os.path.join(data_dir, f"{name}.parquet"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parquet export/import of the ledger and results.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="export ledger tables (and results) to Parquet")
+    export_parser.add_argument("--out", default="exports")
+    export_parser.add_argument("--results", default="results/test_results.csv",
+                               help="results CSV to include (skipped if missing)")
+
+    import_parser = subparsers.add_parser("import", help="load a Parquet export into the database")
+    import_parser.add_argument("--from", dest="in_dir", default="exports")
+
+    seeds_parser = subparsers.add_parser("convert-seeds", help="write Parquet copies of the seed CSVs")
+    seeds_parser.add_argument("--data-dir", default=beaver_db.DATA_DIR)
+
+    args = parser.parse_args()
+    try:
+        if args.command == "export":
+            export_ledger(args.out)
+            if os.path.exists(args.results):
+                export_results(args.results, args.out)
+            print(f"Exported to '{args.out}'")
+        elif args.command == "import":
+            import_ledger(args.in_dir)
+            print(f"Imported from '{args.in_dir}'")
+        else:
+            convert_seeds(args.data_dir)
+            print(f"Parquet seed tables written to '{args.data_dir}'")
+    except ValueError as e:
+        parser.error(str(e))
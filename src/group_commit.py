@@ -0,0 +1,171 @@
+"""
+Beaver's Choice Paper Company - Group Commit
+Single-writer queue that commits transaction inserts from many threads in
+shared batches.
+
+Every commit to a file-backed SQLite database costs an fsync and the write
+lock, so concurrent sales and stock orders mostly wait on each other. With a
+`GroupCommitQueue`, callers submit their rows and wait on a future; one
+writer thread takes everything queued (up to `max_batch` rows) and records
+it in a single commit. Like commit_siblings in PostgreSQL, it waits for
+company only when there is evidence of concurrent writers: until the batch
+has as many submissions as the previous one, for at most `max_delay`
+seconds after the first. A lone writer is therefore never delayed.
+
+Each submission stays atomic: if a batch fails, its submissions are retried
+one by one so only the faulty one sees the error.
+
+beaver_db.enable_group_commit() routes create_transaction and
+create_transactions (and so the sale and stock-order tools) through a queue.
+
+Usage:
+    python group_commit.py --threads 8 --writes 200     # compare with direct commits
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+Submission = Tuple[List[Dict], Future]
+
+
+class GroupCommitQueue:
+    """Batches `commit(rows) -> ids` calls from many threads onto one writer thread."""
+
+    def __init__(self, commit: Callable[[List[Dict]], List[int]], max_batch: int = 256,
+                 max_delay: float = 0.002):
+        self.commit = commit
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: "queue.SimpleQueue[Optional[Submission]]" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self.submissions = 0
+        self._writer = threading.Thread(target=self._run, name="beaver-group-commit", daemon=True)
+        self._writer.start()
+
+    def submit(self, rows: List[Dict]) -> Future:
+        """Queue rows to be committed together; the future resolves to their ids, in order."""
+        if not self._writer.is_alive():
+            raise RuntimeError("group commit queue is closed")
+        future: Future = Future()
+        self._queue.put((list(rows), future))
+        return future
+
+    def append(self, rows: List[Dict]) -> List[int]:
+        """Commit rows through the queue and wait for their ids (a drop-in for LedgerBackend.append)."""
+        return self.submit(rows).result()
+
+    def flush(self) -> None:
+        """Wait until everything submitted so far is committed."""
+        if self._writer.is_alive():
+            self.submit([]).result()
+
+    def close(self) -> None:
+        """Commit what is queued and stop the writer."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+    def _run(self) -> None:
+        expected = 1
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, rows, stopping = [first], len(first[0]), False
+            deadline = time.monotonic() + self.max_delay
+            while rows < self.max_batch:
+                try:
+                    remaining = deadline - time.monotonic()
+                    if len(batch) < expected and remaining > 0:
+                        item = self._queue.get(timeout=remaining)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                rows += len(item[0])
+            expected = len(batch)
+            self._commit(batch)
+            if stopping:
+                return
+
+    def _commit(self, batch: List[Submission]) -> None:
+        rows = [row for submitted, _ in batch for row in submitted]
+        try:
+            ids = self.commit(rows) if rows else []
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            for submission in batch:
+                self._commit([submission])
+            return
+        with self._lock:
+            self.batches += 1 if rows else 0
+            self.rows += len(rows)
+            self.submissions += len(batch)
+        start = 0
+        for submitted, future in batch:
+            future.set_result(list(ids[start:start + len(submitted)]))
+            start += len(submitted)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {"batches": self.batches, "rows": self.rows, "submissions": self.submissions,
+                    "mean_batch_rows": self.rows / self.batches if self.batches else 0.0}
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    from sqlalchemy import create_engine
+
+    import beaver_db
+
+    parser = argparse.ArgumentParser(description="Compare direct and group commits of concurrent sales.")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=200, help="transactions per thread")
+    parser.add_argument("--max-delay-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    item = beaver_db.paper_supplies[0]["item_name"]
+
+    def writer(_):
+        latencies = []
+        for _ in range(args.writes):
+            start = time.perf_counter()
+            beaver_db.create_transaction(item, "sales", 1, 0.05, "2025-04-15")
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ("direct", "group commit"):
+            path = os.path.join(directory, f"{mode.replace(' ', '_')}.db")
+            beaver_db.set_db_engine(create_engine(f"sqlite:///{path}"))
+            beaver_db.init_database(beaver_db.db_engine, data_dir=beaver_db.DATA_DIR)
+            if mode == "group commit":
+                beaver_db.enable_group_commit(max_delay=args.max_delay_ms / 1000)
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.threads) as pool:
+                latencies = sorted(l for thread in pool.map(writer, range(args.threads)) for l in thread)
+            elapsed = time.perf_counter() - start
+            total = args.threads * args.writes
+            print(f"{mode:>12}: {total} transactions from {args.threads} threads in {elapsed:.2f}s "
+                  f"({total / elapsed:.0f}/s), p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+                  f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+            if beaver_db.write_queue is not None:
+                print(f"{'':>12}  {beaver_db.write_queue.stats()}")
+                beaver_db.disable_group_commit()
+            assert beaver_db.get_last_transaction_id() >= total
+            beaver_db.db_engine.dispose()
@@ -0,0 +1,385 @@
+"""
+Beaver's Choice Paper Company - HTTP Service
+Serves stock checks, quotes, orders and (optionally) agent requests over HTTP.
+
+An asyncio server (standard library only, JSON over HTTP/1.1 with
+keep-alive) accepts requests; database work runs on beaver_db's worker pool
+through `run_db`, and agent requests on the agent pool. Concurrent stock
+checks, quotes and orders are micro-batched: requests arriving within a
+couple of milliseconds of each other are answered by one ledger query, one
+`quote_orders` call or one `create_transactions` commit.
+
+Endpoints:
+    GET  /health
+    GET  /stats                                   batching and request counters
+    GET  /stock?item=A4+paper&item=...&as_of=YYYY-MM-DD
+    POST /quote    {"items": {"A4 paper": 500}}
+    POST /order    {"items": {"A4 paper": 500}, "request_date": "YYYY-MM-DD"}
+    POST /request  {"request": "...", "request_date": "YYYY-MM-DD"}   (needs --agents)
+
+Usage:
+    python http_service.py --db munder_difflin.db --init --port 8080 [--agents]
+"""
+
+import argparse
+import asyncio
+import json
+from collections import defaultdict
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+import beaver_db
+from beaver_db import run_db
+
+MAX_BODY_BYTES = 1 << 20
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error",
+               503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class MicroBatcher:
+    """
+    Collects concurrent submissions into one call of `handler` on the DB pool.
+
+    A batch is flushed `max_delay` seconds after its first item arrives, or
+    as soon as it holds `max_batch` items. `handler` takes the list of items
+    and returns one result (or exception) per item. With `serial=True` one
+    batch runs at a time, in arrival order (for writes): whatever arrives
+    while a batch runs goes into the next one, so a slow commit makes the
+    next batch bigger rather than queueing single-item batches behind it.
+    """
+
+    def __init__(self, handler: Callable[[List[Any]], List[Any]], max_batch: int = 64,
+                 max_delay: float = 0.002, serial: bool = False):
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.serial = serial
+        self._busy = False
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self.serial and self._busy:
+            return  # picked up when the running batch finishes
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        if batch:
+            self._busy = True
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        items = [item for item, _ in batch]
+        try:
+            results = await run_db(self.handler, items)
+        except Exception as e:
+            results = [e] * len(batch)
+        self._busy = False
+        if self._pending and (self.serial or len(self._pending) >= self.max_batch):
+            self._flush()
+        self.batches += 1
+        self.items += len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, float]:
+        return {"batches": self.batches, "items": self.items,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0}
+
+
+# ==================== BATCH HANDLERS ====================
+# Called on a DB worker thread with every request in a batch
+
+def stock_batch(requests: List[Tuple[List[str], str]]) -> List[Dict[str, float]]:
+    """(item names, as_of_date) per request -> stock per item; one ledger query per date."""
+    wanted: Dict[str, set] = defaultdict(set)
+    for items, as_of in requests:
+        wanted[as_of].update(items)
+    levels = {as_of: beaver_db.get_stock_levels(sorted(items), as_of) for as_of, items in wanted.items()}
+    return [{item: levels[as_of][item] for item in items} for items, as_of in requests]
+
+
+def quote_batch(orders: List[Dict[str, int]]) -> List[Dict]:
+    """item -> quantity per order -> priced lines and discounted totals, from one quote_orders call."""
+    frame = pd.DataFrame(
+        [(i, item, quantity) for i, items in enumerate(orders) for item, quantity in items.items()],
+        columns=["request_id", "item_name", "quantity"],
+    )
+    lines, totals = beaver_db.quote_orders(frame)
+    totals = totals.set_index("request_id")
+    quotes = []
+    for i in range(len(orders)):
+        order_lines = lines[lines["request_id"] == i]
+        total = totals.loc[i]
+        quotes.append({
+            "lines": [{"item_name": line.item_name, "quantity": int(line.quantity),
+                       "unit_price": None if pd.isna(line.unit_price) else float(line.unit_price),
+                       "item_total": float(line.item_total), "available": bool(line.available)}
+                      for line in order_lines.itertuples()],
+            "subtotal": float(total["subtotal"]),
+            "discount_rate": float(total["discount_rate"]),
+            "discount_amount": float(total["discount_amount"]),
+            "total": float(total["total"]),
+        })
+    return quotes
+
+
+def order_batch(orders: List[Tuple[Dict[str, int], str]]) -> List[Dict]:
+    """
+    Fill orders in arrival order from available-to-promise stock (as
+    create_sale_tool does) and record every accepted sale in one commit. Line
+    prices carry the order's bulk discount, so cash moves by the quoted total.
+    
+    The check and the commit run under beaver_db.sale_lock, so agent sales
+    cannot promise the same units in between. Units accepted earlier in the
+    batch count against every later order, whatever the dates: a sale lowers
+    what can be promised on any date by at most its quantity.
+    """
+    quotes = quote_batch([items for items, _ in orders])
+    results: List[Dict] = []
+    rows: List[Dict] = []
+    owners: List[int] = []
+    with beaver_db.sale_lock:
+        index = beaver_db.get_availability_index()
+        sold: Dict[str, int] = defaultdict(int)
+        for i, ((items, request_date), quote) in enumerate(zip(orders, quotes)):
+            unknown = [line["item_name"] for line in quote["lines"] if not line["available"]]
+            short = [item for item, quantity in items.items() if item not in unknown
+                     and index.available_to_promise(item, request_date) - sold[item] < quantity]
+            if unknown or short:
+                reason = (f"not in the catalogue: {', '.join(unknown)}" if unknown
+                          else f"insufficient stock: {', '.join(short)}")
+                results.append({"status": "rejected", "reason": reason, "quote": quote})
+                continue
+            for line in quote["lines"]:
+                sold[line["item_name"]] += line["quantity"]
+                rows.append({"item_name": line["item_name"], "transaction_type": "sales",
+                             "quantity": line["quantity"], "date": request_date,
+                             "price": round(line["item_total"] * (1 - quote["discount_rate"]), 2)})
+                owners.append(i)
+            results.append({
+                "status": "accepted", "transaction_ids": [], "total": quote["total"],
+                "delivery_date": beaver_db.get_supplier_delivery_date(request_date, sum(items.values())),
+            })
+
+        if rows:
+            for owner, transaction_id in zip(owners, beaver_db.create_transactions(rows)):
+                results[owner]["transaction_ids"].append(transaction_id)
+    return results
+
+
+# ==================== SERVICE ====================
+
+def _parse_items(body: Dict) -> Dict[str, int]:
+    items = body.get("items")
+    if not isinstance(items, dict) or not items:
+        raise HTTPError(400, 'expected "items": {"item name": quantity, ...}')
+    try:
+        parsed = {str(item): int(quantity) for item, quantity in items.items()}
+    except (TypeError, ValueError):
+        raise HTTPError(400, "quantities must be integers")
+    if any(quantity <= 0 for quantity in parsed.values()):
+        raise HTTPError(400, "quantities must be positive")
+    return parsed
+
+
+def _parse_date(value: Any, name: str) -> str:
+    """`value` as a YYYY-MM-DD date string (today if it is missing)."""
+    if not value:
+        return date.today().isoformat()
+    try:
+        return date.fromisoformat(str(value)).isoformat()
+    except ValueError:
+        raise HTTPError(400, f"{name} must be a YYYY-MM-DD date")
+
+
+class BeaverService:
+    """Route handlers, their micro-batchers and request counters."""
+
+    def __init__(self, max_batch: int = 64, max_delay: float = 0.002, agents: bool = False):
+        self.stock_batcher = MicroBatcher(stock_batch, max_batch, max_delay)
+        self.quote_batcher = MicroBatcher(quote_batch, max_batch, max_delay)
+        self.order_batcher = MicroBatcher(order_batch, max_batch, max_delay, serial=True)
+        self.agents = None
+        if agents:
+            # Creates the LLM client and the agents; only needed for /request
+            import beaver_choice_multi_agent
+            self.agents = beaver_choice_multi_agent
+        self.requests: Dict[str, int] = defaultdict(int)
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/stats"): self.stats,
+            ("GET", "/stock"): self.stock,
+            ("POST", "/quote"): self.quote,
+            ("POST", "/order"): self.order,
+            ("POST", "/request"): self.customer_request,
+        }
+
+    async def health(self, query, body) -> Dict:
+        return {"status": "ok"}
+
+    async def stats(self, query, body) -> Dict:
+        return {
+            "requests": dict(self.requests),
+            "batching": {"stock": self.stock_batcher.stats(), "quote": self.quote_batcher.stats(),
+                         "order": self.order_batcher.stats()},
+            "report_cache": beaver_db.report_cache.stats(),
+            "group_commit": beaver_db.write_queue.stats() if beaver_db.write_queue is not None else None,
+        }
+
+    async def stock(self, query, body) -> Dict:
+        items = query.get("item")
+        if not items:
+            raise HTTPError(400, "pass one or more ?item= parameters")
+        as_of = _parse_date(query.get("as_of", [None])[0], "as_of")
+        return {"as_of_date": as_of, "stock": await self.stock_batcher.submit((items, as_of))}
+
+    async def quote(self, query, body) -> Dict:
+        return await self.quote_batcher.submit(_parse_items(body))
+
+    async def order(self, query, body) -> Dict:
+        items = _parse_items(body)
+        request_date = _parse_date(body.get("request_date"), "request_date")
+        result = await self.order_batcher.submit((items, request_date))
+        if result["status"] != "accepted":
+            raise HTTPError(409, result["reason"])
+        return result
+
+    async def customer_request(self, query, body) -> Dict:
+        if self.agents is None:
+            raise HTTPError(503, "agent requests are disabled; start the service with --agents")
+        request = body.get("request")
+        if not request:
+            raise HTTPError(400, 'expected "request": "..."')
+        request_date = _parse_date(body.get("request_date"), "request_date")
+        response = await self.agents.process_customer_request_async(request, request_date,
+                                                                    body.get("request_id"))
+        return {"request_date": request_date, "response": response}
+
+    async def dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, Dict]:
+        url = urlsplit(target)
+        handler = self.routes.get((method, url.path))
+        if handler is None:
+            known = any(path == url.path for _, path in self.routes)
+            return (405, {"error": "method not allowed"}) if known else (404, {"error": "not found"})
+        self.requests[url.path] += 1
+        try:
+            payload = json.loads(body) if body else {}
+            if not isinstance(payload, dict):
+                raise HTTPError(400, "expected a JSON object")
+            return 200, await handler(parse_qs(url.query), payload)
+        except json.JSONDecodeError as e:
+            return 400, {"error": f"invalid JSON: {e}"}
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one keep-alive connection until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "malformed request line"}, close=True)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", "0") or 0)
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": "request body too large"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                close = (headers.get("connection", "").lower() == "close"
+                         or (version == "HTTP/1.0" and headers.get("connection", "").lower() != "keep-alive"))
+                status, payload = await self.dispatch(method.upper(), target, body)
+                await self._respond(writer, status, payload, close=close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: Dict, close: bool) -> None:
+        body = json.dumps(payload, default=str).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+
+async def serve(service: BeaverService, host: str = "127.0.0.1", port: int = 8080) -> None:
+    server = await asyncio.start_server(service.handle_connection, host, port, backlog=1024)
+    print(f"Serving on http://{host}:{port} (Ctrl+C to stop)")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve stock, quotes, orders and agent requests over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--db", default="munder_difflin.db", help="SQLite database file")
+    parser.add_argument("--init", action="store_true", help="(re)initialize the database first")
+    parser.add_argument("--agents", action="store_true", help="enable POST /request (loads the LLM agents)")
+    parser.add_argument("--max-batch", type=int, default=64, help="largest micro-batch (1 disables batching)")
+    parser.add_argument("--max-delay-ms", type=float, default=2.0,
+                        help="how long a micro-batch waits for company after its first request")
+    args = parser.parse_args()
+
+    beaver_db.set_db_engine(create_engine(f"sqlite:///{args.db}"))
+    if args.init:
+        beaver_db.init_database(beaver_db.db_engine, data_dir=beaver_db.DATA_DIR)
+    # Order batches and agent sales share one writer (see group_commit.py)
+    beaver_db.enable_group_commit()
+    service = BeaverService(args.max_batch, args.max_delay_ms / 1000, agents=args.agents)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
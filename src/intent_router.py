@@ -0,0 +1,117 @@
+"""
+Keyword intent router for customer requests.
+
+Classifies a request locally (a handful of precompiled regexes, microseconds)
+so clear-cut requests can go straight to the right specialist agent and skip
+the orchestrator's LLM round trip. Anything ambiguous, including ordinary
+purchase requests that need both a quote and a sale, is left to the
+orchestrator.
+
+Every request in data/quote_requests_sample.csv is such a new purchase, so
+the scenario run sends all of them to the orchestrator; direct dispatch pays
+off for stock questions, price enquiries and quote acceptances, e.g. follow-up
+requests to the HTTP service's /request endpoint.
+"""
+
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# Intent -> patterns. "order" has no specialist of its own: a new purchase
+# needs pricing and a sale, which is exactly what the orchestrator coordinates.
+INTENT_PATTERNS = {
+    "inventory": [
+        r"\bin stock\b", r"\bstock levels?\b", r"\binventory\b", r"\bdo you (?:have|carry)\b",
+        r"\bhow many\b.*\b(?:left|available|have)\b", r"\bavailability\b",
+    ],
+    "quote": [
+        r"\bquotes?\b", r"\bquotation\b", r"\bpric(?:e|es|ing)\b", r"\bhow much\b",
+        r"\bcost\b", r"\bestimate\b",
+    ],
+    # Only acceptances of an earlier quote; "please confirm the order" on a new
+    # purchase is still a new order.
+    "sales": [
+        r"\baccept (?:the|your) (?:quote|quotation)\b", r"\bas quoted\b",
+        r"\b(?:go ahead|proceed) with (?:the|your) (?:quote|quotation|quoted order)\b",
+    ],
+    "order": [
+        r"\border\b", r"\bpurchase\b", r"\bbuy\b", r"\bdeliver(?:y|ed)?\b", r"\bneed\b",
+        r"\brequest(?:ing)? the following\b", r"\bsupply\b", r"\bsend\b",
+    ],
+}
+
+SPECIALIST_INTENTS = {"inventory", "quote", "sales"}
+
+
+@dataclass
+class RoutingDecision:
+    intent: Optional[str]
+    confident: bool
+    scores: Dict[str, int]
+    classify_seconds: float
+    route: str = "orchestrator"
+    elapsed_seconds: float = 0.0
+    orchestrator_seconds: float = 0.0
+
+
+class IntentRouter:
+    """Score a request against each intent's patterns and decide where to send it."""
+
+    def __init__(self, patterns: Optional[Dict[str, List[str]]] = None):
+        self._compiled = {
+            intent: [re.compile(p, re.IGNORECASE) for p in intent_patterns]
+            for intent, intent_patterns in (patterns or INTENT_PATTERNS).items()
+        }
+        self._lock = threading.Lock()
+        self.decisions: List[RoutingDecision] = []
+
+    def classify(self, request: str) -> RoutingDecision:
+        """Return the request's intent; confident only when exactly one specialist intent matches."""
+        start = time.perf_counter()
+        scores = {
+            intent: sum(1 for p in compiled if p.search(request))
+            for intent, compiled in self._compiled.items()
+        }
+        matched = [intent for intent, score in scores.items() if score]
+        # Accepting a quote restates it, so it also matches "quote" and "order"
+        if "sales" in matched:
+            matched = ["sales"]
+        intent = matched[0] if len(matched) == 1 else None
+        confident = intent in SPECIALIST_INTENTS
+        return RoutingDecision(intent, confident, scores, time.perf_counter() - start)
+
+    def record(self, decision: RoutingDecision, route: str, elapsed_seconds: float,
+               orchestrator_seconds: float = 0.0) -> None:
+        """Log where a request went, how long it took and the orchestrator's own share."""
+        decision.route = route
+        decision.elapsed_seconds = elapsed_seconds
+        decision.orchestrator_seconds = orchestrator_seconds
+        with self._lock:
+            self.decisions.append(decision)
+
+    def stats(self) -> Dict:
+        """Routing counts and the estimated latency saved by direct dispatch.
+
+        The saving is estimated as the mean time the orchestrator spent in its
+        own model calls on orchestrated requests, times the number of requests
+        that were dispatched directly.
+        """
+        with self._lock:
+            decisions = list(self.decisions)
+        routes: Dict[str, int] = {}
+        for d in decisions:
+            routes[d.route] = routes.get(d.route, 0) + 1
+        orchestrated = [d.orchestrator_seconds for d in decisions if d.route == "orchestrator"]
+        direct = sum(1 for d in decisions if d.route != "orchestrator")
+        hop = sum(orchestrated) / len(orchestrated) if orchestrated else None
+        return {
+            "routes": routes,
+            "direct": direct,
+            "orchestrated": len(orchestrated),
+            "mean_classify_us": (sum(d.classify_seconds for d in decisions) / len(decisions) * 1e6
+                                 if decisions else 0.0),
+            "mean_orchestrator_hop_seconds": hop,
+            "estimated_seconds_saved": direct * hop if hop is not None else None,
+        }
@@ -0,0 +1,556 @@
+"""
+Beaver's Choice Paper Company - Ledger Storage Backends
+Where the transactions ledger lives. The helpers in beaver_db.py read and
+write transactions only through a `LedgerBackend`:
+
+- SQLiteLedger: the `transactions` table of a SQLAlchemy engine (the default),
+  with items stored as catalogue SKU ids
+- NumpyLedger: append-only NumPy column arrays kept sorted by date, with
+  integer item ids, for simulations and benchmarks that do not need a
+  database file
+- ShardedLedger: one SQLite file per warehouse, so writes for different
+  warehouses never wait on the same lock; reads cover the warehouse of the
+  active `warehouse_scope`, or every warehouse outside one
+
+Rows passed to `reset` and `append` are normalized dicts with item_name,
+transaction_type, units, price, transaction_date and delivery_date (ISO
+date strings; delivery_date is never None for stock orders).
+"""
+
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Engine
+
+from catalogue import Catalogue, default_catalogue
+from prepared_queries import PreparedQueries
+
+TRANSACTION_COLUMNS = ["item_name", "transaction_type", "units", "price",
+                       "transaction_date", "delivery_date"]
+
+# The SQLite ledger stores the item as its SKU (catalogue.py) rather than its name
+CREATE_TRANSACTIONS_SQL = """
+    CREATE TABLE transactions (id INTEGER, {extra}item_id INTEGER, transaction_type TEXT, units INTEGER,
+                               price REAL, transaction_date TEXT, delivery_date TEXT)
+"""
+CREATE_TRANSACTIONS_INDEX_SQL = "CREATE INDEX idx_transactions_item_date ON transactions (item_id, transaction_date)"
+
+
+class LedgerBackend:
+    """Storage interface for the transactions ledger."""
+
+    def reset(self, transactions: Iterable[Dict] = ()) -> None:
+        """Drop every transaction and start over with `transactions`."""
+        raise NotImplementedError
+
+    def append(self, transactions: List[Dict]) -> List[int]:
+        """Record transactions atomically and return their ids, in input order."""
+        raise NotImplementedError
+
+    def stock_levels(self, as_of_date: str, item_names: Optional[List[str]] = None) -> Dict[str, float]:
+        """Units on hand per item as of a date (stock orders count once delivered)."""
+        raise NotImplementedError
+
+    def cash_balance(self, as_of_date: str) -> float:
+        """Sales minus stock purchases up to and including a date."""
+        raise NotImplementedError
+
+    def top_sales(self, as_of_date: str, limit: int = 5) -> List[Dict]:
+        """Per-item units and revenue from sales up to a date, highest revenue first."""
+        raise NotImplementedError
+
+    def pending_deliveries(self, as_of_date: str) -> Dict[str, int]:
+        """Units ordered on or before a date but delivered after it, per item."""
+        raise NotImplementedError
+
+    def stock_events(self) -> pd.DataFrame:
+        """item_name, transaction_type, units and event_date (delivery date for stock orders)."""
+        raise NotImplementedError
+
+    def last_transaction_id(self) -> int:
+        raise NotImplementedError
+
+    def discard_after(self, transaction_id: int) -> int:
+        """Delete transactions newer than `transaction_id`; return how many were removed."""
+        raise NotImplementedError
+
+
+# Statements run through PreparedQueries; constant text lets sqlite3 reuse the prepared statement
+STOCK_LEVEL_CASE = """
+    SUM(CASE
+        WHEN transaction_type = 'stock_orders'
+             AND COALESCE(delivery_date, transaction_date) <= :as_of_date THEN units
+        WHEN transaction_type = 'sales' THEN -units
+        ELSE 0
+    END)
+"""
+STOCK_LEVELS_SQL = f"""
+    SELECT item_id, {STOCK_LEVEL_CASE}
+    FROM transactions
+    WHERE item_id IS NOT NULL AND transaction_date <= :as_of_date
+    GROUP BY item_id
+"""
+ITEM_STOCK_LEVEL_SQL = f"""
+    SELECT item_id, {STOCK_LEVEL_CASE}
+    FROM transactions
+    WHERE item_id = :item_id AND transaction_date <= :as_of_date
+    GROUP BY item_id
+"""
+CASH_BALANCE_SQL = """
+    SELECT COALESCE(SUM(CASE transaction_type WHEN 'sales' THEN price
+                                              WHEN 'stock_orders' THEN -price END), 0.0)
+    FROM transactions
+    WHERE transaction_date <= :as_of_date
+"""
+TOP_SALES_SQL = """
+    SELECT item_id, SUM(units) as total_units, SUM(price) as total_revenue
+    FROM transactions
+    WHERE transaction_type = 'sales' AND transaction_date <= :date
+    GROUP BY item_id
+    ORDER BY total_revenue DESC
+    LIMIT :limit
+"""
+PENDING_DELIVERIES_SQL = """
+    SELECT item_id, SUM(units) AS pending
+    FROM transactions
+    WHERE transaction_type = 'stock_orders' AND transaction_date <= :as_of_date
+          AND delivery_date > :as_of_date
+    GROUP BY item_id
+"""
+INSERT_TRANSACTION_SQL = """
+    INSERT INTO transactions (item_id, transaction_type, units, price,
+                              transaction_date, delivery_date)
+    VALUES (:item_id, :transaction_type, :units, :price,
+            :transaction_date, :delivery_date)
+"""
+
+
+class SQLiteLedger(LedgerBackend):
+    """Ledger stored in the `transactions` table of `engine`, items as SKUs of `catalogue`."""
+
+    def __init__(self, engine: Engine, catalogue: Optional[Catalogue] = None):
+        self.engine = engine
+        self.queries = PreparedQueries(engine)
+        self.catalogue = default_catalogue if catalogue is None else catalogue
+
+    def has_table(self, name: str) -> bool:
+        return self.queries.scalar("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = :name",
+                                   {"name": name}) > 0
+
+    def _create_table(self, extra_columns: str = "") -> None:
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql("DROP TABLE IF EXISTS transactions")
+            conn.exec_driver_sql(CREATE_TRANSACTIONS_SQL.format(extra=extra_columns))
+            conn.exec_driver_sql(CREATE_TRANSACTIONS_INDEX_SQL)
+
+    def _with_skus(self, transactions: List[Dict]) -> List[Dict]:
+        """Rows with item_id set from item_name (ValueError for items not in the catalogue)."""
+        sku = self.catalogue.sku
+        return [{**t, "item_id": None if t["item_name"] is None else sku(t["item_name"])}
+                for t in transactions]
+
+    def reset(self, transactions: Iterable[Dict] = ()) -> None:
+        rows = self._with_skus(list(transactions))
+        self._create_table()
+        if rows:
+            self.queries.execute_each(INSERT_TRANSACTION_SQL, rows)
+
+    def append(self, transactions: List[Dict]) -> List[int]:
+        return self.queries.execute_each(INSERT_TRANSACTION_SQL, self._with_skus(transactions))[0]
+
+    def stock_levels(self, as_of_date: str, item_names: Optional[List[str]] = None) -> Dict[str, float]:
+        name = self.catalogue.name
+        if item_names is None:
+            rows = self.queries.all(STOCK_LEVELS_SQL, {"as_of_date": as_of_date})
+        elif len(item_names) == 1:
+            sku = self.catalogue.find(item_names[0])
+            rows = [] if sku is None else self.queries.all(ITEM_STOCK_LEVEL_SQL,
+                                                           {"as_of_date": as_of_date, "item_id": sku})
+        else:
+            wanted = {sku for sku in map(self.catalogue.find, item_names) if sku is not None}
+            rows = [row for row in self.queries.all(STOCK_LEVELS_SQL, {"as_of_date": as_of_date})
+                    if row[0] in wanted]
+        return {name(sku): units for sku, units in rows}
+
+    def cash_balance(self, as_of_date: str) -> float:
+        return float(self.queries.scalar(CASH_BALANCE_SQL, {"as_of_date": as_of_date}))
+
+    def top_sales(self, as_of_date: str, limit: int = 5) -> List[Dict]:
+        rows = self.queries.all(TOP_SALES_SQL, {"date": as_of_date, "limit": limit})
+        name = self.catalogue.name
+        return [{"item_name": name(sku), "total_units": units, "total_revenue": revenue}
+                for sku, units, revenue in rows]
+
+    def pending_deliveries(self, as_of_date: str) -> Dict[str, int]:
+        rows = self.queries.all(PENDING_DELIVERIES_SQL, {"as_of_date": as_of_date})
+        name = self.catalogue.name
+        return {name(sku): int(pending) for sku, pending in rows}
+
+    def stock_events(self) -> pd.DataFrame:
+        events = pd.read_sql("""
+            SELECT item_id, transaction_type, units,
+                   CASE WHEN transaction_type = 'stock_orders'
+                        THEN COALESCE(delivery_date, transaction_date)
+                        ELSE transaction_date END AS event_date
+            FROM transactions
+            WHERE item_id IS NOT NULL
+        """, self.engine)
+        events.insert(0, "item_name", self.catalogue.names(events.pop("item_id").tolist()))
+        return events
+
+    def last_transaction_id(self) -> int:
+        return int(self.queries.scalar("SELECT COALESCE(MAX(rowid), 0) FROM transactions"))
+
+    def discard_after(self, transaction_id: int) -> int:
+        return self.queries.execute("DELETE FROM transactions WHERE rowid > :id", {"id": transaction_id})
+
+
+def _days(dates) -> np.ndarray:
+    """ISO date(time) strings to integer days since the epoch."""
+    return np.array([d[:10] for d in dates], dtype="datetime64[D]").astype(np.int64)
+
+
+class NumpyLedger(LedgerBackend):
+    """
+    In-memory ledger held as NumPy columns sorted by transaction date.
+
+    Item names are mapped to integer ids on first use. As-of queries are
+    binary searches over prefix sums:
+
+    - cash: `searchsorted` on the transaction days, then one lookup in the
+      cumulative signed cash flow
+    - stock: events are sorted by (item id, effective day) so each item is a
+      contiguous run; a level is the difference of two cumulative sums found
+      with `searchsorted`, for all items at once
+
+    The sorted views are rebuilt lazily after writes. Dates are compared at
+    day resolution, so a timestamped transaction counts from the start of
+    its day.
+    """
+
+    # Stock event keys pack (item id, day): item_id * _KEY_SPAN + day + _DAY_OFFSET
+    _KEY_SPAN = 1 << 32
+    _DAY_OFFSET = 1 << 31
+
+    def __init__(self, transactions: Iterable[Dict] = ()):
+        self.reset(transactions)
+
+    def reset(self, transactions: Iterable[Dict] = ()) -> None:
+        self._item_ids: Dict[Optional[str], int] = {}
+        self._item_names: List[Optional[str]] = []
+        self.ids = np.empty(0, dtype=np.int64)
+        self.items = np.empty(0, dtype=np.int64)
+        self.is_sale = np.empty(0, dtype=bool)
+        self.units = np.empty(0, dtype=float)
+        self.prices = np.empty(0, dtype=float)
+        self.days = np.empty(0, dtype=np.int64)
+        self.delivery_days = np.empty(0, dtype=np.int64)
+        self._next_id = 1
+        self._views = None
+        transactions = list(transactions)
+        if transactions:
+            self.append(transactions)
+
+    def _item_id(self, item_name: Optional[str]) -> int:
+        item_id = self._item_ids.get(item_name)
+        if item_id is None:
+            item_id = self._item_ids[item_name] = len(self._item_names)
+            self._item_names.append(item_name)
+        return item_id
+
+    def append(self, transactions: List[Dict]) -> List[int]:
+        if not transactions:
+            return []
+        ids = np.arange(self._next_id, self._next_id + len(transactions), dtype=np.int64)
+        days = _days([t["transaction_date"] for t in transactions])
+        delivery_days = _days([t["delivery_date"] or t["transaction_date"] for t in transactions])
+        columns = {
+            "ids": ids,
+            "items": np.array([self._item_id(t["item_name"]) for t in transactions], dtype=np.int64),
+            "is_sale": np.array([t["transaction_type"] == "sales" for t in transactions]),
+            "units": np.array([np.nan if t["units"] is None else t["units"] for t in transactions], dtype=float),
+            "prices": np.array([t["price"] for t in transactions], dtype=float),
+            "days": days,
+            "delivery_days": delivery_days,
+        }
+        in_order = len(self.days) == 0 or days.min() >= self.days[-1]
+        for name, values in columns.items():
+            setattr(self, name, np.concatenate([getattr(self, name), values]))
+        if not in_order or np.any(np.diff(days) < 0):
+            # Back-dated rows: restore date order (stable, so ids stay ordered within a day)
+            order = np.argsort(self.days, kind="stable")
+            for name in columns:
+                setattr(self, name, getattr(self, name)[order])
+        self._next_id += len(transactions)
+        self._views = None
+        return ids.tolist()
+
+    def _build_views(self) -> Dict[str, np.ndarray]:
+        if self._views is None:
+            signed_cash = np.where(self.is_sale, self.prices, -self.prices)
+            stocked = ~np.isnan(self.units) & (self.items != self._item_ids.get(None, -1))
+            items = self.items[stocked]
+            # A stock order counts once it has been both placed and delivered
+            effective = np.where(self.is_sale[stocked], self.days[stocked],
+                                 np.maximum(self.days[stocked], self.delivery_days[stocked]))
+            keys = items * self._KEY_SPAN + effective + self._DAY_OFFSET
+            order = np.argsort(keys, kind="stable")
+            deltas = np.where(self.is_sale[stocked], -self.units[stocked], self.units[stocked])[order]
+            self._views = {
+                "cash": np.concatenate([[0.0], np.cumsum(signed_cash)]),
+                "stock_keys": keys[order],
+                "stock": np.concatenate([[0.0], np.cumsum(deltas)]),
+                # Items whose first transaction is on or before a day appear in snapshots
+                "first_day": np.full(len(self._item_names), np.iinfo(np.int64).max),
+            }
+            np.minimum.at(self._views["first_day"], self.items, self.days)
+        return self._views
+
+    def stock_levels(self, as_of_date: str, item_names: Optional[List[str]] = None) -> Dict[str, float]:
+        views = self._build_views()
+        day = _days([as_of_date])[0]
+        names = [n for n in self._item_names if n is not None] if item_names is None else item_names
+        known = [n for n in names if n in self._item_ids]
+        ids = np.array([self._item_ids[n] for n in known], dtype=np.int64)
+        if len(ids) == 0:
+            return {}
+        present = views["first_day"][ids] <= day
+        ids = ids[present]
+        start = np.searchsorted(views["stock_keys"], ids * self._KEY_SPAN, side="left")
+        end = np.searchsorted(views["stock_keys"], ids * self._KEY_SPAN + day + self._DAY_OFFSET, side="right")
+        levels = views["stock"][end] - views["stock"][start]
+        return dict(zip([self._item_names[i] for i in ids], levels.tolist()))
+
+    def cash_balance(self, as_of_date: str) -> float:
+        views = self._build_views()
+        return float(views["cash"][np.searchsorted(self.days, _days([as_of_date])[0], side="right")])
+
+    def top_sales(self, as_of_date: str, limit: int = 5) -> List[Dict]:
+        end = np.searchsorted(self.days, _days([as_of_date])[0], side="right")
+        sales = self.is_sale[:end]
+        items = self.items[:end][sales]
+        units = self.units[:end][sales]
+        n = len(self._item_names)
+        revenue = np.bincount(items, weights=self.prices[:end][sales], minlength=n)
+        has_units = np.bincount(items, weights=~np.isnan(units), minlength=n) > 0
+        total_units = np.bincount(items, weights=np.nan_to_num(units), minlength=n)
+        sold = np.flatnonzero(np.bincount(items, minlength=n))
+        top = sold[np.argsort(-revenue[sold], kind="stable")][:limit]
+        return [
+            {
+                "item_name": self._item_names[i],
+                "total_units": float(total_units[i]) if has_units[i] else None,
+                "total_revenue": float(revenue[i]),
+            }
+            for i in top
+        ]
+
+    def pending_deliveries(self, as_of_date: str) -> Dict[str, int]:
+        day = _days([as_of_date])[0]
+        end = np.searchsorted(self.days, day, side="right")
+        pending = ~self.is_sale[:end] & (self.delivery_days[:end] > day)
+        items = self.items[:end][pending]
+        totals = np.bincount(items, weights=self.units[:end][pending], minlength=len(self._item_names))
+        return {self._item_names[i]: int(totals[i]) for i in np.unique(items)}
+
+    def stock_events(self) -> pd.DataFrame:
+        stocked = self.items != self._item_ids.get(None, -1)
+        event_days = np.where(self.is_sale, self.days, self.delivery_days)[stocked]
+        return pd.DataFrame({
+            "item_name": np.array(self._item_names, dtype=object)[self.items[stocked]]
+            if self._item_names else np.empty(0, dtype=object),
+            "transaction_type": np.where(self.is_sale[stocked], "sales", "stock_orders"),
+            "units": self.units[stocked],
+            "event_date": np.datetime_as_string(event_days.astype("datetime64[D]")),
+        })
+
+    def last_transaction_id(self) -> int:
+        return int(self.ids.max()) if len(self.ids) else 0
+
+    def discard_after(self, transaction_id: int) -> int:
+        keep = self.ids <= transaction_id
+        removed = int((~keep).sum())
+        for name in ["ids", "items", "is_sale", "units", "prices", "days", "delivery_days"]:
+            setattr(self, name, getattr(self, name)[keep])
+        # Like SQLite rowids, the next id follows the highest remaining one
+        self._next_id = self.last_transaction_id() + 1
+        self._views = None
+        return removed
+
+
+# The warehouse the current request is served from; None means the whole company
+_current_warehouse: ContextVar[Optional[str]] = ContextVar("warehouse", default=None)
+
+
+def current_warehouse() -> Optional[str]:
+    return _current_warehouse.get()
+
+
+@contextmanager
+def warehouse_scope(warehouse: Optional[str]):
+    """Route ledger reads and writes in this block (and agents started from it) to one warehouse."""
+    token = _current_warehouse.set(warehouse)
+    try:
+        yield
+    finally:
+        _current_warehouse.reset(token)
+
+
+INSERT_SHARD_TRANSACTION_SQL = """
+    INSERT INTO transactions (rowid, id, warehouse, item_id, transaction_type, units, price,
+                              transaction_date, delivery_date)
+    VALUES (:id, :id, :warehouse, :item_id, :transaction_type, :units, :price,
+            :transaction_date, :delivery_date)
+"""
+
+
+class ShardLedger(SQLiteLedger):
+    """One warehouse's ledger; ids are assigned by the ShardedLedger so they are unique across shards."""
+
+    def __init__(self, engine: Engine, warehouse: str, catalogue: Optional[Catalogue] = None):
+        super().__init__(engine, catalogue)
+        self.warehouse = warehouse
+
+    def reset(self, transactions: Iterable[Dict] = ()) -> None:
+        self._create_table("warehouse TEXT, ")
+        self.append(list(transactions))
+
+    def append(self, transactions: List[Dict]) -> List[int]:
+        """Record rows that already carry their "id"."""
+        rows = [{**t, "warehouse": self.warehouse} for t in self._with_skus(transactions)]
+        self.queries.execute_each(INSERT_SHARD_TRANSACTION_SQL, rows)
+        return [t["id"] for t in transactions]
+
+
+class ShardedLedger(LedgerBackend):
+    """
+    Transactions partitioned by warehouse, one ShardLedger (SQLite file) each.
+
+    A row is written to its "warehouse" if it names one, else to the
+    warehouse of the active `warehouse_scope`, else to the item's home
+    warehouse (the one seeded with most of its stock), else to the first
+    warehouse. Ids come from one counter, so they stay unique and ordered
+    across shards. An append is atomic per warehouse, not across them.
+
+    Stock, pending deliveries, top sales and stock events read only the
+    scoped warehouse inside a `warehouse_scope` and add up every shard
+    outside one. Cash is company-wide and always covers every shard.
+    """
+
+    def __init__(self, engines: Dict[str, Engine], catalogue: Optional[Catalogue] = None):
+        if not engines:
+            raise ValueError("a sharded ledger needs at least one warehouse")
+        self.warehouses = list(engines)
+        self.shards = {warehouse: ShardLedger(engine, warehouse, catalogue)
+                       for warehouse, engine in engines.items()}
+        self.home: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._next_id = 1
+        # Reopened shard files carry on from their ids and homes; new ones are set up by reset()
+        if all(shard.has_table("transactions") for shard in self.shards.values()):
+            self._next_id = self.last_transaction_id() + 1
+        if all(shard.has_table("inventory") for shard in self.shards.values()):
+            self._load_homes()
+
+    def _load_homes(self) -> None:
+        stock = pd.concat([pd.read_sql("SELECT item_name, warehouse, current_stock FROM inventory", shard.engine)
+                           for shard in self.shards.values()])
+        self._set_homes(stock)
+
+    def _set_homes(self, stock: pd.DataFrame) -> None:
+        ranked = stock.sort_values("current_stock", ascending=False, kind="stable")
+        self.home = dict(ranked.drop_duplicates("item_name")[["item_name", "warehouse"]].itertuples(index=False))
+
+    def write_inventory(self, stock: pd.DataFrame) -> None:
+        """Store each warehouse's rows of `stock` (catalogue columns plus warehouse) in its shard."""
+        for warehouse, shard in self.shards.items():
+            stock[stock["warehouse"] == warehouse].to_sql("inventory", shard.engine, if_exists="replace",
+                                                           index=False)
+        self._set_homes(stock)
+
+    def _warehouse_for(self, row: Dict) -> str:
+        warehouse = row.get("warehouse") or current_warehouse() or self.home.get(row["item_name"]) \
+            or self.warehouses[0]
+        if warehouse not in self.shards:
+            raise ValueError(f"unknown warehouse {warehouse!r} (expected one of {', '.join(self.warehouses)})")
+        return warehouse
+
+    def shard(self, warehouse: str) -> ShardLedger:
+        if warehouse not in self.shards:
+            raise ValueError(f"unknown warehouse {warehouse!r} (expected one of {', '.join(self.warehouses)})")
+        return self.shards[warehouse]
+
+    def _scoped(self) -> List[ShardLedger]:
+        warehouse = current_warehouse()
+        if warehouse is None:
+            return list(self.shards.values())
+        return [self.shard(warehouse)]
+
+    def reset(self, transactions: Iterable[Dict] = ()) -> None:
+        transactions = list(transactions)
+        by_warehouse = defaultdict(list)
+        for i, t in enumerate(transactions, start=1):
+            by_warehouse[self._warehouse_for(t)].append({**t, "id": i})
+        for warehouse, shard in self.shards.items():
+            shard.reset(by_warehouse[warehouse])
+        self._next_id = len(transactions) + 1
+
+    def append(self, transactions: List[Dict]) -> List[int]:
+        by_warehouse = defaultdict(list)
+        warehouses = [self._warehouse_for(t) for t in transactions]
+        with self._lock:
+            ids = list(range(self._next_id, self._next_id + len(transactions)))
+            self._next_id += len(transactions)
+        for warehouse, transaction_id, t in zip(warehouses, ids, transactions):
+            by_warehouse[warehouse].append({**t, "id": transaction_id})
+        for warehouse, rows in by_warehouse.items():
+            self.shards[warehouse].append(rows)
+        return ids
+
+    def stock_levels(self, as_of_date: str, item_names: Optional[List[str]] = None) -> Dict[str, float]:
+        levels: Dict[str, int] = defaultdict(int)
+        for shard in self._scoped():
+            for item, units in shard.stock_levels(as_of_date, item_names).items():
+                levels[item] += int(units)
+        return dict(levels)
+
+    def cash_balance(self, as_of_date: str) -> float:
+        return sum(shard.cash_balance(as_of_date) for shard in self.shards.values())
+
+    def top_sales(self, as_of_date: str, limit: int = 5) -> List[Dict]:
+        shards = self._scoped()
+        if len(shards) == 1:
+            return shards[0].top_sales(as_of_date, limit)
+        totals: Dict[Optional[str], Dict] = {}
+        for shard in shards:
+            for row in shard.top_sales(as_of_date, limit=-1):
+                total = totals.setdefault(row["item_name"], {"item_name": row["item_name"],
+                                                             "total_units": None, "total_revenue": 0.0})
+                if row["total_units"] is not None:
+                    total["total_units"] = (total["total_units"] or 0) + row["total_units"]
+                total["total_revenue"] += row["total_revenue"]
+        return sorted(totals.values(), key=lambda row: -row["total_revenue"])[:limit]
+
+    def pending_deliveries(self, as_of_date: str) -> Dict[str, int]:
+        pending: Dict[str, int] = defaultdict(int)
+        for shard in self._scoped():
+            for item, units in shard.pending_deliveries(as_of_date).items():
+                pending[item] += units
+        return dict(pending)
+
+    def stock_events(self) -> pd.DataFrame:
+        return pd.concat([shard.stock_events() for shard in self._scoped()], ignore_index=True)
+
+    def last_transaction_id(self) -> int:
+        return max(shard.last_transaction_id() for shard in self.shards.values())
+
+    def discard_after(self, transaction_id: int) -> int:
+        with self._lock:
+            removed = sum(shard.discard_after(transaction_id) for shard in self.shards.values())
+            self._next_id = self.last_transaction_id() + 1
+        return removed
@@ -0,0 +1,193 @@
+"""
+Beaver's Choice Paper Company - Ledger Backend Parity Check
+Replays one seeded workload through the public helpers on the SQLite, the
+NumPy and the sharded (three warehouse) ledger backends and compares every
+ledger-derived answer: stock
+snapshots and levels, cash, financial reports, pending deliveries,
+availability and transaction ids. Also reports how long each backend took
+to answer the queries.
+
+On the sharded ledger it also checks the answers inside each
+warehouse_scope: per-warehouse stock and minimum levels must add up to the
+company-wide ones, and the reorder plan must use the warehouse's levels.
+
+Usage:
+    python ledger_parity.py --seed 7 --transactions 2000
+Exits with status 1 if the backends disagree.
+"""
+
+import argparse
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+import beaver_db
+from ledger_backends import NumpyLedger, SQLiteLedger, warehouse_scope
+
+WAREHOUSES = ["north", "south", "east"]
+
+
+def generate_workload(seed: int, n_transactions: int, days: int = 90,
+                      start_date: str = "2025-01-02") -> List[Dict]:
+    """Seeded sales and stock orders for create_transactions, in date order."""
+    rng = np.random.default_rng(seed)
+    names = [item["item_name"] for item in beaver_db.paper_supplies]
+    dates = np.datetime64(start_date) + np.sort(rng.integers(0, days, size=n_transactions))
+    workload = []
+    for date, item in zip(dates.astype(str), rng.choice(names, size=n_transactions)):
+        if rng.random() < 0.3:
+            quantity = int(rng.integers(10, 2000))
+            workload.append({
+                "item_name": str(item), "transaction_type": "stock_orders", "quantity": quantity,
+                "price": round(quantity * 0.1, 2), "date": date,
+                "delivery_date": beaver_db.get_supplier_delivery_date(date, quantity),
+            })
+        else:
+            quantity = int(rng.integers(1, 200))
+            workload.append({
+                "item_name": str(item), "transaction_type": "sales", "quantity": quantity,
+                "price": round(quantity * 0.2, 2), "date": date,
+            })
+    return workload
+
+
+def replay(backend_name: str, workload: List[Dict], as_of_dates: List[str], seed: int) -> Dict:
+    """Load `workload` into a fresh database on one backend and collect every helper's answers."""
+    beaver_db.set_db_engine(create_engine("sqlite://"))
+    if backend_name == "sharded":
+        # Outside a warehouse_scope the shards must add up to the single ledger
+        beaver_db.use_warehouse_shards(WAREHOUSES)
+    else:
+        beaver_db.set_ledger_backend(
+            NumpyLedger() if backend_name == "numpy" else SQLiteLedger(beaver_db.db_engine)
+        )
+    beaver_db.init_database(beaver_db.db_engine, seed=seed, data_dir=beaver_db.DATA_DIR)
+    seeded = beaver_db.get_last_transaction_id()
+
+    # One row at a time, a batch, then a rollback of the last rows, as the runner does
+    for t in workload[:50]:
+        beaver_db.create_transaction(t["item_name"], t["transaction_type"], t["quantity"],
+                                     t["price"], t["date"], t.get("delivery_date"))
+    checkpoint = beaver_db.get_last_transaction_id()
+    beaver_db.create_transactions(workload[50:])
+    discarded = beaver_db.discard_transactions_after(checkpoint + len(workload[50:]) - 10)
+    beaver_db.create_transactions(workload[-10:])
+
+    start = time.perf_counter()
+    answers = {"discarded": discarded, "last_transaction_id": beaver_db.get_last_transaction_id(),
+               "transactions_after_seeding": beaver_db.get_last_transaction_id() - seeded}
+    for date in as_of_dates:
+        answers[date] = snapshot(date)
+    answers["query_seconds"] = time.perf_counter() - start
+    if backend_name == "sharded":
+        answers["scoped_mismatches"] = [m for date in as_of_dates[::4] for m in scoped_mismatches(date)]
+    return answers
+
+
+def snapshot(date: str) -> Dict:
+    """Every ledger-derived helper answer on `date`, on the active backend."""
+    names = [item["item_name"] for item in beaver_db.paper_supplies]
+    index = beaver_db.get_availability_index()
+    return {
+        "inventory": beaver_db.get_all_inventory(date),
+        "stock_levels": {n: beaver_db.get_stock_level(n, date)["current_stock"].iloc[0] for n in names},
+        "cash": beaver_db.get_cash_balance(date),
+        "report": normalize_report(beaver_db.generate_financial_report(date)),
+        "pending": beaver_db.get_pending_deliveries(date),
+        "available_to_promise": {n: index.available_to_promise(n, date) for n in names},
+    }
+
+
+def normalize_report(report: Dict) -> Dict:
+    """Drop the parts of a financial report that legitimately differ between backends."""
+    # Report rows with equal revenue may be listed in either order
+    report["top_selling_products"].sort(key=lambda row: (-row["total_revenue"], str(row["item_name"])))
+    report.pop("warehouse", None)
+    breakdown = report.pop("warehouses", None)
+    if breakdown is not None and not np.isclose(
+            sum(w["inventory_value"] for w in breakdown.values()), report["inventory_value"]):
+        report["warehouses"] = breakdown  # reported as a key mismatch
+    return report
+
+
+def scoped_mismatches(date: str) -> List[str]:
+    """Per-warehouse answers that do not add up to the company-wide ones on `date`."""
+    names = [item["item_name"] for item in beaver_db.paper_supplies]
+    company = {n: (beaver_db.get_stock_level(n, date)["current_stock"].iloc[0], beaver_db.get_catalogue_entry(n))
+               for n in names}
+    totals = {n: [0.0, 0] for n in names}
+    mismatches = []
+    for warehouse in WAREHOUSES:
+        with warehouse_scope(warehouse):
+            entries = {}
+            for n in names:
+                entries[n] = beaver_db.get_catalogue_entry(n)
+                totals[n][0] += beaver_db.get_stock_level(n, date)["current_stock"].iloc[0]
+                if entries[n] is not None:
+                    totals[n][1] += entries[n][2]
+            for row in beaver_db.plan_reorders(date).itertuples():
+                if row.min_stock_level != entries[row.item_name][2]:
+                    mismatches.append(f"{warehouse}/{date}/plan/{row.item_name}: min level {row.min_stock_level} "
+                                      f"vs the warehouse's {entries[row.item_name][2]}")
+    for n, (stock, entry) in company.items():
+        if not np.isclose(totals[n][0], stock):
+            mismatches.append(f"{date}/{n}: warehouse stock adds up to {totals[n][0]}, company has {stock}")
+        if entry is not None and totals[n][1] != entry[2]:
+            mismatches.append(f"{date}/{n}: warehouse min levels add up to {totals[n][1]}, company has {entry[2]}")
+    return mismatches
+
+
+def compare(expected, actual, path: str = "") -> List[str]:
+    """Paths at which two nested answers differ (numbers compared with a small tolerance)."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        if set(expected) != set(actual):
+            return [f"{path}: keys {sorted(map(str, set(expected) ^ set(actual)))} differ"]
+        return [m for key in expected for m in compare(expected[key], actual[key], f"{path}/{key}")]
+    if isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            return [f"{path}: {len(expected)} vs {len(actual)} entries"]
+        return [m for i, (e, a) in enumerate(zip(expected, actual)) for m in compare(e, a, f"{path}[{i}]")]
+    # pandas reports SQL NULLs in numeric columns as NaN
+    if pd.isna(expected) and pd.isna(actual):
+        return []
+    if pd.isna(expected) or pd.isna(actual) or isinstance(expected, str):
+        return [] if expected == actual else [f"{path}: {expected!r} vs {actual!r}"]
+    return [] if np.isclose(float(expected), float(actual)) else [f"{path}: {expected!r} vs {actual!r}"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the NumPy ledger against the SQLite ledger.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--transactions", type=int, default=2000)
+    args = parser.parse_args()
+
+    workload = generate_workload(args.seed, args.transactions)
+    as_of_dates = [str(np.datetime64("2025-01-02") + d) for d in range(0, 120, 7)]
+    answers = {name: replay(name, workload, as_of_dates, args.seed) for name in ("sqlite", "numpy", "sharded")}
+
+    seconds = {name: backend_answers.pop("query_seconds") for name, backend_answers in answers.items()}
+    scoped = answers["sharded"].pop("scoped_mismatches")
+
+    print(f"Queries on {len(as_of_dates)} dates: SQLite {seconds['sqlite']:.3f}s, NumPy {seconds['numpy']:.3f}s, "
+          f"sharded {seconds['sharded']:.3f}s")
+    failed = bool(scoped)
+    if scoped:
+        print(f"{len(scoped)} mismatches inside warehouse scopes:")
+        print("\n".join(scoped[:20]))
+    for name in ("numpy", "sharded"):
+        expected = dict(answers["sqlite"])
+        if name == "sharded":
+            # Each warehouse is seeded with its own stock orders, so only ids after seeding line up
+            expected["last_transaction_id"] = answers[name]["last_transaction_id"]
+        mismatches = compare(expected, answers[name])
+        if mismatches:
+            print(f"{len(mismatches)} mismatches between SQLite and {name}:")
+            print("\n".join(mismatches[:20]))
+            failed = True
+    if failed:
+        sys.exit(1)
+    print("SQLite, NumPy and sharded ledgers agree")
@@ -0,0 +1,173 @@
+"""
+Beaver's Choice Paper Company - HTTP Load Test
+Drives http_service.py with concurrent keep-alive clients and reports
+latency percentiles and throughput per endpoint.
+
+Each client holds one connection and sends requests back to back, picking
+the endpoint from --mix. Stock and quote requests ask about one to three
+random catalogue items; orders ask for small quantities of items in stock
+on --as-of, so most are accepted until the stock runs out.
+
+Usage:
+    python http_service.py --db load.db --init --port 8080 &
+    python load_test.py --port 8080 --requests 5000 --concurrency 32 --mix stock=0.6,quote=0.3,order=0.1
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+from urllib.parse import urlencode
+
+import numpy as np
+
+from beaver_db import paper_supplies
+
+ENDPOINTS = ("stock", "quote", "order")
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """"stock=0.6,quote=0.3,order=0.1" -> normalized weights."""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"unknown endpoint {name!r} (expected one of {', '.join(ENDPOINTS)})")
+        weights[name] = float(weight or 1)
+    total = sum(weights.values())
+    return {name: weight / total for name, weight in weights.items()}
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method: str, path: str, payload: Dict = None) -> Tuple[int, Dict]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+        )
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+def make_request(endpoint: str, rng: random.Random, items: List[str], in_stock: List[str],
+                 as_of: str) -> Tuple[str, str, Dict]:
+    if endpoint == "stock":
+        chosen = rng.sample(items, rng.randint(1, 3))
+        return "GET", "/stock?" + urlencode({"item": chosen, "as_of": as_of}, doseq=True), None
+    if endpoint == "quote":
+        chosen = rng.sample(items, rng.randint(1, 3))
+        return "POST", "/quote", {"items": {item: rng.choice((100, 250, 500, 1000)) for item in chosen}}
+    chosen = rng.sample(in_stock, min(len(in_stock), rng.randint(1, 2)))
+    return "POST", "/order", {"items": {item: rng.randint(1, 20) for item in chosen}, "request_date": as_of}
+
+
+async def run_load(host: str, port: int, requests: int, concurrency: int, mix: Dict[str, float],
+                   as_of: str, seed: int = 0) -> Dict:
+    items = [item["item_name"] for item in paper_supplies]
+    probe = Client(host, port)
+    _, stock = await probe.request("GET", "/stock?" + urlencode({"item": items, "as_of": as_of}, doseq=True))
+    probe.close()
+    in_stock = [item for item, level in stock["stock"].items() if level > 0] or items
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    remaining = [requests]
+    names, weights = list(mix), list(mix.values())
+
+    async def worker(index: int) -> None:
+        rng = random.Random(seed * 1000 + index)
+        client = Client(host, port)
+        try:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                endpoint = rng.choices(names, weights)[0]
+                method, path, payload = make_request(endpoint, rng, items, in_stock, as_of)
+                start = time.perf_counter()
+                status, _ = await client.request(method, path, payload)
+                latencies[endpoint].append(time.perf_counter() - start)
+                statuses[endpoint][status] += 1
+        finally:
+            client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    report = {"requests": requests, "concurrency": concurrency, "seconds": elapsed,
+              "throughput": requests / elapsed, "endpoints": {}}
+    everything = []
+    for endpoint, samples in sorted(latencies.items()):
+        everything.extend(samples)
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+        report["endpoints"][endpoint] = {"count": len(samples), "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+                                         "statuses": dict(statuses[endpoint])}
+    p50, p95, p99 = np.percentile(everything, [50, 95, 99]) * 1000
+    report["endpoints"]["all"] = {"count": len(everything), "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+                                  "statuses": {}}
+
+    client = Client(host, port)
+    _, report["server"] = await client.request("GET", "/stats")
+    client.close()
+    return report
+
+
+def print_report(report: Dict) -> None:
+    print(f"{report['requests']} requests from {report['concurrency']} connections in "
+          f"{report['seconds']:.2f}s: {report['throughput']:.0f} requests/s")
+    print(f"  {'endpoint':<8} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+    for endpoint, row in report["endpoints"].items():
+        statuses = ", ".join(f"{status}: {count}" for status, count in sorted(row["statuses"].items()))
+        print(f"  {endpoint:<8} {row['count']:>7} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+              f"{row['p99_ms']:>8.2f}  {statuses}")
+    batching = report["server"].get("batching", {})
+    if batching:
+        print("  server mean batch size: " + ", ".join(
+            f"{name} {stats['mean_batch_size']:.1f}" for name, stats in batching.items() if stats["batches"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the Beaver's Choice HTTP service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", default="stock=0.6,quote=0.3,order=0.1",
+                        help="endpoint weights, e.g. stock=0.6,quote=0.3,order=0.1")
+    parser.add_argument("--as-of", default="2025-04-15", help="stock date for stock checks and orders")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_load(args.host, args.port, args.requests, args.concurrency,
+                                  parse_mix(args.mix), args.as_of, args.seed))
+    if args.json:
+        print(json.dumps(result, indent=2, default=float))
+    else:
+        print_report(result)
@@ -0,0 +1,92 @@
+"""
+Beaver's Choice Paper Company - Speculative Prefetch
+Starts loading the data a request will probably need as soon as it arrives.
+
+While the first agent waits on the model, a background thread picks the
+catalogue items and quote-history search terms mentioned in the request
+text and loads their stock levels, catalogue entries, the price table and
+per-term quote-history matches into a `PrefetchCache`. Inside the request's
+`prefetch_scope()` the beaver_db helpers answer those keys from the cache
+(waiting for a load still in flight) instead of querying again, and ledger
+writes drop the affected entries through `invalidate_items()`.
+
+Guesses cost only a few cheap local queries; anything the guess misses is
+loaded on demand exactly as before.
+"""
+
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import beaver_db
+from beaver_db import (
+    get_availability_index,
+    get_catalogue_entry,
+    get_price_table,
+    get_stock_level,
+    paper_supplies,
+    quote_history_matches,
+)
+from ledger_backends import current_warehouse, warehouse_scope
+from pricing_model import words_in, item_keywords, mentioned_items
+from tool_memo import PrefetchCache
+
+MAX_TERMS = 24
+
+# Jobs are submitted without copying the caller's context, so the loaders run
+# outside any prefetch scope and never wait on the entries they are filling
+prefetch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+
+
+def candidate_items(request: str) -> List[str]:
+    """Catalogue items the request probably refers to, in catalogue order."""
+    return mentioned_items(request, [item["item_name"] for item in paper_supplies])
+
+
+def candidate_terms(request: str, items: List[str]) -> List[str]:
+    """Quote-history search terms an agent is likely to try for this request."""
+    terms = [item.lower() for item in items]
+    for item in items:
+        terms.extend(sorted(item_keywords(item)))
+    words = words_in(request)
+    for (event_type,) in beaver_db.queries.all("SELECT DISTINCT event_type FROM quotes"):
+        if event_type and event_type.lower() in words:
+            terms.append(event_type.lower())
+    return list(dict.fromkeys(terms))[:MAX_TERMS]
+
+
+def _warm(cache: PrefetchCache, request: str, request_date: str, warehouse: Optional[str]) -> None:
+    with warehouse_scope(warehouse):
+        _warm_scoped(cache, request, request_date, warehouse)
+
+
+def _warm_scoped(cache: PrefetchCache, request: str, request_date: str, warehouse: Optional[str]) -> None:
+    items = candidate_items(request)
+    loads = []
+    for item in items:
+        loads.append((("get_stock_level", item, request_date, warehouse), [item],
+                      functools.partial(get_stock_level, item, request_date)))
+        loads.append((("get_catalogue_entry", item, warehouse), [],
+                      functools.partial(get_catalogue_entry, item)))
+    loads.append((("get_price_table",), [], get_price_table))
+    for term in candidate_terms(request, items):
+        loads.append((("quote_history_term", term), [],
+                      functools.partial(quote_history_matches, term)))
+
+    # Register everything first so tool calls arriving mid-warm wait instead of duplicating work
+    futures = [(cache.register(key, depends_on), loader) for key, depends_on, loader in loads]
+    for future, loader in futures:
+        try:
+            future.set_result(loader())
+        except Exception as e:
+            future.set_exception(e)
+    # Shared across requests and rebuilt lazily after writes; build it off the request path
+    get_availability_index()
+
+
+def start_prefetch(request: str, request_date: str) -> PrefetchCache:
+    """Begin warming a cache for this request in the background and return it immediately."""
+    cache = PrefetchCache()
+    # Stock is loaded for the request's warehouse (the executor does not copy the context)
+    prefetch_executor.submit(_warm, cache, request, request_date, current_warehouse())
+    return cache
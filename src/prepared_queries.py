@@ -0,0 +1,107 @@
+"""
+Thin query layer for small, frequent lookups and inserts.
+
+`pd.read_sql` / `DataFrame.to_sql` build a DataFrame, infer dtypes and
+reflect table metadata on every call, which dominates the cost of a
+one-row query. `PreparedQueries` instead runs SQL on one DBAPI connection
+per thread, kept checked out of the engine's pool, and returns plain tuples
+and scalars. sqlite3 keeps a per-connection cache of prepared statements
+keyed by SQL text, so callers pass constant SQL strings and repeated calls
+skip parsing and planning.
+
+For a database file, those connections are opened directly through the
+engine's dialect, so worker threads cannot drain the engine's connection
+pool. In-memory databases only exist inside the engine's own (per-thread or
+shared) connection, so that connection is checked out instead.
+
+Reads always drain their cursor so no statement keeps a read lock on the
+database file; writes commit before returning.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from sqlalchemy import Engine
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+
+Params = Union[Sequence[Any], Dict[str, Any]]
+
+
+class PreparedQueries:
+    """Per-thread reused connection to `engine` with tuple/scalar results."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._local = threading.local()
+        # Every thread's connection state, so close() can reach the ones other threads opened
+        self._opened: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def _cursor(self):
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            if isinstance(self.engine.pool, (SingletonThreadPool, StaticPool)):
+                # The pooled proxy is kept referenced so the connection stays checked out
+                self._local.pooled = self.engine.raw_connection()
+                self._local.connection = self._local.pooled.driver_connection
+            else:
+                dialect = self.engine.dialect
+                cargs, cparams = dialect.create_connect_args(self.engine.url)
+                self._local.connection = dialect.connect(*cargs, **cparams)
+            cursor = self._local.cursor = self._local.connection.cursor()
+            with self._lock:
+                self._opened.append(self._local.__dict__)
+        return cursor
+
+    def all(self, sql: str, params: Params = ()) -> List[tuple]:
+        """Every result row as a tuple."""
+        cursor = self._cursor()
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+    def one(self, sql: str, params: Params = ()) -> Optional[tuple]:
+        """The first result row, or None."""
+        rows = self.all(sql, params)
+        return rows[0] if rows else None
+
+    def scalar(self, sql: str, params: Params = ()) -> Any:
+        """The first column of the first result row, or None."""
+        row = self.one(sql, params)
+        return row[0] if row else None
+
+    def execute(self, sql: str, params: Params = ()) -> int:
+        """Run one write statement and commit; return the affected row count."""
+        return self.execute_each(sql, [params])[1]
+
+    def execute_each(self, sql: str, rows: List[Params]) -> tuple:
+        """Run a write statement once per parameter set in one commit; return (row ids, rows affected)."""
+        cursor = self._cursor()
+        ids = []
+        affected = 0
+        try:
+            for params in rows:
+                cursor.execute(sql, params)
+                ids.append(cursor.lastrowid)
+                affected += cursor.rowcount
+            self._local.connection.commit()
+        except Exception:
+            self._local.connection.rollback()
+            raise
+        return ids, affected
+
+    def close(self) -> None:
+        """Close (or return to the pool) the connection of every thread that opened one.
+
+        Threads that query again afterwards open a fresh connection.
+        """
+        with self._lock:
+            opened, self._opened = self._opened, []
+            self._local = threading.local()
+        for state in opened:
+            state["cursor"].close()
+            pooled = state.get("pooled")
+            if pooled is not None:
+                pooled.close()
+            else:
+                state["connection"].close()
+            state.clear()
@@ -0,0 +1,293 @@
+"""
+Beaver's Choice Paper Company - Historical Pricing Model
+Suggests a quote price from past quotes without asking the LLM.
+
+For every historical quote, the items and quantities in the customer's
+request are matched against the catalogue to get a list-price subtotal. The
+log of quoted total over list subtotal is then fitted against the log
+subtotal and one-hot job type, order size and event type by a ridge-penalised
+median (least absolute deviation) regression, solved by iteratively
+reweighted least squares (see PricingModel.fit). Prediction is one dot
+product over a few dozen coefficients.
+
+init_database fits the model and stores it (as JSON) in the pricing_model
+table, so other processes on the same database reuse it without refitting.
+
+Usage:
+    python pricing_model.py            # fit on a fresh database, report fit and leave-one-out error
+"""
+
+import json
+import math
+import re
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Engine, text
+
+# Words that appear in most item names and so say nothing about which item is meant
+GENERIC_WORDS = {"paper", "of", "with", "the", "and"}
+
+FACETS = ("job_type", "order_size", "event_type")
+
+# Quoted discounts outside this range are treated as noise, not advice
+MAX_DISCOUNT = 0.5
+
+# Ridge strengths tried by fit (the best by leave-one-out error is kept)
+RIDGES = (0.3, 1.0, 3.0, 10.0, 30.0, 100.0, 1000.0)
+
+
+def words_in(text: str) -> set:
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def item_keywords(item_name: str) -> set:
+    """The words that identify a catalogue item (ignoring parentheticals and generic words)."""
+    words = words_in(re.sub(r"\(.*?\)", "", item_name)) - GENERIC_WORDS
+    return words or words_in(item_name)
+
+
+def mentioned_items(text: str, item_names: Iterable[str]) -> List[str]:
+    """Catalogue items named in free text, by full name or all their keywords (plurals allowed)."""
+    lowered = text.lower()
+    words = words_in(text)
+    words |= {w[:-1] for w in words if w.endswith("s")}
+    return [name for name in item_names if name.lower() in lowered or item_keywords(name) <= words]
+
+
+class ItemMatcher:
+    """mentioned_items over a fixed catalogue, indexed so each text only tests plausible names.
+
+    Matches (and their catalogue order) are the same as mentioned_items; the
+    index makes parsing cost depend on the text rather than the catalogue size.
+    """
+
+    def __init__(self, item_names: Iterable[str]):
+        self.names = list(item_names)
+        self._keywords = [item_keywords(name) for name in self.names]
+        # Every keyword has to be present, so each item is filed under just one of them
+        self._by_keyword: Dict[str, List[int]] = {}
+        self._unconditional: List[int] = []
+        for position, keywords in enumerate(self._keywords):
+            if keywords:
+                self._by_keyword.setdefault(min(keywords), []).append(position)
+            else:
+                self._unconditional.append(position)
+        self._by_name: Dict[str, List[int]] = {}
+        for position, name in enumerate(self.names):
+            self._by_name.setdefault(name.lower(), []).append(position)
+        self._lengths = sorted({len(name) for name in self._by_name})
+
+    def __call__(self, text: str) -> List[str]:
+        lowered = text.lower()
+        words = words_in(text)
+        words |= {w[:-1] for w in words if w.endswith("s")}
+        found = set(self._unconditional)
+        for word in words:
+            found.update(p for p in self._by_keyword.get(word, ()) if self._keywords[p] <= words)
+        # Full names anywhere in the text, including inside longer words
+        for start in range(len(lowered)):
+            for length in self._lengths:
+                if start + length > len(lowered):
+                    break
+                found.update(self._by_name.get(lowered[start:start + length], ()))
+        return [self.names[p] for p in sorted(found)]
+
+
+# A quantity: not a price, and not a paper weight or size ("250 gsm", "24x36")
+_QUANTITY = re.compile(r"(?<![$\d.,])(\d[\d,]*)(?![\d.]|\s*(?:gsm|lb|%|x\s*\d|-?inch))")
+
+
+def parse_line_items(request: str, item_names: Union[Iterable[str], ItemMatcher]) -> Dict[str, int]:
+    """(item -> quantity) for clauses like "500 sheets of cardstock" in a customer request.
+
+    Pass an ItemMatcher when parsing many requests against the same catalogue.
+    """
+    matcher = item_names if isinstance(item_names, ItemMatcher) else ItemMatcher(item_names)
+    items: Dict[str, int] = {}
+    for clause in re.split(r",|;|\band\b|\n|\.\s", request):
+        matched = matcher(clause)
+        quantity = _QUANTITY.search(clause)
+        if matched and quantity:
+            # The longest matching name is the most specific ("250 gsm cardstock" over "Cardstock")
+            item = max(matched, key=len)
+            items[item] = items.get(item, 0) + int(quantity.group(1).replace(",", ""))
+    return items
+
+
+class PricingModel:
+    """Ridge median regression of log(quoted / list price) on order size and customer metadata."""
+
+    def __init__(self, prices: Dict[str, float], vocabulary: List[Tuple[str, str]],
+                 coefficients: np.ndarray, subtotal_center: float, stats: Dict):
+        self.prices = prices
+        self.vocabulary = vocabulary
+        self._columns = {key: i + 2 for i, key in enumerate(vocabulary)}
+        self.coefficients = np.asarray(coefficients, dtype=float)
+        # Scalar prediction is faster on plain floats than on NumPy scalars
+        self._coefficients = self.coefficients.tolist()
+        self.subtotal_center = subtotal_center
+        self.stats = stats
+
+    @staticmethod
+    def design(subtotals: np.ndarray, metadata: pd.DataFrame, vocabulary: List[Tuple[str, str]],
+               subtotal_center: float) -> np.ndarray:
+        """Feature matrix: intercept, centred log subtotal, one column per (facet, value)."""
+        X = np.zeros((len(subtotals), len(vocabulary) + 2))
+        X[:, 0] = 1.0
+        X[:, 1] = np.log(subtotals) - subtotal_center
+        for i, key in enumerate(vocabulary):
+            X[:, i + 2] = (metadata[key[0]].to_numpy() == key[1])
+        return X
+
+    @classmethod
+    def fit(cls, subtotals: np.ndarray, totals: np.ndarray, metadata: pd.DataFrame,
+            prices: Dict[str, float], ridges: Iterable[float] = RIDGES,
+            iterations: int = 30) -> "PricingModel":
+        """
+        Fit on quotes with a positive list subtotal and quoted total.
+        
+        A few historical totals are orders of magnitude off their list price,
+        so this is a median (least absolute deviation) regression, solved by
+        iteratively reweighted least squares. The ridge strength is the one
+        with the lowest leave-one-out median error; when the metadata carries
+        no signal, heavy shrinkage leaves roughly the median price ratio.
+        """
+        subtotals = np.asarray(subtotals, dtype=float)
+        totals = np.asarray(totals, dtype=float)
+        usable = (subtotals > 0) & (totals > 0)
+        metadata = metadata.loc[usable].reset_index(drop=True)
+        subtotals, totals = subtotals[usable], totals[usable]
+        if len(totals) < 2:
+            raise ValueError(f"need at least 2 usable historical quotes, got {len(totals)}")
+
+        vocabulary = sorted({(facet, value) for facet in FACETS for value in metadata[facet].unique()})
+        center = float(np.log(subtotals).mean())
+        X = cls.design(subtotals, metadata, vocabulary, center)
+        y = np.log(totals / subtotals)
+
+        best = None
+        for ridge in ridges:
+            penalty = ridge * np.eye(X.shape[1])
+            penalty[0, 0] = 0.0  # the intercept is not shrunk
+            weights = np.ones(len(y))
+            for _ in range(iterations):
+                XtW = X.T * weights
+                coefficients = np.linalg.solve(XtW @ X + penalty, XtW @ y)
+                residuals = y - X @ coefficients
+                weights = 1.0 / np.maximum(np.abs(residuals), 1e-3)
+            # Leave-one-out residuals of the final weighted fit, from the hat matrix diagonal
+            hat = weights * np.einsum("ij,ji->i", X, np.linalg.solve(XtW @ X + penalty, X.T))
+            loo_error = float(np.median(np.abs(residuals / (1.0 - hat))))
+            if best is None or loo_error < best[0]:
+                best = (loo_error, ridge, coefficients, residuals)
+
+        loo_error, ridge, coefficients, residuals = best
+        stats = {
+            "quotes": int(len(y)),
+            "ridge": ridge,
+            "median_abs_error_log": float(np.median(np.abs(residuals))),
+            "loo_median_abs_error_log": loo_error,
+            "baseline_median_abs_error_log": float(np.median(np.abs(y - np.median(y)))),
+        }
+        return cls(prices, vocabulary, coefficients, center, stats)
+
+    def predict(self, items: Dict[str, int], job_type: Optional[str] = None,
+                order_size: Optional[str] = None, event_type: Optional[str] = None) -> Dict:
+        """
+        Suggested price and discount for an order of `items` (item -> quantity).
+        
+        historical_price is what similar past quotes charged relative to list
+        price (it can exceed it); the suggestion never goes above list price
+        or below MAX_DISCOUNT off it.
+        """
+        unknown = [item for item in items if item not in self.prices]
+        if unknown:
+            raise KeyError(f"not in the catalogue: {', '.join(unknown)}")
+        subtotal = sum(self.prices[item] * quantity for item, quantity in items.items())
+        if subtotal <= 0:
+            raise ValueError("order has no priced items")
+
+        coefficients = self._coefficients
+        score = coefficients[0] + coefficients[1] * (math.log(subtotal) - self.subtotal_center)
+        for facet, value in zip(FACETS, (job_type, order_size, event_type)):
+            column = self._columns.get((facet, (value or "").strip().lower()))
+            if column is not None:
+                score += coefficients[column]
+        ratio = math.exp(score)
+        discount = min(max(1.0 - ratio, 0.0), MAX_DISCOUNT)
+        return {
+            "list_subtotal": float(subtotal),
+            "historical_price": round(subtotal * ratio, 2),
+            "discount_rate": discount,
+            "suggested_price": round(subtotal * (1.0 - discount), 2),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "prices": self.prices, "vocabulary": self.vocabulary,
+            "coefficients": self.coefficients.tolist(), "subtotal_center": self.subtotal_center,
+            "stats": self.stats,
+        })
+
+    @classmethod
+    def from_json(cls, payload: str) -> "PricingModel":
+        data = json.loads(payload)
+        return cls(data["prices"], [tuple(key) for key in data["vocabulary"]],
+                   np.array(data["coefficients"]), data["subtotal_center"], data["stats"])
+
+
+def fit_from_tables(requests_df: pd.DataFrame, quotes_df: pd.DataFrame,
+                    prices: Dict[str, float]) -> PricingModel:
+    """Fit on the seed tables: quote_requests (id, response) joined to quotes (request_id, ...)."""
+    joined = quotes_df.merge(requests_df[["id", "response"]], left_on="request_id", right_on="id")
+    matcher = ItemMatcher(prices)
+    subtotals = np.array([
+        sum(prices[item] * quantity for item, quantity in parse_line_items(request, matcher).items())
+        for request in joined["response"].fillna("")
+    ])
+    return PricingModel.fit(subtotals, joined["total_amount"].to_numpy(), joined[list(FACETS)], prices)
+
+
+def save_model(db_engine: Engine, model: PricingModel) -> None:
+    with db_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS pricing_model (name TEXT PRIMARY KEY, model TEXT)"))
+        conn.execute(text("INSERT OR REPLACE INTO pricing_model VALUES ('default', :model)"),
+                     {"model": model.to_json()})
+
+
+def load_model(db_engine: Engine) -> Optional[PricingModel]:
+    """The stored model, or None if this database has none."""
+    with db_engine.connect() as conn:
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pricing_model'"
+        )).first()
+        row = conn.execute(text("SELECT model FROM pricing_model WHERE name = 'default'")).first() \
+            if exists else None
+    return PricingModel.from_json(row[0]) if row else None
+
+
+if __name__ == "__main__":
+    import time
+
+    from sqlalchemy import create_engine
+
+    import beaver_db
+
+    beaver_db.set_db_engine(create_engine("sqlite://"))
+    beaver_db.init_database(beaver_db.db_engine, data_dir=beaver_db.DATA_DIR)
+    model = beaver_db.get_pricing_model()
+    stats = model.stats
+    print(f"Fitted on {stats['quotes']} historical quotes with a parsable list price (ridge {stats['ridge']:g})")
+    print(f"Median absolute error of log(quoted / list): {stats['median_abs_error_log']:.3f} in sample, "
+          f"{stats['loo_median_abs_error_log']:.3f} leave-one-out, "
+          f"{stats['baseline_median_abs_error_log']:.3f} predicting the median")
+
+    order = {"A4 paper": 500, "Cardstock": 200}
+    calls = 10000
+    start = time.perf_counter()
+    for _ in range(calls):
+        suggestion = model.predict(order, order_size="large", event_type="ceremony")
+    print(f"Suggestion for {order}: {suggestion} "
+          f"({(time.perf_counter() - start) / calls * 1e6:.1f}us per prediction)")
@@ -0,0 +1,99 @@
+"""
+Beaver's Choice Paper Company - Scalar Query Microbenchmark
+Per-call overhead of the hot single-value helpers before (pandas read_sql /
+to_sql, the previous implementation) and after (prepared statements through
+PreparedQueries), on a freshly seeded SQLite file.
+
+Usage:
+    python query_benchmark.py --calls 2000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+import beaver_db
+from ledger_backends import SQLiteLedger
+
+AS_OF = "2025-04-15"
+ITEM = "A4 paper"
+
+
+def per_call_us(fn: Callable, calls: int) -> float:
+    """Mean wall time of `fn()` in microseconds, after a warm-up call."""
+    fn()
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def pandas_stock_level():
+    return pd.read_sql("""
+        SELECT item_id,
+            COALESCE(SUM(CASE
+                WHEN transaction_type = 'stock_orders'
+                     AND COALESCE(delivery_date, transaction_date) <= :as_of_date THEN units
+                WHEN transaction_type = 'sales' THEN -units
+                ELSE 0
+            END), 0) AS current_stock
+        FROM transactions
+        WHERE item_id = :item_id AND transaction_date <= :as_of_date
+    """, beaver_db.db_engine, params={"item_id": beaver_db.catalogue.sku(ITEM), "as_of_date": AS_OF})
+
+
+def pandas_unit_price():
+    inventory_df = pd.read_sql("SELECT * FROM inventory WHERE item_name = :item",
+                               beaver_db.db_engine, params={"item": ITEM})
+    return float(inventory_df.iloc[0]["unit_price"])
+
+
+def pandas_cash_balance():
+    transactions = pd.read_sql("SELECT * FROM transactions WHERE transaction_date <= :as_of_date",
+                               beaver_db.db_engine, params={"as_of_date": AS_OF})
+    total_sales = transactions.loc[transactions["transaction_type"] == "sales", "price"].sum()
+    total_purchases = transactions.loc[transactions["transaction_type"] == "stock_orders", "price"].sum()
+    return float(total_sales - total_purchases)
+
+
+def pandas_insert():
+    pd.DataFrame([{
+        "item_id": beaver_db.catalogue.sku(ITEM), "transaction_type": "sales", "units": 1, "price": 0.05,
+        "transaction_date": AS_OF, "delivery_date": AS_OF,
+    }]).to_sql("transactions", beaver_db.db_engine, if_exists="append", index=False)
+    return int(pd.read_sql("SELECT last_insert_rowid() as id", beaver_db.db_engine).iloc[0]["id"])
+
+
+BENCHMARKS = [
+    ("stock level (one item)", pandas_stock_level,
+     lambda: beaver_db.ledger_backend.stock_levels(AS_OF, [ITEM])),
+    ("unit price lookup", pandas_unit_price, lambda: beaver_db.get_catalogue_entry(ITEM)[1]),
+    ("cash balance", pandas_cash_balance, lambda: beaver_db.get_cash_balance(AS_OF)),
+    ("insert one transaction", pandas_insert,
+     lambda: beaver_db.create_transaction(ITEM, "sales", 1, 0.05, AS_OF)),
+]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-call cost of scalar DB helpers, pandas vs prepared.")
+    parser.add_argument("--calls", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        beaver_db.set_db_engine(create_engine(f"sqlite:///{os.path.join(tmp, 'benchmark.db')}"))
+        beaver_db.set_ledger_backend(SQLiteLedger(beaver_db.db_engine))
+        beaver_db.init_database(beaver_db.db_engine, data_dir=beaver_db.DATA_DIR)
+
+        print(f"{'helper':<26}{'pandas us/call':>16}{'prepared us/call':>18}{'speedup':>10}")
+        for name, before, after in BENCHMARKS:
+            before_us = per_call_us(before, args.calls)
+            after_us = per_call_us(after, args.calls)
+            print(f"{name:<26}{before_us:>16.1f}{after_us:>18.1f}{before_us / after_us:>9.1f}x")
+        beaver_db.ledger_backend.queries.close()
+        beaver_db.queries.close()
+        beaver_db.db_engine.dispose()
@@ -0,0 +1,123 @@
+"""
+Adaptive rate limiting for model calls.
+
+A thread-safe token bucket enforces both a requests-per-minute and a
+tokens-per-minute budget, so concurrent workers share one quota instead of
+each sleeping a fixed interval. Calls that still hit a rate limit or a
+transient provider error are retried with jittered exponential backoff.
+"""
+
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {
+    "RateLimitError", "APIConnectionError", "APITimeoutError", "Timeout",
+    "ServiceUnavailableError", "InternalServerError",
+}
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Return True for rate-limit and transient provider errors."""
+    status = getattr(error, "status_code", None)
+    if status in RETRYABLE_STATUS_CODES:
+        return True
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+class RateLimiter:
+    """Token bucket limiter over requests and tokens per minute."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: Optional[float] = None,
+                 max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._lock = threading.Lock()
+        self._request_allowance = float(requests_per_minute)
+        self._token_allowance = float(tokens_per_minute) if tokens_per_minute else 0.0
+        self._last_refill = time.monotonic()
+
+        self.total_wait = 0.0
+        self.total_backoff = 0.0
+        self.calls = 0
+        self.retries = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._request_allowance = min(
+            float(self.requests_per_minute),
+            self._request_allowance + elapsed * self.requests_per_minute / 60.0,
+        )
+        if self.tokens_per_minute:
+            self._token_allowance = min(
+                float(self.tokens_per_minute),
+                self._token_allowance + elapsed * self.tokens_per_minute / 60.0,
+            )
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until one request and `tokens` tokens fit the budget; return the wait."""
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                missing_requests = max(0.0, 1.0 - self._request_allowance)
+                missing_tokens = max(0.0, tokens - self._token_allowance) if self.tokens_per_minute else 0.0
+                if missing_requests == 0.0 and missing_tokens == 0.0:
+                    self._request_allowance -= 1.0
+                    if self.tokens_per_minute:
+                        self._token_allowance -= tokens
+                    self.total_wait += waited
+                    self.calls += 1
+                    return waited
+                delay = missing_requests * 60.0 / self.requests_per_minute
+                if missing_tokens:
+                    delay = max(delay, missing_tokens * 60.0 / self.tokens_per_minute)
+            time.sleep(delay)
+            waited += delay
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token budget once the real usage of a call is known."""
+        if not self.tokens_per_minute:
+            return
+        with self._lock:
+            self._token_allowance -= actual_tokens - estimated_tokens
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, fn: Callable, *args, estimated_tokens: int = 0, **kwargs):
+        """Run `fn` under the limiter, retrying rate-limit and transient errors."""
+        attempt = 0
+        while True:
+            self.acquire(estimated_tokens)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable_error(e):
+                    raise
+                delay = self.backoff_delay(attempt)
+                with self._lock:
+                    self.retries += 1
+                    self.total_backoff += delay
+                time.sleep(delay)
+                attempt += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "total_wait_seconds": round(self.total_wait, 3),
+                "total_backoff_seconds": round(self.total_backoff, 3),
+            }
@@ -0,0 +1,190 @@
+"""
+Streaming, resumable results writer for scenario runs.
+
+Each scenario result is appended to disk as soon as it completes (CSV, plus
+optional JSONL and Parquet sinks) and a small JSON checkpoint records which
+request ids are done and the ledger state they were committed against, so a
+restarted run can skip finished requests instead of starting over.
+"""
+
+import csv
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+RESULT_COLUMNS = [
+    "request_id", "request_date", "job", "event", "need_size",
+    "cash_balance", "inventory_value", "response",
+]
+
+SUPPORTED_SINKS = {"jsonl", "parquet"}
+
+
+class ResultsWriter:
+    """Append scenario results to CSV (and optional sinks) one row at a time."""
+
+    def __init__(self, csv_path: str, sinks: Iterable[str] = (), resume: bool = False,
+                 checkpoint_path: Optional[str] = None):
+        unknown = set(sinks) - SUPPORTED_SINKS
+        if unknown:
+            raise ValueError(f"Unsupported result sinks: {', '.join(sorted(unknown))}")
+
+        self.csv_path = csv_path
+        self.sinks = set(sinks)
+        self.checkpoint_path = checkpoint_path or f"{os.path.splitext(csv_path)[0]}.checkpoint.json"
+        self.checkpoint = self._load_checkpoint() if resume else None
+        self.processed_ids = set(self.checkpoint["processed_ids"]) if self.checkpoint else set()
+
+        directory = os.path.dirname(csv_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        base = os.path.splitext(csv_path)[0]
+        self.jsonl_path = f"{base}.jsonl"
+        self.parquet_path = f"{base}.parquet"
+
+        self._restored = self._restore_rows()
+        self._csv_file = self._open_csv()
+        self._csv_writer = csv.DictWriter(self._csv_file, fieldnames=RESULT_COLUMNS)
+
+        self._jsonl_file = self._open_jsonl() if "jsonl" in self.sinks else None
+        self._parquet_writer = None
+        if "parquet" in self.sinks:
+            self._open_parquet()
+
+    @property
+    def resumed(self) -> bool:
+        return self.checkpoint is not None
+
+    @property
+    def last_transaction_id(self) -> int:
+        return int(self.checkpoint["last_transaction_id"]) if self.checkpoint else 0
+
+    def write(self, row: Dict, last_transaction_id: int) -> None:
+        """Persist one result row, then advance the checkpoint past it."""
+        self.write_batch([row], last_transaction_id)
+
+    def write_batch(self, rows: List[Dict], last_transaction_id: int) -> None:
+        """Persist result rows, then advance the checkpoint past all of them at once.
+
+        Use this when the rows' requests ran together, so the ledger only has a
+        consistent last transaction id once every one of them has finished; a
+        crash part-way through leaves the whole batch to be processed again.
+        """
+        rows = [{column: row.get(column) for column in RESULT_COLUMNS} for row in rows]
+        if not rows:
+            return
+        for row in rows:
+            row["request_id"] = int(row["request_id"])
+        self._csv_writer.writerows(rows)
+        self._csv_file.flush()
+
+        if self._jsonl_file is not None:
+            self._jsonl_file.writelines(json.dumps(row, default=str) + "\n" for row in rows)
+            self._jsonl_file.flush()
+
+        if self._parquet_writer is not None:
+            self._write_parquet(rows)
+
+        self.processed_ids.update(row["request_id"] for row in rows)
+        last = rows[-1]
+        self._save_checkpoint({
+            "processed_ids": sorted(self.processed_ids),
+            "last_transaction_id": int(last_transaction_id),
+            "last_request_date": last["request_date"],
+            "cash_balance": last["cash_balance"],
+            "inventory_value": last["inventory_value"],
+        })
+
+    def close(self) -> None:
+        self._csv_file.close()
+        if self._jsonl_file is not None:
+            self._jsonl_file.close()
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ---------- internals ----------
+
+    def _load_checkpoint(self) -> Optional[Dict]:
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path) as f:
+            return json.load(f)
+
+    def _save_checkpoint(self, state: Dict) -> None:
+        self.checkpoint = state
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _restore_rows(self) -> List[Dict]:
+        """Read back checkpointed rows from the CSV, the durable copy of the results.
+
+        Rows written after the last checkpoint (e.g. a crash mid-request) are
+        dropped so the request is processed again rather than duplicated.
+        """
+        if not (self.resumed and os.path.exists(self.csv_path)):
+            return []
+        with open(self.csv_path, newline="") as f:
+            rows = [r for r in csv.DictReader(f) if int(r["request_id"]) in self.processed_ids]
+        for r in rows:
+            r["request_id"] = int(r["request_id"])
+            r["cash_balance"] = float(r["cash_balance"])
+            r["inventory_value"] = float(r["inventory_value"])
+        return rows
+
+    def _open_csv(self):
+        if not self.resumed and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        f = open(self.csv_path, "w", newline="")
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(self._restored)
+        f.flush()
+        return f
+
+    def _open_jsonl(self):
+        f = open(self.jsonl_path, "w")
+        for r in self._restored:
+            f.write(json.dumps(r, default=str) + "\n")
+        f.flush()
+        return f
+
+    def _open_parquet(self) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("The parquet results sink requires pyarrow (pip install pyarrow)") from e
+
+        self._pa = pa
+        self._schema = pa.schema([
+            ("request_id", pa.int64()), ("request_date", pa.string()),
+            ("job", pa.string()), ("event", pa.string()), ("need_size", pa.string()),
+            ("cash_balance", pa.float64()), ("inventory_value", pa.float64()),
+            ("response", pa.string()),
+        ])
+
+        # Parquet files cannot be appended to (and are unreadable if the run
+        # died before the footer was written), so restored rows are re-written
+        # into a fresh file and each new row becomes its own row group.
+        self._parquet_writer = pq.ParquetWriter(self.parquet_path, self._schema)
+        if self._restored:
+            self._write_parquet(self._restored)
+
+    def _write_parquet(self, rows: List[Dict]) -> None:
+        table = self._pa.Table.from_pylist(
+            [{**r, "response": None if r["response"] is None else str(r["response"])} for r in rows],
+            schema=self._schema,
+        )
+        self._parquet_writer.write_table(table)
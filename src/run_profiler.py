@@ -0,0 +1,267 @@
+"""
+CPU profiling of the local (non-LLM) work in a scenario run.
+
+While a `RunProfiler` is running, the runner's thread is profiled with
+cProfile except while it waits on the model or sits idle (`paused()`), and
+tool calls made on worker threads (parallel tool calls, the asyncio path) are
+profiled in `section()`s of their own. At `stop()` the per-thread profiles are merged and
+written as:
+
+- profile.pstats: load with `python -m pstats` or snakeviz
+- profile.collapsed: "caller;callee;... microseconds" lines for flamegraph.pl
+  or speedscope. cProfile records caller/callee edges rather than whole
+  stacks, so the stacks are rebuilt by splitting each function's time across
+  its callers in proportion to the time spent under each.
+
+The report also compares the time spent waiting on the model with the local
+compute time.
+
+On Python 3.12+ cProfile observes every thread and only one profiler may be
+enabled per interpreter, so all threads share one profile instead: it is
+enabled while any thread is inside a section and not paused. If another
+profiler is already active, sections that cannot start are skipped (and
+counted in the report) rather than failing the tool call.
+"""
+
+import cProfile
+import functools
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+MAX_STACK_DEPTH = 64
+
+
+def _label(func: Tuple[str, int, str]) -> str:
+    filename, line, name = func
+    if filename == "~":
+        return name  # built-ins, e.g. "<method 'execute' of 'sqlite3.Cursor' objects>"
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def collapsed_stacks(stats: pstats.Stats) -> Dict[str, float]:
+    """Approximate flamegraph stacks (";"-joined labels -> seconds of self time)."""
+    entries = stats.stats
+    children: Dict[tuple, List[tuple]] = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, (_, _, _, edge_cumulative) in callers.items():
+            children.setdefault(caller, []).append((func, edge_cumulative))
+
+    stacks: Dict[str, float] = {}
+
+    def walk(func: tuple, seconds: float, path: List[str], seen: set) -> None:
+        _, _, self_seconds, cumulative, _ = entries[func]
+        share = seconds / cumulative if cumulative > 0 else 0.0
+        path = path + [_label(func)]
+        if self_seconds * share > 0:
+            key = ";".join(path)
+            stacks[key] = stacks.get(key, 0.0) + self_seconds * share
+        if len(path) >= MAX_STACK_DEPTH:
+            return
+        for child, edge_cumulative in children.get(func, []):
+            # Recursive calls are already counted in the caller's cumulative time
+            if child not in seen and edge_cumulative * share > 1e-7:
+                walk(child, edge_cumulative * share, path, seen | {child})
+
+    for func, (_, _, _, cumulative, callers) in entries.items():
+        if not callers:
+            walk(func, cumulative, [], {func})
+    return stacks
+
+
+class RunProfiler:
+    """Per-thread cProfile sessions that exclude model waits."""
+
+    def __init__(self):
+        self.active = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._profiles: List[cProfile.Profile] = []
+        self._run = 0
+        # Python 3.12+: one profile for all threads, enabled while any of them is profiling
+        self._shared = sys.version_info >= (3, 12)
+        self._profiling_threads = 0
+        self._threads = set()
+        self._started = False
+        self.compute_seconds = 0.0
+        self.model_wait_seconds = 0.0
+        self.skipped_sections = 0
+
+    def start(self) -> None:
+        """Reset and start profiling; the calling thread is profiled until stop()."""
+        with self._lock:
+            self._profiles = [cProfile.Profile()] if self._shared else []
+            self._profiling_threads = 0
+            self._threads = set()
+            self._run += 1
+            self.compute_seconds = 0.0
+            self.model_wait_seconds = 0.0
+            self.skipped_sections = 0
+        self.active = True
+        self._started = self._enter()
+
+    def _enter(self) -> bool:
+        """Start profiling the current thread (nested calls just count); False if it could not start."""
+        local = self._local
+        if getattr(local, "depth", 0) > 0:
+            local.depth += 1
+            return True
+        if getattr(local, "run", None) != self._run:
+            # Threads outlive runs (pools), so each run starts them on a fresh profile
+            local.run = self._run
+            local.enabled = False
+            if not self._shared:
+                local.profile = cProfile.Profile()
+                with self._lock:
+                    self._profiles.append(local.profile)
+        if not self._resume():
+            return False
+        local.started = time.perf_counter()
+        local.waited = 0.0
+        local.depth = 1
+        with self._lock:
+            self._threads.add(threading.get_ident())
+        return True
+
+    def _exit(self) -> None:
+        local = self._local
+        local.depth -= 1
+        if local.depth > 0:
+            return
+        self._suspend()
+        elapsed = time.perf_counter() - local.started
+        with self._lock:
+            self.compute_seconds += elapsed - local.waited
+
+    def _resume(self) -> bool:
+        """Enable profiling for this thread; False (counted as skipped) if another profiler is active."""
+        try:
+            if self._shared:
+                with self._lock:
+                    if self._profiling_threads == 0:
+                        self._profiles[0].enable()
+                    self._profiling_threads += 1
+            else:
+                self._local.profile.enable()
+        except ValueError as e:
+            with self._lock:
+                self.skipped_sections += 1
+                first = self.skipped_sections == 1
+            if first:
+                print(f"Profiler: not profiling on thread {threading.current_thread().name}: {e}; "
+                      f"such sections are skipped and counted in the report")
+            return False
+        self._local.enabled = True
+        return True
+
+    def _suspend(self) -> None:
+        local = self._local
+        if not local.enabled:
+            return
+        local.enabled = False
+        if self._shared:
+            with self._lock:
+                self._profiling_threads -= 1
+                if self._profiling_threads == 0:
+                    self._profiles[0].disable()
+        else:
+            local.profile.disable()
+
+    @contextmanager
+    def section(self):
+        """Profile this block on the current thread (no-op unless running)."""
+        if not self.active or not self._enter():
+            yield
+            return
+        try:
+            yield
+        finally:
+            self._exit()
+
+    @contextmanager
+    def paused(self, model_wait: bool = True):
+        """
+        Exclude a model call from the profile and count it as model wait.
+        
+        With `model_wait=False` the block is just idle time on this thread
+        (e.g. an event loop waiting for agents running on other threads,
+        which profile their own tool calls).
+        """
+        if not self.active:
+            yield
+            return
+        local = self._local
+        profiling = getattr(local, "depth", 0) > 0
+        if profiling:
+            self._suspend()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            waited = time.perf_counter() - start
+            if model_wait:
+                with self._lock:
+                    self.model_wait_seconds += waited
+            if profiling:
+                local.waited += waited
+                self._resume()
+
+    def profile_tool(self, agent_tool) -> None:
+        """Profile every execution of a tool (wraps its `forward` in place, like trace_tool)."""
+        forward = agent_tool.forward
+
+        @functools.wraps(forward)
+        def profiled_forward(*args, **kwargs):
+            with self.section():
+                return forward(*args, **kwargs)
+
+        agent_tool.forward = profiled_forward
+
+    def stop(self, output_dir: str, top: int = 20) -> Optional[Dict]:
+        """Stop profiling, write profile.pstats and profile.collapsed, and print the hot spots."""
+        if not self.active:
+            return None
+        if self._started:
+            self._exit()
+        self.active = False
+        with self._lock:
+            profiles = [p for p in self._profiles if p.getstats()]
+        if not profiles:
+            return None
+
+        os.makedirs(output_dir, exist_ok=True)
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        pstats_path = os.path.join(output_dir, "profile.pstats")
+        stats.dump_stats(pstats_path)
+
+        collapsed_path = os.path.join(output_dir, "profile.collapsed")
+        stacks = collapsed_stacks(stats)
+        with open(collapsed_path, "w", encoding="utf-8") as f:
+            for stack, seconds in sorted(stacks.items()):
+                if seconds >= 1e-6:
+                    f.write(f"{stack} {int(round(seconds * 1e6))}\n")
+
+        hot = sorted(stats.stats.items(), key=lambda entry: entry[1][2], reverse=True)[:top]
+        ratio = self.model_wait_seconds / self.compute_seconds if self.compute_seconds else float("inf")
+        print(f"\nProfile: {self.compute_seconds:.2f}s local compute, {self.model_wait_seconds:.2f}s "
+              f"waiting on the model (wait/compute {ratio:.1f}x), {len(self._threads)} thread(s)")
+        if self.skipped_sections:
+            print(f"{self.skipped_sections} section(s) not profiled: another profiler was already active")
+        print(f"Top {len(hot)} functions by own time:")
+        print(f"  {'own s':>8} {'cum s':>8} {'calls':>8}  function")
+        for func, (_, calls, own, cumulative, _) in hot:
+            print(f"  {own:>8.3f} {cumulative:>8.3f} {calls:>8}  {_label(func)}")
+        print(f"Profile written to '{pstats_path}' and '{collapsed_path}' (flamegraph.pl / speedscope)")
+        return {
+            "compute_seconds": self.compute_seconds,
+            "model_wait_seconds": self.model_wait_seconds,
+            "skipped_sections": self.skipped_sections,
+            "pstats": pstats_path,
+            "collapsed": collapsed_path,
+        }
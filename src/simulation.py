@@ -0,0 +1,185 @@
+"""
+Beaver's Choice Paper Company - Policy Simulation
+Monte Carlo evaluation of pricing and reorder policies without the LLM.
+
+Each scenario runs in its own worker process against its own in-memory SQLite
+database: the inventory is seeded with `init_database`, a synthetic request
+mix is quoted with the batch quoting engine, accepted orders are filled from
+available stock, and low items are restocked with the reorder planner at the
+end of every day. The final cash, inventory value and fill rate of every
+scenario are aggregated into one comparison table.
+
+Usage:
+    python simulation.py --seeds 100 --workers 8
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+import beaver_db
+from ledger_backends import NumpyLedger, SQLiteLedger
+
+# Line quantity ranges per need_size
+ORDER_SIZES = {"small": (10, 100), "medium": (100, 500), "large": (500, 2000)}
+
+
+@dataclass
+class Scenario:
+    """One simulated run: a seed plus the pricing, seeding and reorder policy under test."""
+    policy: str
+    seed: int
+    coverage: float = 0.4
+    discount_thresholds: Tuple[float, ...] = (1000.0, 2000.0, 5000.0)
+    discount_rates: Tuple[float, ...] = (0.0, 0.05, 0.10, 0.15)
+    restock_factor: float = 2.0
+    n_requests: int = 200
+    days: int = 30
+    start_date: str = "2025-04-01"
+    size_mix: Tuple[float, float, float] = (0.5, 0.35, 0.15)
+    base_acceptance: float = 0.7
+    discount_sensitivity: float = 2.0
+    ledger: str = "sqlite"
+
+
+def generate_request_mix(scenario: Scenario, rng: np.random.Generator) -> pd.DataFrame:
+    """Synthetic order lines (request_id, request_date, need_size, item_name, quantity)."""
+    names = np.array([item["item_name"] for item in beaver_db.paper_supplies], dtype=object)
+    sizes = np.array(list(ORDER_SIZES))
+
+    request_sizes = rng.choice(sizes, size=scenario.n_requests, p=scenario.size_mix)
+    request_days = np.sort(rng.integers(0, scenario.days, size=scenario.n_requests))
+    lines_per_request = rng.integers(1, 5, size=scenario.n_requests)
+
+    request_ids = np.repeat(np.arange(1, scenario.n_requests + 1), lines_per_request)
+    line_sizes = np.repeat(request_sizes, lines_per_request)
+    low = np.array([ORDER_SIZES[s][0] for s in line_sizes])
+    high = np.array([ORDER_SIZES[s][1] for s in line_sizes])
+    dates = np.datetime64(scenario.start_date) + np.repeat(request_days, lines_per_request)
+
+    return pd.DataFrame({
+        "request_id": request_ids,
+        "request_date": dates.astype(str),
+        "need_size": line_sizes,
+        "item_name": rng.choice(names, size=len(request_ids)),
+        "quantity": rng.integers(low, high),
+    })
+
+
+def run_scenario(scenario: Scenario) -> Dict:
+    """Run one scenario end to end against a fresh in-memory database."""
+    rng = np.random.default_rng(scenario.seed)
+    beaver_db.set_db_engine(create_engine("sqlite://"))
+    beaver_db.set_ledger_backend(
+        NumpyLedger() if scenario.ledger == "numpy" else SQLiteLedger(beaver_db.db_engine)
+    )
+    beaver_db.init_database(beaver_db.db_engine, seed=scenario.seed, coverage=scenario.coverage,
+                            data_dir=beaver_db.DATA_DIR)
+
+    lines = generate_request_mix(scenario, rng)
+    quoted, totals = beaver_db.quote_orders(
+        lines, thresholds=scenario.discount_thresholds, rates=scenario.discount_rates
+    )
+    totals = totals.set_index("request_id")
+    accept_probability = np.minimum(
+        1.0, scenario.base_acceptance + scenario.discount_sensitivity * totals["discount_rate"]
+    )
+    accepted = pd.Series(rng.random(len(totals)) < accept_probability, index=totals.index)
+
+    units_requested = units_filled = revenue = 0.0
+    for date, day_lines in quoted.groupby("request_date", sort=True):
+        for request_id, request_lines in day_lines.groupby("request_id", sort=False):
+            if not accepted[request_id]:
+                continue
+            rate = totals.at[request_id, "discount_rate"]
+            index = beaver_db.get_availability_index()
+            sales = []
+            # Units this request has already taken, so repeated lines for an item share its stock
+            promised: Dict[str, int] = {}
+            for line in request_lines.itertuples():
+                units_requested += line.quantity
+                taken = promised.get(line.item_name, 0)
+                if line.available and index.available_to_promise(line.item_name, date) - taken >= line.quantity:
+                    promised[line.item_name] = taken + int(line.quantity)
+                    units_filled += line.quantity
+                    price = float(line.item_total * (1 - rate))
+                    revenue += price
+                    sales.append({"item_name": line.item_name, "transaction_type": "sales",
+                                  "quantity": int(line.quantity), "price": price, "date": date})
+            if sales:
+                beaver_db.create_transactions(sales)
+
+        plan = beaver_db.plan_reorders(date, restock_factor=scenario.restock_factor)
+        if not plan.empty:
+            beaver_db.commit_reorder_plan(plan, date)
+
+    end_date = str(np.datetime64(scenario.start_date) + scenario.days)
+    report = beaver_db.generate_financial_report(end_date)
+    return {
+        **asdict(scenario),
+        "requests_accepted": int(accepted.sum()),
+        "acceptance_rate": float(accepted.mean()),
+        "fill_rate": units_filled / units_requested if units_requested else 1.0,
+        "revenue": revenue,
+        "final_cash": report["cash_balance"],
+        "inventory_value": report["inventory_value"],
+        "total_assets": report["total_assets"],
+    }
+
+
+def run_simulation(scenarios: List[Scenario], max_workers: int = None) -> pd.DataFrame:
+    """Run scenarios in parallel worker processes; one result row per scenario."""
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return pd.DataFrame(list(pool.map(run_scenario, scenarios)))
+
+
+def compare_policies(results: pd.DataFrame) -> pd.DataFrame:
+    """Mean and spread of the outcome metrics per policy."""
+    metrics = ["final_cash", "inventory_value", "total_assets", "fill_rate", "acceptance_rate"]
+    summary = results.groupby("policy")[metrics].agg(["mean", "std"])
+    summary.columns = [f"{metric}_{stat}" for metric, stat in summary.columns]
+    return summary.sort_values("total_assets_mean", ascending=False)
+
+
+# Policies compared by default: the current discount ladder and seeding plus variations
+DEFAULT_POLICIES = {
+    "baseline": {},
+    "no_discounts": {"discount_rates": (0.0, 0.0, 0.0, 0.0)},
+    "steeper_discounts": {"discount_rates": (0.0, 0.08, 0.15, 0.20)},
+    "wider_coverage": {"coverage": 0.7},
+    "lean_restock": {"restock_factor": 1.5},
+}
+
+
+def build_scenarios(n_seeds: int, n_requests: int = 200, first_seed: int = 137,
+                    ledger: str = "sqlite") -> List[Scenario]:
+    """Every default policy crossed with `n_seeds` seeds (shared across policies)."""
+    return [
+        Scenario(policy=policy, seed=seed, n_requests=n_requests, ledger=ledger, **overrides)
+        for policy, overrides in DEFAULT_POLICIES.items()
+        for seed in range(first_seed, first_seed + n_seeds)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate pricing and reorder policies without the LLM.")
+    parser.add_argument("--seeds", type=int, default=20, help="seeds per policy")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--ledger", choices=["sqlite", "numpy"], default="sqlite",
+                        help="transaction storage: SQLite (in memory) or NumPy arrays")
+    parser.add_argument("--output", default="results/simulation_results.csv",
+                        help="where to write the per-scenario results")
+    args = parser.parse_args()
+
+    results = run_simulation(build_scenarios(args.seeds, args.requests, ledger=args.ledger), max_workers=args.workers)
+    results.to_csv(args.output, index=False)
+
+    pd.set_option("display.width", 200)
+    print(compare_policies(results).round(2).to_string())
+    print(f"\nPer-scenario results saved to '{args.output}'")
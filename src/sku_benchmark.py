@@ -0,0 +1,167 @@
+"""
+Beaver's Choice Paper Company - SKU Benchmark
+Size and speed of a ledger keyed by item name (the previous schema) against
+one keyed by catalogue SKU (catalogue.py), and of the catalogue itself as a
+list of dicts against a Catalogue.
+
+Both ledgers hold the same synthetic transactions over a catalogue of
+--items items (the paper_supplies names with variant suffixes) and have the
+equivalent (item, transaction_date) index.
+
+Usage:
+    python sku_benchmark.py --rows 1000000 --items 5000
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from beaver_db import paper_supplies
+from catalogue import Catalogue
+from ledger_backends import STOCK_LEVEL_CASE
+
+AS_OF = "2025-04-15"
+
+
+def make_catalogue_records(items: int) -> List[Dict]:
+    """`items` catalogue records: paper_supplies first, then numbered variants of them."""
+    records = []
+    for i in range(items):
+        base = paper_supplies[i % len(paper_supplies)]
+        variant = i // len(paper_supplies)
+        name = base["item_name"] if variant == 0 else f"{base['item_name']} (variant {variant})"
+        records.append({"item_name": name, "category": base["category"],
+                        "unit_price": round(base["unit_price"] * (1 + 0.01 * variant), 4)})
+    return records
+
+
+def make_ledger(rows: int, items: int, seed: int = 0) -> Dict[str, np.ndarray]:
+    """Random sales and stock orders over the first four months of 2025."""
+    rng = np.random.default_rng(seed)
+    days = rng.integers(0, 120, rows)
+    dates = (np.datetime64("2025-01-01") + days).astype(str)
+    delivery = (np.datetime64("2025-01-01") + days + rng.integers(0, 8, rows)).astype(str)
+    return {
+        "item": rng.zipf(1.3, rows) % items,
+        "type": np.where(rng.random(rows) < 0.8, "sales", "stock_orders"),
+        "units": rng.integers(1, 500, rows),
+        "price": np.round(rng.random(rows) * 100, 2),
+        "date": dates,
+        "delivery": delivery,
+    }
+
+
+def build(path: str, key: str, ledger: Dict[str, np.ndarray], names: List[str]) -> sqlite3.Connection:
+    column, column_type = ("item_name", "TEXT") if key == "name" else ("item_id", "INTEGER")
+    items = [names[i] for i in ledger["item"]] if key == "name" else ledger["item"].tolist()
+    conn = sqlite3.connect(path)
+    conn.execute(f"""CREATE TABLE transactions (id INTEGER, {column} {column_type}, transaction_type TEXT,
+                     units INTEGER, price REAL, transaction_date TEXT, delivery_date TEXT)""")
+    conn.executemany(
+        f"INSERT INTO transactions ({column}, transaction_type, units, price, transaction_date, delivery_date)"
+        " VALUES (?, ?, ?, ?, ?, ?)",
+        zip(items, ledger["type"].tolist(), ledger["units"].tolist(), ledger["price"].tolist(),
+            ledger["date"].tolist(), ledger["delivery"].tolist()),
+    )
+    conn.execute(f"CREATE INDEX idx_transactions_item_date ON transactions ({column}, transaction_date)")
+    conn.commit()
+    conn.execute("VACUUM")
+    return conn
+
+
+def timed(fn: Callable, repeat: int) -> float:
+    """Best wall time of `fn()` in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def traced_bytes(build_fn: Callable):
+    tracemalloc.start()
+    value = build_fn()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare name-keyed and SKU-keyed ledgers.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    records = make_catalogue_records(args.items)
+    names = [r["item_name"] for r in records]
+    ledger = make_ledger(args.rows, args.items)
+
+    # Catalogue in memory: the paper_supplies-style list of dicts (plus a name index, which
+    # lookups need) against Catalogue's parallel arrays
+    as_dicts, dict_bytes = traced_bytes(lambda: {r["item_name"]: dict(r) for r in make_catalogue_records(args.items)})
+    catalogue, catalogue_bytes = traced_bytes(lambda: Catalogue(make_catalogue_records(args.items)))
+    lookups = [names[i] for i in ledger["item"][:100_000]]
+    dict_ms = timed(lambda: [as_dicts[name]["unit_price"] for name in lookups], args.repeat)
+    prices = catalogue.unit_prices
+    sku_ms = timed(lambda: prices[catalogue.skus(lookups)], args.repeat)
+    held = catalogue.skus(lookups)
+    held_ms = timed(lambda: prices[held], args.repeat)
+    print(f"catalogue of {args.items} items: dicts {dict_bytes / 1024:.0f} KiB, "
+          f"Catalogue {catalogue_bytes / 1024:.0f} KiB")
+    print(f"  {len(lookups)} name -> price lookups: dicts {dict_ms:.1f} ms, Catalogue {sku_ms:.1f} ms "
+          f"({held_ms:.2f} ms from SKUs already held, as ledger rows are)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledgers = {}
+        for key in ("name", "sku"):
+            path = os.path.join(tmp, f"{key}.db")
+            start = time.perf_counter()
+            ledgers[key] = build(path, key, ledger, names)
+            print(f"{key:>4}-keyed ledger: {args.rows} rows built in {time.perf_counter() - start:.1f}s, "
+                  f"{os.path.getsize(path) / 2**20:.1f} MiB")
+
+        hot = names[0]
+        queries = {
+            "stock levels (all items)": {
+                key: (f"SELECT {column}, {STOCK_LEVEL_CASE} FROM transactions "
+                      f"WHERE {column} IS NOT NULL AND transaction_date <= :as_of_date GROUP BY {column}",
+                      {"as_of_date": AS_OF})
+                for key, column in (("name", "item_name"), ("sku", "item_id"))
+            },
+            "stock level (one item)": {
+                "name": (f"SELECT {STOCK_LEVEL_CASE} FROM transactions "
+                         "WHERE item_name = :item AND transaction_date <= :as_of_date",
+                         {"item": hot, "as_of_date": AS_OF}),
+                "sku": (f"SELECT {STOCK_LEVEL_CASE} FROM transactions "
+                        "WHERE item_id = :item AND transaction_date <= :as_of_date",
+                        {"item": catalogue.sku(hot), "as_of_date": AS_OF}),
+            },
+            "top sales": {
+                key: (f"SELECT {column}, SUM(units), SUM(price) FROM transactions "
+                      f"WHERE transaction_type = 'sales' AND transaction_date <= :as_of_date "
+                      f"GROUP BY {column} ORDER BY SUM(price) DESC LIMIT 5", {"as_of_date": AS_OF})
+                for key, column in (("name", "item_name"), ("sku", "item_id"))
+            },
+        }
+        print(f"{'query':<26}{'name ms':>10}{'sku ms':>10}{'speedup':>10}")
+        for label, by_key in queries.items():
+            ms = {key: timed(lambda: ledgers[key].execute(*by_key[key]).fetchall(), args.repeat)
+                  for key in ("name", "sku")}
+            sku_result = ledgers["sku"].execute(*by_key["sku"]).fetchall()
+            name_result = ledgers["name"].execute(*by_key["name"]).fetchall()
+            if label != "stock level (one item)":
+                sku_result = sorted((catalogue.name(row[0]),) + tuple(row[1:]) for row in sku_result)
+                name_result = sorted(name_result)
+            assert np.allclose([r[1:] if len(r) > 1 else r for r in sku_result],
+                               [r[1:] if len(r) > 1 else r for r in name_result]), label
+            print(f"{label:<26}{ms['name']:>10.1f}{ms['sku']:>10.1f}{ms['name'] / ms['sku']:>9.2f}x")
+        for conn in ledgers.values():
+            conn.close()
@@ -0,0 +1,418 @@
+"""
+Beaver's Choice Paper Company - Synthetic Data Generator
+Seeded, vectorized generators for large catalogues, inventories, ledgers and
+customer requests, for testing the system at scale (50k SKUs, 1M requests).
+
+- generate_catalogue: the 46 paper_supplies items first, then variants of
+  them (colour, finish, pack size) with jittered prices
+- generate_sample_inventory (beaver_db): stock for a fraction of the catalogue
+- generate_ledger: sales from stock and the restocks they trigger over a
+  date range, yielded in chunks
+- generate_requests: quote_requests_sample-style rows (job, need_size,
+  event, request text, request_date), yielded in chunks
+
+Dates follow a weekly and seasonal pattern: weekdays are busier than
+weekends and activity peaks in spring. Items are drawn with Zipf-like
+popularity, and order sizes follow the small/medium/large mix of
+simulation.py. Rows are generated one chunk at a time from a seed derived
+from (seed, chunk index), so the same arguments always give the same output
+and memory stays bounded by the chunk size. write_stream appends the chunks
+to a CSV or Parquet file.
+
+Usage:
+    python synthetic_data.py --items 50000 --requests 1000000 --ledger-rows 1000000 --out synthetic
+    python synthetic_data.py --items 5000 --ledger-rows 200000 --db synthetic.db    # seed a database
+"""
+
+import argparse
+import bisect
+import heapq
+import os
+import string
+import time
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import beaver_db
+from simulation import ORDER_SIZES
+
+COLOURS = ["white", "ivory", "black", "red", "blue", "green", "yellow", "pink", "purple", "orange",
+           "grey", "pastel"]
+FINISHES = ["matte", "gloss", "satin", "linen", "recycled", "premium", "textured", "uncoated"]
+PACKS = ["single", "pack of 10", "pack of 50", "pack of 100", "case of 500", "case of 2500"]
+PACK_PRICE_FACTORS = np.array([1.0, 0.97, 0.94, 0.9, 0.85, 0.8])
+
+# Units used for each category in request text
+CATEGORY_UNITS = {"paper": "sheets", "product": "units", "large_format": "rolls", "specialty": "sheets"}
+
+SIZE_MIX = (0.5, 0.35, 0.15)
+LINES_PER_REQUEST = (0.35, 0.35, 0.2, 0.1)
+SUPPLIER_PRICE_SHARE = 0.6  # restocks cost this share of list price
+RESTOCK_COVER_DAYS = 14  # restocks aim to cover this many days of the item's demand so far
+
+# Fallback vocabularies when data/quote_requests.csv is not available
+DEFAULT_JOBS = ["office manager", "school teacher", "event manager", "business owner", "hotel manager"]
+DEFAULT_EVENTS = ["meeting", "conference", "party", "ceremony", "reception", "exhibition"]
+DEFAULT_MOODS = ["happy", "stressed", "sad", "miserable", "pissed off"]
+
+REQUEST_TEMPLATES = [
+    ("I would like to request the following paper supplies for the {event}: \n\n{bullets}\n\n"
+     "I need these supplies delivered by {deadline}. Thank you."),
+    ("I would like to place an order for {inline} for the {event}. "
+     "Please deliver the supplies by {deadline}. Thank you."),
+    ("I need to order {inline}. The supplies must be delivered by {deadline}, for our upcoming {event}. "
+     "Please confirm the order and delivery schedule."),
+    "I need {inline} for our {event}. I need the order delivered by {deadline}.",
+]
+
+LEDGER_SCHEMA = pa.schema([
+    ("item_name", pa.string()), ("transaction_type", pa.string()), ("units", pa.int64()),
+    ("price", pa.float64()), ("transaction_date", pa.string()), ("delivery_date", pa.string()),
+])
+REQUEST_SCHEMA = pa.schema([
+    ("mood", pa.string()), ("job", pa.string()), ("need_size", pa.string()), ("event", pa.string()),
+    ("request", pa.string()), ("request_date", pa.string()),
+])
+CATALOGUE_SCHEMA = pa.schema([
+    ("item_name", pa.string()), ("category", pa.string()), ("unit_price", pa.float64()),
+])
+INVENTORY_SCHEMA = pa.schema([
+    ("item_name", pa.string()), ("category", pa.string()), ("unit_price", pa.float64()),
+    ("current_stock", pa.int64()), ("min_stock_level", pa.int64()),
+])
+
+
+def _rng(seed: int, stream: int, chunk: int = 0) -> np.random.Generator:
+    """Independent generator per (seed, output stream, chunk)."""
+    return np.random.default_rng([seed, stream, chunk])
+
+
+def generate_catalogue(n_items: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Catalogue of `n_items` unique items (item_name, category, unit_price).
+
+    The first 46 are paper_supplies; the rest are "<base> - <colour> <finish>,
+    <pack>" variants (with a "series" suffix once those combinations run out).
+    """
+    rng = _rng(seed, 0)
+    base = pd.DataFrame(beaver_db.paper_supplies)
+    index = np.arange(n_items)
+    base_index = index % len(base)
+    variant = index // len(base) - 1
+    combinations = len(COLOURS) * len(FINISHES) * len(PACKS)
+    combo = np.maximum(variant, 0) % combinations
+    series = np.maximum(variant, 0) // combinations
+    pack = combo % len(PACKS)
+
+    names = base["item_name"].to_numpy(dtype=object)[base_index]
+    variants = (names + " - " + np.array(COLOURS, dtype=object)[combo // (len(PACKS) * len(FINISHES))]
+                + " " + np.array(FINISHES, dtype=object)[combo // len(PACKS) % len(FINISHES)]
+                + ", " + np.array(PACKS, dtype=object)[pack])
+    variants = np.where(series > 0, variants + " (series " + (series + 1).astype(str).astype(object) + ")",
+                        variants)
+    prices = base["unit_price"].to_numpy()[base_index] * PACK_PRICE_FACTORS[pack] \
+        * rng.lognormal(0.0, 0.15, n_items)
+    return pd.DataFrame({
+        "item_name": np.where(variant < 0, names, variants),
+        "category": base["category"].to_numpy(dtype=object)[base_index],
+        "unit_price": np.where(variant < 0, base["unit_price"].to_numpy()[base_index],
+                               np.maximum(np.round(prices, 2), 0.01)),
+    })
+
+
+def item_popularity(n_items: int, seed: int = 0, exponent: float = 1.1) -> np.ndarray:
+    """Zipf-like probability of each item appearing on an order line (ranks shuffled by seed)."""
+    ranks = _rng(seed, 1).permutation(n_items) + 1
+    weights = 1.0 / ranks ** exponent
+    return weights / weights.sum()
+
+
+def day_weights(start_date: str, days: int) -> np.ndarray:
+    """Share of activity per day: quieter weekends and a spring peak."""
+    dates = np.datetime64(start_date) + np.arange(days)
+    weekday = (dates.astype("datetime64[D]").view("int64") - 4) % 7  # 0 = Monday
+    weekly = np.array([1.0, 1.05, 1.05, 1.0, 0.95, 0.35, 0.15])[weekday]
+    day_of_year = (dates - dates.astype("datetime64[Y]")).astype(int)
+    seasonal = 1.0 + 0.3 * np.cos(2 * np.pi * (day_of_year - 105) / 365)
+    weights = weekly * seasonal
+    return weights / weights.sum()
+
+
+def _daily_chunks(total: int, start_date: str, days: int, chunk_size: int, rng: np.random.Generator
+                  ) -> Iterator[np.ndarray]:
+    """Date-ordered day offsets for `total` rows, `chunk_size` at a time."""
+    counts = rng.multinomial(total, day_weights(start_date, days))
+    ends = np.cumsum(counts)
+    for start in range(0, total, chunk_size):
+        stop = min(start + chunk_size, total)
+        yield np.searchsorted(ends, np.arange(start, stop), side="right")
+
+
+def _quantities(rng: np.random.Generator, sizes: np.ndarray) -> np.ndarray:
+    """Order quantities in each line's size range, rounded to the nearest 10 above 100."""
+    low = np.array([ORDER_SIZES[s][0] for s in ORDER_SIZES])
+    high = np.array([ORDER_SIZES[s][1] for s in ORDER_SIZES])
+    quantities = rng.integers(low[sizes], high[sizes])
+    return np.where(quantities > 100, np.round(quantities, -1), quantities)
+
+
+def _lead_days(units: np.ndarray) -> np.ndarray:
+    """Supplier lead time of get_supplier_delivery_date, in days."""
+    return np.select([units <= 10, units <= 100, units <= 1000], [0, 1, 4], 7)
+
+
+def seeded_cash(inventory: pd.DataFrame) -> float:
+    """Cash init_database leaves: the opening balance less the seeded stock orders."""
+    return beaver_db.opening_cash(inventory) - float((inventory["current_stock"] * inventory["unit_price"]).sum())
+
+
+def generate_ledger(catalogue: pd.DataFrame, inventory: pd.DataFrame, rows: int,
+                    cash: Optional[float] = None, start_date: str = "2025-01-02", days: int = 120, seed: int = 0,
+                    chunk_size: int = 100_000) -> Iterator[pd.DataFrame]:
+    """
+    Yield ledger rows (LEDGER_SCHEMA columns) in date order, `chunk_size` sales at a time.
+
+    `rows` sales are drawn from the stocked items of `inventory` (as seeded
+    by init_database) at list price less the bulk discount, each filled only
+    up to the units delivered and not yet sold, so stock never goes negative.
+    When an item's stock plus pending deliveries falls below its
+    min_stock_level, a restock at SUPPLIER_PRICE_SHARE of list price tops it
+    up to the largest of twice its opening stock, twice the order that
+    triggered it and RESTOCK_COVER_DAYS of its demand so far, delivered
+    after the lead time of get_supplier_delivery_date. Restocks are cut to
+    what `cash` (by default the balance init_database leaves) can pay for.
+    Sales that find no stock are dropped, so a chunk can be shorter.
+    """
+    popularity = pd.Series(item_popularity(len(catalogue), seed), index=catalogue["item_name"])
+    names = inventory["item_name"].to_numpy(dtype=object)
+    weights = popularity.reindex(names).fillna(0.0).to_numpy()
+    weights = weights / weights.sum()
+    prices = inventory["unit_price"].to_numpy(dtype=float)
+    stock = inventory["current_stock"].to_numpy(dtype=np.int64).copy()
+    position = stock.copy()  # stock plus restocks not yet delivered
+    reorder_levels = inventory["min_stock_level"].to_numpy(dtype=np.int64)
+    targets = 2 * stock
+    requested = np.zeros(len(names), dtype=np.int64)
+    cash = seeded_cash(inventory) if cash is None else cash
+    arrivals: List[tuple] = []  # (day, item, units) heap of pending deliveries
+    thresholds, rates = beaver_db.DISCOUNT_THRESHOLDS.tolist(), beaver_db.DISCOUNT_RATES.tolist()
+    start = np.datetime64(start_date)
+
+    for chunk, offsets in enumerate(_daily_chunks(rows, start_date, days, chunk_size, _rng(seed, 2))):
+        rng = _rng(seed, 3, chunk)
+        n = len(offsets)
+        items = rng.choice(len(names), size=n, p=weights)
+        quantities = _quantities(rng, rng.choice(len(ORDER_SIZES), size=n, p=SIZE_MIX))
+        lines = []  # (item, is_restock, units, price, day)
+        for day, item, wanted in zip(offsets.tolist(), items.tolist(), quantities.tolist()):
+            while arrivals and arrivals[0][0] <= day:
+                _, arrived, units = heapq.heappop(arrivals)
+                stock[arrived] += units
+            requested[item] += wanted
+            units = min(wanted, int(stock[item]))
+            if units > 0:
+                subtotal = units * prices[item]
+                revenue = round(subtotal * (1 - rates[bisect.bisect_right(thresholds, subtotal)]), 2)
+                stock[item] -= units
+                position[item] -= units
+                cash += revenue
+                lines.append((item, False, units, revenue, day))
+            if position[item] < reorder_levels[item]:
+                unit_cost = prices[item] * SUPPLIER_PRICE_SHARE
+                demand = int(requested[item] * RESTOCK_COVER_DAYS / (day + 1))
+                target = max(targets[item], 2 * wanted, demand)
+                units = min(target - int(position[item]), int((cash - 0.01) // unit_cost))
+                if units > 0:
+                    cost = round(units * unit_cost, 2)
+                    position[item] += units
+                    cash -= cost
+                    heapq.heappush(arrivals, (day + int(_lead_days(units)), item, units))
+                    lines.append((item, True, units, cost, day))
+        lines = pd.DataFrame(lines, columns=["item", "restock", "units", "price", "day"])
+        restock = lines["restock"].to_numpy(dtype=bool)
+        units = lines["units"].to_numpy(dtype=np.int64)
+        dates = start + lines["day"].to_numpy(dtype=np.int64)
+        yield pd.DataFrame({
+            "item_name": names[lines["item"].to_numpy(dtype=np.int64)],
+            "transaction_type": np.where(restock, "stock_orders", "sales"),
+            "units": units,
+            "price": lines["price"].to_numpy(dtype=float),
+            "transaction_date": dates.astype(str),
+            "delivery_date": np.where(restock, dates + _lead_days(units), dates).astype(str),
+        })
+
+
+def _vocabulary(column: str, default: List[str]) -> pd.Series:
+    """Value frequencies of a quote_requests.csv column (uniform over `default` without the file)."""
+    path = os.path.join(beaver_db.DATA_DIR, "quote_requests.csv")
+    if os.path.exists(path):
+        values = pd.read_csv(path, usecols=[column])[column].dropna().str.strip()
+        return values.value_counts(normalize=True)
+    return pd.Series(1.0 / len(default), index=default)
+
+
+def _join_inline(lines: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """"a", "a and b", "a, b, and c", ... from up to four line strings per row."""
+    text = lines[:, 0].copy()
+    for i in range(1, lines.shape[1]):
+        separator = np.where(counts == i + 1, np.where(counts == 2, " and ", ", and "), ", ")
+        text = np.where(counts > i, text + separator + lines[:, i], text)
+    return text
+
+
+def _join_bullets(lines: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """"- a\n- b\n..." from up to four line strings per row."""
+    text = "- " + lines[:, 0]
+    for i in range(1, lines.shape[1]):
+        text = np.where(counts > i, text + "\n- " + lines[:, i], text)
+    return text
+
+
+def _render(template: str, fields: Dict[str, np.ndarray]) -> np.ndarray:
+    """str.format over columns: `template` filled in row by row from the arrays in `fields`."""
+    text = np.full(len(next(iter(fields.values()))), "", dtype=object)
+    for literal, field, _, _ in string.Formatter().parse(template):
+        text = text + literal
+        if field is not None:
+            text = text + fields[field]
+    return text
+
+
+def generate_requests(catalogue: pd.DataFrame, n_requests: int, start_date: str = "2025-04-01",
+                      days: int = 30, seed: int = 0, chunk_size: int = 100_000) -> Iterator[pd.DataFrame]:
+    """
+    Yield customer requests (REQUEST_SCHEMA columns) in date order, `chunk_size` at a time.
+
+    Moods, jobs and events follow their frequencies in quote_requests.csv;
+    each request asks for one to four items, by popularity, and a delivery
+    3 to 21 days out. request_date uses the "%m/%d/%y" format of
+    quote_requests_sample.csv, so the output can stand in for it.
+    """
+    popularity = item_popularity(len(catalogue), seed)
+    names = catalogue["item_name"].to_numpy(dtype=object)
+    units = catalogue["category"].map(CATEGORY_UNITS).fillna("units").to_numpy(dtype=object)
+    vocabularies = {column: _vocabulary(column, default) for column, default in
+                    (("mood", DEFAULT_MOODS), ("job", DEFAULT_JOBS), ("event", DEFAULT_EVENTS))}
+    size_names = np.array(list(ORDER_SIZES), dtype=object)
+    max_lines = len(LINES_PER_REQUEST)
+    # Dates and quantities take few distinct values: format each once and index into the tables
+    calendar = pd.date_range(start_date, periods=days + 21)
+    date_text = calendar.strftime("%m/%d/%y").to_numpy(dtype=object)
+    deadline_text = (calendar.strftime("%B ") + calendar.day.astype(str)
+                     + calendar.strftime(", %Y")).to_numpy(dtype=object)
+    quantity_text = np.array([f"{q:,}" for q in range(max(high for _, high in ORDER_SIZES.values()) + 1)],
+                             dtype=object)
+
+    for chunk, offsets in enumerate(_daily_chunks(n_requests, start_date, days, chunk_size, _rng(seed, 4))):
+        rng = _rng(seed, 5, chunk)
+        n = len(offsets)
+        picked = {column: rng.choice(vocabulary.index.to_numpy(dtype=object), size=n, p=vocabulary.to_numpy())
+                  for column, vocabulary in vocabularies.items()}
+        sizes = rng.choice(len(size_names), size=n, p=SIZE_MIX)
+        counts = rng.choice(max_lines, size=n, p=LINES_PER_REQUEST) + 1
+
+        items = rng.choice(len(names), size=(n, max_lines), p=popularity)
+        quantities = _quantities(rng, np.repeat(sizes, max_lines)).reshape(n, max_lines)
+        lines = (quantity_text[quantities] + " " + units[items] + " of " + names[items])
+
+        templates = rng.integers(0, len(REQUEST_TEMPLATES), size=n)
+        deadlines = offsets + rng.integers(3, 22, size=n)
+        requests = np.empty(n, dtype=object)
+        for i, template in enumerate(REQUEST_TEMPLATES):
+            mask = templates == i
+            requests[mask] = _render(template, {
+                "event": picked["event"][mask],
+                "deadline": deadline_text[deadlines[mask]],
+                "inline": _join_inline(lines[mask], counts[mask]),
+                "bullets": _join_bullets(lines[mask], counts[mask]),
+            })
+        yield pd.DataFrame({
+            "mood": picked["mood"],
+            "job": picked["job"],
+            "need_size": size_names[sizes],
+            "event": picked["event"],
+            "request": requests,
+            "request_date": date_text[offsets],
+        })
+
+
+def write_stream(chunks: Iterator[pd.DataFrame], path: str, schema: pa.Schema) -> int:
+    """Append `chunks` to a .csv or .parquet file as they are generated; returns the row count."""
+    rows = 0
+    writer: Optional[pq.ParquetWriter] = None
+    try:
+        for chunk in chunks:
+            if path.endswith(".parquet"):
+                if writer is None:
+                    writer = pq.ParquetWriter(path, schema)
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            else:
+                chunk.to_csv(path, mode="w" if rows == 0 else "a", header=rows == 0, index=False)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def seed_database(catalogue: pd.DataFrame, ledger_rows: int, seed: int = 0, coverage: float = 0.4,
+                  chunk_size: int = 100_000) -> int:
+    """Initialize beaver_db's database with `catalogue`, then record a synthetic ledger on top."""
+    inventory = beaver_db.generate_sample_inventory(catalogue, coverage, seed)
+    beaver_db.init_database(beaver_db.db_engine, seed=seed, coverage=coverage, data_dir=beaver_db.DATA_DIR,
+                            items=catalogue.to_dict("records"))
+    recorded = 0
+    for chunk in generate_ledger(catalogue, inventory, ledger_rows, seed=seed, chunk_size=chunk_size):
+        beaver_db.create_transactions(
+            chunk.rename(columns={"units": "quantity", "transaction_date": "date"}).to_dict("records")
+        )
+        recorded += len(chunk)
+    return recorded
+
+
+if __name__ == "__main__":
+    from sqlalchemy import create_engine
+
+    parser = argparse.ArgumentParser(description="Generate a large synthetic catalogue, ledger and requests.")
+    parser.add_argument("--items", type=int, default=50_000, help="catalogue size")
+    parser.add_argument("--requests", type=int, default=0, help="customer requests to generate")
+    parser.add_argument("--ledger-rows", type=int, default=0, help="ledger transactions to generate")
+    parser.add_argument("--coverage", type=float, default=0.4, help="fraction of the catalogue in stock")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="parquet")
+    parser.add_argument("--out", default="synthetic", help="output directory for the generated tables")
+    parser.add_argument("--db", help="instead of writing files, seed this SQLite database")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    catalogue = generate_catalogue(args.items, args.seed)
+    if args.db:
+        beaver_db.set_db_engine(create_engine(f"sqlite:///{args.db}"))
+        recorded = seed_database(catalogue, args.ledger_rows, args.seed, args.coverage, args.chunk_size)
+        print(f"{args.db}: {len(catalogue)} items, {recorded} synthetic transactions "
+              f"in {time.perf_counter() - start:.1f}s")
+    else:
+        os.makedirs(args.out, exist_ok=True)
+        inventory = beaver_db.generate_sample_inventory(catalogue, args.coverage, args.seed)
+        outputs = [
+            ("catalogue", iter([catalogue]), CATALOGUE_SCHEMA),
+            ("inventory", iter([inventory]), INVENTORY_SCHEMA),
+        ]
+        if args.ledger_rows:
+            outputs.append(("transactions", generate_ledger(catalogue, inventory, args.ledger_rows, seed=args.seed,
+                                                            chunk_size=args.chunk_size), LEDGER_SCHEMA))
+        if args.requests:
+            outputs.append(("quote_requests_sample", generate_requests(catalogue, args.requests, seed=args.seed,
+                                                                       chunk_size=args.chunk_size),
+                            REQUEST_SCHEMA))
+        for name, chunks, schema in outputs:
+            path = os.path.join(args.out, f"{name}.{args.format}")
+            table_start = time.perf_counter()
+            rows = write_stream(chunks, path, schema)
+            print(f"{path}: {rows} rows in {time.perf_counter() - table_start:.1f}s "
+                  f"({os.path.getsize(path) / 2**20:.1f} MiB)")
@@ -0,0 +1,227 @@
+"""
+Request-scoped memoization of read-only tool results.
+
+Within one customer request the orchestrator and specialist agents often ask
+the same read tool the same question. Inside a `tool_memo_scope()`, tools
+wrapped with `memoize_tool` return the recorded result for repeated
+(tool, arguments) pairs instead of querying the database again. Every ledger
+write calls `invalidate_items()` so entries that depend on the written items
+are dropped and reads stay consistent.
+
+A `prefetch_scope()` works one level lower: it holds database helper results
+(as futures) that a background thread started loading when the request
+arrived, so the first tool call for a likely item is already answered. The
+same `invalidate_items()` call drops prefetched entries for written items.
+"""
+
+import functools
+import inspect
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+# Dependency marker for results that depend on every item (e.g. full snapshots)
+ALL_ITEMS = "*"
+
+
+class ToolMemo:
+    """Thread-safe result cache for one request, indexed by the items each entry reads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results: Dict[tuple, str] = {}
+        self._keys_by_item: Dict[str, Set[tuple]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: tuple) -> Optional[str]:
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return result
+
+    def put(self, key: tuple, result: str, items: Iterable[str]) -> None:
+        with self._lock:
+            self._results[key] = result
+            for item in items:
+                self._keys_by_item.setdefault(item, set()).add(key)
+
+    def invalidate(self, items: Optional[Iterable[str]] = None) -> None:
+        """Drop entries reading any of `items` (all entries if `items` is None)."""
+        with self._lock:
+            if items is None:
+                dropped = set(self._results)
+                self._keys_by_item.clear()
+            else:
+                dropped = set()
+                for item in set(items) | {ALL_ITEMS}:
+                    dropped |= self._keys_by_item.pop(item, set())
+            for key in dropped:
+                self._results.pop(key, None)
+            self.invalidations += len(dropped)
+
+
+_current_memo: ContextVar[Optional[ToolMemo]] = ContextVar("tool_memo", default=None)
+
+_totals_lock = threading.Lock()
+memo_totals = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+@contextmanager
+def tool_memo_scope():
+    """Memoize decorated tool calls made within this block (e.g. one request)."""
+    memo = ToolMemo()
+    token = _current_memo.set(memo)
+    try:
+        yield memo
+    finally:
+        _current_memo.reset(token)
+        with _totals_lock:
+            memo_totals["hits"] += memo.hits
+            memo_totals["misses"] += memo.misses
+            memo_totals["invalidations"] += memo.invalidations
+
+
+def current_memo() -> Optional[ToolMemo]:
+    return _current_memo.get()
+
+
+def invalidate_items(items: Optional[Iterable[str]] = None) -> None:
+    """Invalidate the active memo and prefetch after a write to `items` (None means everything)."""
+    memo = _current_memo.get()
+    if memo is not None:
+        memo.invalidate(items)
+    prefetch = _current_prefetch.get()
+    if prefetch is not None:
+        prefetch.invalidate(items)
+
+
+def memoize_tool(agent_tool, depends_on: Callable[..., Iterable[str]]):
+    """
+    Memoize a read-only agent tool within the active tool_memo_scope.
+
+    The tool's `forward` is wrapped in place, so its schema and source are left
+    untouched (an extra decorator on a @tool function breaks its serialization).
+
+    Args:
+        agent_tool: A tool created with smolagents' @tool
+        depends_on: Called with the tool's arguments; returns the item names the
+            result depends on (or [ALL_ITEMS])
+
+    Returns:
+        The same tool, for chaining
+    """
+    forward = agent_tool.forward
+    signature = inspect.signature(forward)
+    # smolagents advertises `self` in the signature of a @tool's plain-function forward
+    parameters = [p for p in signature.parameters.values() if p.name != "self"]
+    signature = signature.replace(parameters=parameters)
+
+    @functools.wraps(forward)
+    def memoized_forward(*args, **kwargs):
+        memo = _current_memo.get()
+        if memo is None:
+            return forward(*args, **kwargs)
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (agent_tool.name, tuple(bound.arguments.items()))
+        result = memo.get(key)
+        if result is None:
+            result = forward(*args, **kwargs)
+            # Failures are not cached so a retry can succeed
+            if not str(result).startswith("Error"):
+                memo.put(key, result, depends_on(**bound.arguments))
+        return result
+
+    agent_tool.forward = memoized_forward
+    return agent_tool
+
+
+class PrefetchCache:
+    """Helper results for one request, registered as futures before they are loaded."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures: Dict[tuple, Future] = {}
+        self._keys_by_item: Dict[str, Set[tuple]] = {}
+        self.warmed = 0
+        self.hits = 0
+        self.invalidations = 0
+
+    def register(self, key: tuple, items: Iterable[str]) -> Future:
+        """Announce that `key` is being loaded; lookups wait for the returned future."""
+        future = Future()
+        with self._lock:
+            self._futures[key] = future
+            for item in items:
+                self._keys_by_item.setdefault(item, set()).add(key)
+            self.warmed += 1
+        return future
+
+    def lookup(self, key: tuple) -> Optional[Future]:
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None:
+                self.hits += 1
+            return future
+
+    def invalidate(self, items: Optional[Iterable[str]] = None) -> None:
+        """Drop entries reading any of `items` (all entries if `items` is None)."""
+        with self._lock:
+            if items is None:
+                dropped = set(self._futures)
+                self._keys_by_item.clear()
+            else:
+                dropped = set()
+                for item in set(items) | {ALL_ITEMS}:
+                    dropped |= self._keys_by_item.pop(item, set())
+            for key in dropped:
+                self._futures.pop(key, None)
+            self.invalidations += len(dropped)
+
+
+_current_prefetch: ContextVar[Optional[PrefetchCache]] = ContextVar("prefetch", default=None)
+
+prefetch_totals = {"warmed": 0, "hits": 0, "invalidations": 0}
+
+
+@contextmanager
+def prefetch_scope(cache: PrefetchCache):
+    """Serve prefetched helper results from `cache` within this block."""
+    token = _current_prefetch.set(cache)
+    try:
+        yield cache
+    finally:
+        _current_prefetch.reset(token)
+        with _totals_lock:
+            prefetch_totals["warmed"] += cache.warmed
+            prefetch_totals["hits"] += cache.hits
+            prefetch_totals["invalidations"] += cache.invalidations
+
+
+def prefetched(key: tuple, loader: Callable[[], Any]) -> Any:
+    """The prefetched result for `key` (waiting if it is still loading), else `loader()`."""
+    cache = _current_prefetch.get()
+    future = cache.lookup(key) if cache is not None else None
+    if future is None:
+        return loader()
+    try:
+        return future.result()
+    except Exception:
+        # A failed speculative load is retried for real so the caller sees its own error
+        return loader()
+
+
+def is_prefetched(key: tuple) -> bool:
+    """Whether the active prefetch holds (or is loading) `key`; does not count as a hit."""
+    cache = _current_prefetch.get()
+    if cache is None:
+        return False
+    with cache._lock:
+        return key in cache._futures
@@ -0,0 +1,7 @@
+"""Shared pytest setup: the modules live in src/ and are imported by plain name."""
+
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+sys.path.insert(0, os.path.abspath(SRC_DIR))
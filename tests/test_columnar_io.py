@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import create_engine
+
+import beaver_db
+import columnar_io
+from ledger_backends import SQLiteLedger
+
+
+def fresh_database(path):
+    beaver_db.set_db_engine(create_engine(f"sqlite:///{path}"))
+    beaver_db.set_ledger_backend(SQLiteLedger(beaver_db.db_engine, beaver_db.catalogue))
+    beaver_db.init_database(beaver_db.db_engine, data_dir=beaver_db.DATA_DIR)
+
+
+def test_imported_quotes_replace_the_facets_and_pricing_model(tmp_path):
+    fresh_database(tmp_path / "source.db")
+    columnar_io.export_ledger(str(tmp_path / "exports"))
+    quotes = columnar_io.read_dataset(str(tmp_path / "exports"), "quotes").slice(0, 10)
+    columnar_io.write_dataset(iter([quotes]), str(tmp_path / "exports" / "quotes"), quotes.schema, True)
+
+    fresh_database(tmp_path / "target.db")
+    columnar_io.import_ledger(str(tmp_path / "exports"))
+    assert beaver_db.quote_facet_summary()["quotes"] == 10
+    assert beaver_db.get_pricing_model().stats["quotes"] <= 10
+
+
+def test_round_trip_keeps_the_ledger_schema_and_integer_stock(tmp_path):
+    fresh_database(tmp_path / "source.db")
+    stock = beaver_db.get_all_inventory("2025-04-01")
+    columnar_io.export_ledger(str(tmp_path / "exports"))
+
+    fresh_database(tmp_path / "target.db")
+    beaver_db.create_transaction("A4 paper", "sales", 10, 1.0, "2025-02-01")
+    columnar_io.import_ledger(str(tmp_path / "exports"))
+    imported = beaver_db.get_all_inventory("2025-04-01")
+    assert imported == stock and all(type(units) is int for units in imported.values())
+    with beaver_db.db_engine.connect() as conn:
+        ddl = dict(conn.exec_driver_sql("SELECT name, sql FROM sqlite_master WHERE tbl_name = 'transactions'").all())
+    assert "units INTEGER" in ddl["transactions"] and "idx_transactions_item_date" in ddl
+
+
+def test_sharded_databases_are_refused(tmp_path):
+    beaver_db.set_db_engine(create_engine(f"sqlite:///{tmp_path / 'sharded.db'}"))
+    beaver_db.use_warehouse_shards(["north", "south"])
+    beaver_db.init_database(beaver_db.db_engine, data_dir=beaver_db.DATA_DIR)
+    with pytest.raises(ValueError, match="sharded"):
+        columnar_io.export_ledger(str(tmp_path / "exports"))
+    with pytest.raises(ValueError, match="sharded"):
+        columnar_io.import_ledger(str(tmp_path / "exports"))
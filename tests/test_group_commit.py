@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+
+import beaver_db
+from group_commit import GroupCommitQueue
+
+
+class FakeLedger:
+    """Numbers rows like the ledger and can be told to reject some of them."""
+
+    def __init__(self):
+        self.rows = []
+        self.commits = 0
+        self.lock = threading.Lock()
+
+    def append(self, rows):
+        if any(row.get("bad") for row in rows):
+            raise ValueError("bad row")
+        with self.lock:
+            self.commits += 1
+            start = len(self.rows) + 1
+            self.rows.extend(rows)
+            return list(range(start, start + len(rows)))
+
+
+def test_concurrent_submissions_get_their_own_ids():
+    ledger = FakeLedger()
+    queue = GroupCommitQueue(ledger.append, max_delay=0.01)
+    results = {}
+
+    def writer(n):
+        results[n] = queue.append([{"writer": n, "row": 0}, {"writer": n, "row": 1}])
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queue.close()
+
+    assert len(ledger.rows) == 32
+    for n, ids in results.items():
+        assert [ledger.rows[i - 1] for i in ids] == [{"writer": n, "row": 0}, {"writer": n, "row": 1}]
+    stats = queue.stats()
+    assert stats["submissions"] == 16 and stats["rows"] == 32
+    assert ledger.commits == stats["batches"] <= 16
+
+
+def test_failed_submission_does_not_fail_its_batch():
+    ledger = FakeLedger()
+    queue = GroupCommitQueue(ledger.append, max_delay=0.05)
+    futures = [queue.submit([{"n": n, "bad": n == 2}]) for n in range(5)]
+    queue.close()
+
+    with pytest.raises(ValueError):
+        futures[2].result()
+    assert [future.result() for n, future in enumerate(futures) if n != 2] == [[1], [2], [3], [4]]
+    assert [row["n"] for row in ledger.rows] == [0, 1, 3, 4]
+
+
+def test_lone_writer_is_not_delayed():
+    queue = GroupCommitQueue(FakeLedger().append, max_delay=1.0)
+    start = time.perf_counter()
+    for _ in range(3):
+        queue.append([{"row": 0}])
+    elapsed = time.perf_counter() - start
+    queue.close()
+    assert elapsed < 0.5
+
+
+def test_closed_queue_rejects_submissions():
+    queue = GroupCommitQueue(FakeLedger().append)
+    queue.close()
+    with pytest.raises(RuntimeError):
+        queue.submit([{"row": 0}])
+
+
+def test_sharded_ledgers_are_refused(tmp_path):
+    beaver_db.set_db_engine(create_engine(f"sqlite:///{tmp_path / 'sharded.db'}"))
+    beaver_db.use_warehouse_shards(["north", "south"])
+    with pytest.raises(ValueError, match="single ledger"):
+        beaver_db.enable_group_commit()
+    assert beaver_db.write_queue is None
@@ -0,0 +1,47 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import create_engine
+
+import beaver_db
+from http_service import BeaverService
+from ledger_backends import SQLiteLedger
+
+
+@pytest.fixture(scope="module")
+def service(tmp_path_factory):
+    # A file database: the batch handlers run on beaver_db's worker threads
+    path = tmp_path_factory.mktemp("http") / "service.db"
+    beaver_db.set_db_engine(create_engine(f"sqlite:///{path}"))
+    beaver_db.set_ledger_backend(SQLiteLedger(beaver_db.db_engine, beaver_db.catalogue))
+    beaver_db.init_database(beaver_db.db_engine, data_dir=beaver_db.DATA_DIR)
+    return BeaverService()
+
+
+def call(service, method, target, body=None):
+    return asyncio.run(service.dispatch(method, target, json.dumps(body).encode() if body else b""))
+
+
+@pytest.mark.parametrize("method, target, body", [
+    ("GET", "/stock?item=A4+paper&as_of=notadate", None),
+    ("POST", "/order", {"items": {"A4 paper": 1}, "request_date": "zzz"}),
+])
+def test_malformed_dates_are_rejected(service, method, target, body):
+    before = beaver_db.get_last_transaction_id()
+    status, payload = call(service, method, target, body)
+    assert status == 400 and "YYYY-MM-DD" in payload["error"]
+    assert beaver_db.get_last_transaction_id() == before
+
+
+def test_orders_cannot_take_units_promised_to_later_sales(service):
+    day, later = "2025-02-03", "2025-03-03"
+    available = beaver_db.get_availability_index().available_to_promise("A4 paper", day)
+    # Everything but 5 units goes to a later sale; on-hand stock on `day` is unchanged
+    beaver_db.create_transaction("A4 paper", "sales", available - 5, 1.0, later)
+
+    status, payload = call(service, "POST", "/order", {"items": {"A4 paper": 10}, "request_date": day})
+    assert status == 409 and "insufficient stock" in payload["error"]
+    status, payload = call(service, "POST", "/order", {"items": {"A4 paper": 5}, "request_date": day})
+    assert status == 200 and payload["status"] == "accepted"
+    assert beaver_db.get_availability_index().available_to_promise("A4 paper", day) == 0
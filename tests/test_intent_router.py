@@ -0,0 +1,31 @@
+import os
+
+import pandas as pd
+import pytest
+
+from intent_router import IntentRouter
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "data",
+                           "quote_requests_sample.csv")
+
+
+@pytest.mark.parametrize("request_text, intent", [
+    ("Do you have 500 sheets of A4 paper in stock?", "inventory"),
+    ("How much would 200 sheets of cardstock cost?", "quote"),
+    ("We accept your quote, please go ahead.", "sales"),
+])
+def test_clear_requests_go_to_a_specialist(request_text, intent):
+    decision = IntentRouter().classify(request_text)
+    assert (decision.intent, decision.confident) == (intent, True)
+
+
+def test_new_purchases_go_to_the_orchestrator():
+    router = IntentRouter()
+    requests = pd.read_csv(SAMPLE_PATH)["request"]
+    decisions = [router.classify(request) for request in requests]
+    assert not any(d.confident for d in decisions)
+
+
+def test_mixed_request_is_not_confident():
+    decision = IntentRouter().classify("Is A4 paper in stock, and what is the price?")
+    assert decision.intent is None and not decision.confident
@@ -0,0 +1,120 @@
+import functools
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+
+import beaver_db
+import ledger_parity
+from ledger_backends import NumpyLedger, SQLiteLedger
+
+SEEDS = (3, 11)
+AS_OF_DATES = [str(np.datetime64("2025-01-02") + d) for d in range(0, 120, 15)]
+
+
+def fresh_database(backend: str, seed: int = 137) -> None:
+    beaver_db.set_db_engine(create_engine("sqlite://"))
+    if backend == "sharded":
+        beaver_db.use_warehouse_shards(ledger_parity.WAREHOUSES)
+    else:
+        beaver_db.set_ledger_backend(NumpyLedger() if backend == "numpy" else SQLiteLedger(beaver_db.db_engine))
+    beaver_db.init_database(beaver_db.db_engine, seed=seed, data_dir=beaver_db.DATA_DIR)
+
+
+@functools.lru_cache(maxsize=None)
+def replayed(backend: str, seed: int) -> dict:
+    workload = ledger_parity.generate_workload(seed, 400)
+    answers = ledger_parity.replay(backend, workload, AS_OF_DATES, seed)
+    answers.pop("query_seconds")
+    return answers
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("backend", ["numpy", "sharded"])
+def test_backends_answer_like_sqlite(backend, seed):
+    expected = dict(replayed("sqlite", seed))
+    actual = dict(replayed(backend, seed))
+    actual.pop("scoped_mismatches", None)
+    if backend == "sharded":
+        # Each warehouse is seeded with its own stock orders, so only ids after seeding line up
+        expected["last_transaction_id"] = actual["last_transaction_id"]
+    assert ledger_parity.compare(expected, actual) == []
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_warehouse_scopes_add_up_to_the_company(seed):
+    assert replayed("sharded", seed)["scoped_mismatches"] == []
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "numpy", "sharded"])
+def test_empty_ledger(backend):
+    fresh_database(backend)
+    beaver_db.discard_transactions_after(0)
+    answers = ledger_parity.snapshot("2025-03-01")
+    assert beaver_db.get_last_transaction_id() == 0
+    assert answers["cash"] == 0
+    assert not any(answers["stock_levels"].values())
+    assert answers["report"]["top_selling_products"] == []
+    assert answers["pending"] == {}
+
+
+@pytest.fixture(scope="module")
+def ties_by_backend():
+    """Same-day sales with equal revenue, and a stock order delivered on the day of a sale."""
+    day = "2025-02-03"
+    rows = [
+        {"item_name": "A4 paper", "transaction_type": "sales", "quantity": 10, "price": 5.0, "date": day},
+        {"item_name": "Cardstock", "transaction_type": "sales", "quantity": 10, "price": 5.0, "date": day},
+        {"item_name": "A4 paper", "transaction_type": "stock_orders", "quantity": 100, "price": 5.0,
+         "date": day, "delivery_date": day},
+        {"item_name": "A4 paper", "transaction_type": "sales", "quantity": 5, "price": 2.5, "date": day},
+    ]
+    answers = {}
+    for backend in ("sqlite", "numpy", "sharded"):
+        fresh_database(backend)
+        beaver_db.create_transactions(rows)
+        answers[backend] = {date: ledger_parity.snapshot(date) for date in ("2025-02-02", day)}
+    return answers
+
+
+@pytest.mark.parametrize("backend", ["numpy", "sharded"])
+def test_same_day_ties_answer_like_sqlite(ties_by_backend, backend):
+    assert ledger_parity.compare(ties_by_backend["sqlite"], ties_by_backend[backend]) == []
+
+
+def test_same_day_transactions_all_count(ties_by_backend):
+    before, after = (ties_by_backend["sqlite"][d]["stock_levels"]["A4 paper"] for d in ("2025-02-02", "2025-02-03"))
+    assert after - before == 100 - 15
+
+
+def test_availability_index_built_across_a_write_is_not_served(monkeypatch):
+    fresh_database("sqlite")
+    before = beaver_db.get_availability_index().available_to_promise("A4 paper", "2025-02-03")
+    stock_events = beaver_db.ledger_backend.stock_events
+
+    def events_then_concurrent_sale():
+        events = stock_events()
+        beaver_db.create_transaction("A4 paper", "sales", 10, 5.0, "2025-02-03")
+        return events
+
+    beaver_db.invalidate_availability_index()
+    monkeypatch.setattr(beaver_db.ledger_backend, "stock_events", events_then_concurrent_sale)
+    beaver_db.get_availability_index()
+    monkeypatch.setattr(beaver_db.ledger_backend, "stock_events", stock_events)
+    assert beaver_db.get_availability_index().available_to_promise("A4 paper", "2025-02-03") == before - 10
+
+
+def test_init_database_writes_the_ledger_to_the_engine_it_is_given():
+    fresh_database("sqlite")
+    engine = create_engine("sqlite://")
+    beaver_db.init_database(engine, data_dir=beaver_db.DATA_DIR)
+    assert beaver_db.db_engine is engine
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM transactions").scalar() > 0
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "sharded"])
+def test_stock_levels_are_whole_units(backend):
+    fresh_database(backend)
+    levels = beaver_db.ledger_backend.stock_levels("2025-03-01")
+    assert levels and all(type(units) is int for units in levels.values())
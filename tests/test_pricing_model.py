@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pricing_model import ItemMatcher, PricingModel, mentioned_items, parse_line_items
+
+PRICES = {"A4 paper": 0.05, "Cardstock": 0.15, "250 gsm cardstock": 0.3, "Paper plates": 0.1}
+
+
+def synthetic_quotes(count=200, seed=0):
+    """Quotes at 80% of list for large orders and list price otherwise, with a few wild outliers."""
+    rng = np.random.default_rng(seed)
+    subtotals = rng.uniform(20, 2000, count)
+    metadata = pd.DataFrame({
+        "job_type": rng.choice(["teacher", "office manager"], count),
+        "order_size": rng.choice(["small", "large"], count),
+        "event_type": rng.choice(["party", "ceremony"], count),
+    })
+    totals = subtotals * np.where(metadata["order_size"] == "large", 0.8, 1.0)
+    totals[:10] *= 100
+    return subtotals, totals, metadata
+
+
+def test_fit_ignores_outliers_and_learns_the_facets():
+    model = PricingModel.fit(*synthetic_quotes(), PRICES)
+    large = model.predict({"A4 paper": 10_000}, order_size="large")
+    small = model.predict({"A4 paper": 10_000}, order_size="small")
+    assert large["historical_price"] == pytest.approx(400, rel=0.05)
+    assert small["historical_price"] == pytest.approx(500, rel=0.05)
+    assert small["suggested_price"] == 500 and large["discount_rate"] == pytest.approx(0.2, abs=0.02)
+
+
+def test_fit_needs_two_usable_quotes():
+    subtotals, totals, metadata = synthetic_quotes(count=3)
+    subtotals[1:] = 0
+    with pytest.raises(ValueError):
+        PricingModel.fit(subtotals, totals, metadata, PRICES)
+
+
+def test_model_round_trips_through_json():
+    model = PricingModel.fit(*synthetic_quotes(), PRICES)
+    restored = PricingModel.from_json(model.to_json())
+    order = {"Cardstock": 300, "A4 paper": 500}
+    assert restored.predict(order, order_size="large") == model.predict(order, order_size="large")
+
+
+def test_line_items_take_the_most_specific_name():
+    request = "We need 500 sheets of A4 paper, 200 sheets of 250 gsm cardstock and 50 paper plates."
+    assert parse_line_items(request, PRICES) == {"A4 paper": 500, "250 gsm cardstock": 200, "Paper plates": 50}
+
+
+@pytest.mark.parametrize("text", [
+    "500 sheets of A4 paper", "cardstock in assorted colors", "250 gsm cardstock, please",
+    "plates made of paper", "nothing we sell",
+])
+def test_item_matcher_agrees_with_mentioned_items(text):
+    assert ItemMatcher(PRICES)(text) == mentioned_items(text, PRICES)
@@ -0,0 +1,51 @@
+import pytest
+
+from rate_limiter import RateLimiter, is_retryable_error
+
+
+class RateLimitError(Exception):
+    pass
+
+
+def test_calls_within_budget_do_not_wait():
+    limiter = RateLimiter(requests_per_minute=60)
+    assert [limiter.acquire() for _ in range(10)] == [0.0] * 10
+
+
+def test_exhausted_request_budget_waits_for_a_refill():
+    limiter = RateLimiter(requests_per_minute=600)
+    for _ in range(600):
+        limiter.acquire()
+    assert 0 < limiter.acquire() < 1.0
+
+
+def test_token_budget_is_enforced():
+    limiter = RateLimiter(requests_per_minute=1000, tokens_per_minute=60_000)
+    assert limiter.acquire(tokens=60_000) == 0.0
+    assert limiter.acquire(tokens=100) > 0
+
+
+def test_retryable_errors_are_retried(monkeypatch):
+    limiter = RateLimiter(requests_per_minute=1000)
+    monkeypatch.setattr(limiter, "backoff_delay", lambda attempt: 0.0)
+    failures = [RateLimitError(), RateLimitError()]
+
+    def flaky():
+        if failures:
+            raise failures.pop()
+        return "ok"
+
+    assert limiter.call(flaky) == "ok"
+    assert limiter.stats()["retries"] == 2
+
+
+def test_other_errors_are_raised_at_once():
+    limiter = RateLimiter(requests_per_minute=1000)
+
+    def broken():
+        raise KeyError("bad request")
+
+    with pytest.raises(KeyError):
+        limiter.call(broken)
+    assert limiter.stats()["retries"] == 0
+    assert not is_retryable_error(KeyError("bad request"))
@@ -0,0 +1,62 @@
+import csv
+import json
+
+import pytest
+
+from results_writer import ResultsWriter
+
+
+def result(request_id, cash=100.0):
+    return {"request_id": request_id, "request_date": "2025-04-01", "job": "teacher", "event": "party",
+            "need_size": "small", "cash_balance": cash, "inventory_value": 50.0, "response": f"reply {request_id}"}
+
+
+def read_ids(path):
+    with open(path, newline="") as f:
+        return [int(row["request_id"]) for row in csv.DictReader(f)]
+
+
+def test_resume_skips_checkpointed_requests(tmp_path):
+    path = str(tmp_path / "results.csv")
+    with ResultsWriter(path, sinks=("jsonl",)) as writer:
+        writer.write(result(1), last_transaction_id=10)
+        writer.write_batch([result(2), result(3, cash=80.0)], last_transaction_id=14)
+
+    with ResultsWriter(path, sinks=("jsonl",), resume=True) as writer:
+        assert writer.resumed
+        assert writer.processed_ids == {1, 2, 3}
+        assert writer.last_transaction_id == 14
+        assert writer.checkpoint["cash_balance"] == 80.0
+    assert read_ids(path) == [1, 2, 3]
+    with open(tmp_path / "results.jsonl") as f:
+        assert [json.loads(line)["request_id"] for line in f] == [1, 2, 3]
+
+
+def test_rows_after_the_last_checkpoint_are_dropped(tmp_path):
+    path = str(tmp_path / "results.csv")
+    with ResultsWriter(path) as writer:
+        writer.write(result(1), last_transaction_id=10)
+    # A crash after a row reached the CSV but before its checkpoint was saved
+    with open(path, "a", newline="") as f:
+        csv.DictWriter(f, fieldnames=list(result(2))).writerow(result(2))
+
+    with ResultsWriter(path, resume=True) as writer:
+        assert writer.processed_ids == {1}
+        assert writer.last_transaction_id == 10
+    assert read_ids(path) == [1]
+
+
+def test_fresh_run_discards_the_old_checkpoint(tmp_path):
+    path = str(tmp_path / "results.csv")
+    with ResultsWriter(path) as writer:
+        writer.write(result(1), last_transaction_id=10)
+
+    with ResultsWriter(path) as writer:
+        assert not writer.resumed
+    with ResultsWriter(path, resume=True) as writer:
+        assert not writer.resumed and writer.last_transaction_id == 0
+
+
+def test_unknown_sink_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ResultsWriter(str(tmp_path / "results.csv"), sinks=("xml",))
@@ -0,0 +1,76 @@
+import cProfile
+import threading
+
+import pytest
+
+from run_profiler import RunProfiler
+
+
+def busy():
+    return sum(i * i for i in range(20_000))
+
+
+def run_in_threads(profiler, count):
+    errors = []
+
+    def work():
+        try:
+            with profiler.section():
+                busy()
+        except Exception as e:  # the tool call itself must never fail because of profiling
+            errors.append(e)
+
+    threads = [threading.Thread(target=work) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def test_sections_on_worker_threads_do_not_fail(tmp_path):
+    profiler = RunProfiler()
+    profiler.start()
+    errors = run_in_threads(profiler, 4)
+    with profiler.paused(model_wait=False):
+        errors += run_in_threads(profiler, 4)
+    report = profiler.stop(str(tmp_path))
+    assert errors == []
+    assert report is not None and report["skipped_sections"] == 0
+    assert (tmp_path / "profile.pstats").exists()
+
+
+def test_nested_sections_and_pauses_keep_depth(tmp_path):
+    profiler = RunProfiler()
+    profiler.start()
+    with profiler.section():
+        with profiler.paused():
+            busy()
+        busy()
+    assert profiler._local.depth == 1
+    profiler.stop(str(tmp_path))
+    assert profiler._local.depth == 0
+
+
+def test_section_is_skipped_when_another_profiler_is_active(tmp_path, monkeypatch):
+    def refuse(self):
+        raise ValueError("Another profiling tool is already active")
+
+    profiler = RunProfiler()
+    monkeypatch.setattr(cProfile.Profile, "enable", refuse)
+    profiler.start()
+    with profiler.section():
+        busy()
+    assert getattr(profiler._local, "depth", 0) == 0
+    monkeypatch.undo()
+    assert profiler.stop(str(tmp_path)) is None
+    assert profiler.skipped_sections == 2
+
+
+@pytest.mark.parametrize("calls", [1, 3])
+def test_profiler_can_run_again(tmp_path, calls):
+    profiler = RunProfiler()
+    for _ in range(calls):
+        profiler.start()
+        busy()
+        assert profiler.stop(str(tmp_path)) is not None
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+import beaver_db
+import synthetic_data
+from ledger_backends import SQLiteLedger
+
+
+def test_ledger_only_sells_stock_on_hand_and_pays_for_restocks():
+    catalogue = synthetic_data.generate_catalogue(2000)
+    inventory = beaver_db.generate_sample_inventory(catalogue, 0.4, 0)
+    ledger = pd.concat(synthetic_data.generate_ledger(catalogue, inventory, 20_000, chunk_size=5000), ignore_index=True)
+    assert ledger["units"].dtype == np.int64
+    assert set(ledger["item_name"]) <= set(inventory["item_name"])
+
+    sales = ledger[ledger["transaction_type"] == "sales"]
+    restocks = ledger[ledger["transaction_type"] == "stock_orders"]
+    list_value = ledger["units"] * ledger["item_name"].map(catalogue.set_index("item_name")["unit_price"])
+    assert (sales["price"] >= 0.85 * list_value[sales.index] - 0.01).all()
+    assert (restocks["price"] <= synthetic_data.SUPPLIER_PRICE_SHARE * list_value[restocks.index] + 0.01).all()
+
+    opening = inventory.set_index("item_name")["current_stock"]
+    cash = synthetic_data.seeded_cash(inventory)
+    for day in sorted(set(ledger["transaction_date"]) | set(ledger["delivery_date"])):
+        delivered = restocks[restocks["delivery_date"] <= day].groupby("item_name")["units"].sum()
+        sold = sales[sales["transaction_date"] <= day].groupby("item_name")["units"].sum()
+        stock = opening.add(delivered, fill_value=0).sub(sold, fill_value=0)
+        assert stock.min() >= 0, day
+        spent = ledger[ledger["transaction_date"] <= day]
+        balance = cash + spent["price"].where(spent["transaction_type"] == "sales", -spent["price"]).sum()
+        assert balance >= 0, day
+
+
+def test_seeded_database_is_solvent():
+    beaver_db.set_db_engine(create_engine("sqlite://"))
+    beaver_db.set_ledger_backend(SQLiteLedger(beaver_db.db_engine))
+    catalogue = synthetic_data.generate_catalogue(2000)
+    synthetic_data.seed_database(catalogue, 5000, chunk_size=2000)
+    assert beaver_db.get_cash_balance("2025-05-01") > 0
+    assert min(beaver_db.ledger_backend.stock_levels("2025-05-01").values()) >= 0